@@ -6,6 +6,8 @@ module.exports = {
             NODE_ENV: "production",
             PORT: 4991,
             U2NET_HOME: "/tmp/u2net",
+            OBJECTCUT_CACHE_DIR: "/tmp/objectcut-cache",
+            OBJECTCUT_MAX_SIZE: "1024",
             PATH: "/var/www/html/objectcut-react/venv/bin:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
         },
         watch: false,
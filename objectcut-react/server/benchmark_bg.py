@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# benchmark_bg.py
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import onnxruntime as ort
+import PIL
+from PIL import Image, ImageDraw, ImageOps
+
+from remove_bg import (MAX_SIZE, MODEL_NAME, GRAPH_OPTIMIZATION_LEVELS, compute_mask, create_session, encode_image,
+                       remove_background_data, render_outputs)
+
+
+def make_image(width, height):
+    """
+    Erstellt ein synthetisches Produktfoto: Ellipse mit Textur auf Farbverlauf
+
+    Args:
+        width: Breite in Pixeln
+        height: Höhe in Pixeln
+
+    Returns:
+        JPEG-Bytes des Bildes
+    """
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    background = np.stack([np.tile(gradient, (height, 1)),
+                           np.full((height, width), 120, dtype=np.float32),
+                           np.tile(gradient[::-1], (height, 1))], axis=-1)
+    image = Image.fromarray(background.astype(np.uint8), 'RGB')
+
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width // 4, height // 5, width * 3 // 4, height * 4 // 5), fill=(235, 215, 60))
+    for x in range(width // 4, width * 3 // 4, max(1, width // 40)):
+        draw.line((x, height // 5, x, height * 4 // 5), fill=(200, 90, 40), width=max(1, width // 400))
+
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=92)
+    return output.getvalue()
+
+
+def load_image(path):
+    """Liest ein vorhandenes Bild als kodierte Bytes"""
+    with open(path, 'rb') as image_file:
+        return image_file.read()
+
+
+def alpha_channel(png_data):
+    """Extrahiert den Alphakanal eines freigestellten PNGs als float-Array im Bereich 0..1"""
+    with Image.open(io.BytesIO(png_data)) as image:
+        return np.asarray(image.getchannel('A'), dtype=np.float32) / 255
+
+
+def compare_alpha(alpha, reference):
+    """
+    Vergleicht zwei Alphamasken
+
+    Returns:
+        Tuple aus mittlerer absoluter Abweichung und IoU der binarisierten Masken
+    """
+    mean_error = float(np.abs(alpha - reference).mean())
+    foreground, reference_foreground = alpha > 0.5, reference > 0.5
+    union = np.logical_or(foreground, reference_foreground).sum()
+    iou = float(np.logical_and(foreground, reference_foreground).sum() / union) if union else 1.0
+    return mean_error, iou
+
+
+def time_call(function, repeat):
+    """Gibt die beste Laufzeit wiederholter Aufrufe in Sekunden und das letzte Ergebnis zurück"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_resolutions(images, max_sizes, session, repeat=3):
+    """
+    Misst Laufzeit und Maskenqualität des Downscale-Pfads je Eingabeauflösung
+
+    Referenz ist die Maske bei voller Auflösung (max_size = 0).
+
+    Args:
+        images: Liste aus (Name, kodierte Bilddaten)
+        max_sizes: Zu vergleichende maximale Kantenlängen für die Inferenz
+        session: Geladene rembg-Session
+        repeat: Anzahl der Durchläufe pro Messung (der schnellste zählt)
+    """
+    print(f"{'Image':>14} {'Max size':>9} {'Refine':>7} {'Time (s)':>9} {'Speedup':>8} {'Mean err':>9} {'IoU':>7}")
+
+    for name, data in images:
+        reference_time, reference = time_call(lambda: remove_background_data(data, session, max_size=0), repeat)
+        reference_alpha = alpha_channel(reference)
+        print(f"{name:>14} {'full':>9} {'-':>7} {reference_time:>9.3f} {'1.0x':>8} {0.0:>9.4f} {1.0:>7.4f}")
+
+        for max_size in max_sizes:
+            for refine in (False, True):
+                elapsed, output = time_call(
+                    lambda: remove_background_data(data, session, max_size=max_size, refine=refine), repeat)
+                mean_error, iou = compare_alpha(alpha_channel(output), reference_alpha)
+                print(f"{name:>14} {max_size:>9} {'yes' if refine else 'no':>7} {elapsed:>9.3f} "
+                      f"{reference_time / elapsed:>7.1f}x {mean_error:>9.4f} {iou:>7.4f}")
+
+
+def mask_iou(mask, reference):
+    """IoU zweier Masken nach Binarisierung bei 50 %"""
+    foreground = np.asarray(mask) > 127
+    reference_foreground = np.asarray(reference) > 127
+    union = np.logical_or(foreground, reference_foreground).sum()
+    return float(np.logical_and(foreground, reference_foreground).sum() / union) if union else 1.0
+
+
+def parse_model_spec(spec):
+    """Zerlegt eine Modellangabe wie 'u2netp' oder 'u2net:int8' in Name und Quantisierung"""
+    name, _, variant = spec.partition(':')
+    if variant not in ('', 'int8'):
+        raise ValueError(f"Unknown model variant '{variant}' in '{spec}'")
+    return name, variant == 'int8'
+
+
+def benchmark_models(images, specs, reference_spec=MODEL_NAME, max_size=MAX_SIZE, threads=None,
+                     optimization='all', repeat=3, json_path=None):
+    """
+    Vergleicht Modelle und Varianten nach Latenz, Durchsatz und Maskenqualität
+
+    Gemessen wird die Maskenberechnung (Inferenz inklusive Vor- und Nachverarbeitung)
+    auf bereits dekodierten Bildern. Die Qualität ist die mittlere IoU gegenüber den
+    Masken des Referenzmodells.
+
+    Args:
+        images: Liste aus (Name, kodierte Bilddaten)
+        specs: Modellangaben wie 'u2netp' oder 'u2net:int8'
+        reference_spec: Modellangabe der Referenz
+        max_size: Maximale Kantenlänge für die Inferenz
+        threads: onnxruntime-Intra-Op-Threads (None = onnxruntime-Standard)
+        optimization: Optimierungsstufe des Graphen
+        repeat: Durchläufe über alle Bilder
+        json_path: Optionaler Pfad für die Ergebnisse als JSON
+
+    Returns:
+        Liste der Ergebnisse je Modell
+    """
+    decoded = [ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert('RGBA') for _, data in images]
+
+    def run(spec):
+        name, quantize = parse_model_spec(spec)
+        start = time.perf_counter()
+        session = create_session(name, threads=threads, optimization=optimization, quantize=quantize)
+        load_seconds = time.perf_counter() - start
+
+        # Erster Lauf initialisiert Speicher und Kernel und zählt nicht zur Latenz
+        compute_mask(decoded[0], session, max_size)
+
+        latencies, masks = [], []
+        for _ in range(repeat):
+            masks = []
+            for image in decoded:
+                start = time.perf_counter()
+                masks.append(compute_mask(image, session, max_size))
+                latencies.append(time.perf_counter() - start)
+        return load_seconds, np.array(latencies), masks
+
+    _, _, reference_masks = run(reference_spec)
+
+    print(f"Reference: {reference_spec}, {len(decoded)} images x {repeat} runs, max size {max_size}, "
+          f"optimization {optimization}, threads {threads or 'default'}")
+    print(f"{'Model':>22} {'Load (s)':>9} {'Mean (ms)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'img/s':>7} {'IoU':>7}")
+
+    results = []
+    for spec in specs:
+        load_seconds, latencies, masks = run(spec)
+        iou = float(np.mean([mask_iou(mask, reference) for mask, reference in zip(masks, reference_masks)]))
+        result = {
+            "model": spec,
+            "load_seconds": round(load_seconds, 3),
+            "mean_ms": round(float(latencies.mean()) * 1000, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+            "images_per_second": round(len(latencies) / float(latencies.sum()), 2),
+            "iou": round(iou, 4),
+        }
+        results.append(result)
+        print(f"{spec:>22} {result['load_seconds']:>9.2f} {result['mean_ms']:>10.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['images_per_second']:>7.2f} {result['iou']:>7.4f}")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump({"reference": reference_spec, "max_size": max_size, "optimization": optimization,
+                       "threads": threads, "repeat": repeat, "results": results}, json_file, indent=2)
+    return results
+
+
+class PeakMemory:
+    def __init__(self, interval=0.01):
+        """
+        Misst den RSS-Höchstwert, solange der Kontext aktiv ist
+
+        Die Suite-Hilfen (PeakMemory, run_case, environment, compare_baseline) entsprechen
+        voice-xtract/server/benchmark.py. Beide Server werden getrennt ausgeliefert, daher
+        hat jedes Projekt seine eigene Kopie.
+        """
+        self.interval = interval
+        self.peak_bytes = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def rss():
+        """Aktueller RSS in Bytes oder None, wenn er nicht lesbar ist"""
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self.rss() or 0)
+
+    def __enter__(self):
+        self.peak_bytes = self.rss() or 0
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.rss() or 0)
+
+    @property
+    def peak_mb(self):
+        if self.peak_bytes:
+            return round(self.peak_bytes / (1024 * 1024), 1)
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss ist unter macOS in Bytes, sonst in Kilobytes
+        return round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_case(function, repeat=1):
+    """
+    Misst einen Fall
+
+    Vor jedem Durchlauf werden die Zufallsgeneratoren zurückgesetzt, damit alle
+    Durchläufe und Rechner dieselben Eingaben sehen.
+
+    Args:
+        function: Zu messende Funktion; darf ein Dictionary mit Stufenzeiten zurückgeben
+        repeat: Anzahl der Durchläufe (der schnellste zählt)
+
+    Returns:
+        Dictionary mit Laufzeit, RSS-Höchstwert und Stufenzeiten des schnellsten Durchlaufs
+    """
+    best = None
+    for _ in range(repeat):
+        random.seed(0)
+        np.random.seed(0)
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            stages = function()
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best['seconds']:
+            best = {'seconds': round(elapsed, 4), 'peak_rss_mb': memory.peak_mb}
+            if isinstance(stages, dict):
+                best['stages'] = stages
+    return best
+
+
+def stage_times(input_path, output_path, session, max_size):
+    """
+    Verarbeitet ein Bild von Datei zu Datei wie remove_background, Stufe für Stufe
+
+    Returns:
+        Dauer von Lesen, Dekodieren, Maske, Ausgabe, Kodieren und Schreiben in Sekunden
+    """
+    stages = {}
+    start = time.perf_counter()
+    with open(input_path, 'rb') as input_file:
+        data = input_file.read()
+    stages['read'] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert('RGBA')
+    stages['decode'] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    mask = compute_mask(image, session, max_size)
+    stages['mask'] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    cutout = render_outputs(image, mask)['cutout']
+    stages['render'] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    output_data = encode_image(cutout)
+    stages['encode'] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    with open(output_path, 'wb') as output_file:
+        output_file.write(output_data)
+    stages['write'] = round(time.perf_counter() - start, 4)
+    return stages
+
+
+def environment():
+    """Beschreibt Rechner und Bibliotheksversionen eines Laufs"""
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+        'onnxruntime': ort.__version__,
+        'pillow': PIL.__version__,
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare_baseline(results, baseline_path, tolerance=0.15):
+    """Gibt die Fälle zurück, die mehr als tolerance (relativ) langsamer als in der Baseline sind"""
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%})")
+    print(f"{'Case':>30} {'Baseline (s)':>13} {'Current (s)':>12} {'Change':>8}")
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:>30} {'-':>13} {result['seconds']:>12.4f} {'new':>8}")
+            continue
+        change = result['seconds'] / baseline[name]['seconds'] - 1
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>30} {baseline[name]['seconds']:>13.4f} {result['seconds']:>12.4f} {change:>+7.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        print(f"Not run (in baseline only): {', '.join(missing)}")
+    return regressions
+
+
+def benchmark_suite(resolutions, max_size=MAX_SIZE, threads=None, repeat=3, json_path=None, baseline_path=None,
+                    tolerance=0.15):
+    """
+    Misst remove_background auf synthetischen Bildern und speichert die Ergebnisse
+
+    Je Auflösung wird der komplette Weg von Datei zu Datei gemessen (Laufzeit, Megapixel
+    pro Sekunde, RSS-Höchstwert), mit den Stufenzeiten desselben Durchlaufs. Das Laden
+    des Modells ist ein eigener Fall.
+
+    Args:
+        resolutions: Bildgrößen als 'BREITExHÖHE'
+        max_size: Maximale Kantenlänge für die Inferenz
+        threads: onnxruntime-Intra-Op-Threads (None = onnxruntime-Standard)
+        repeat: Durchläufe pro Fall (der schnellste zählt)
+        json_path: Optionaler Pfad für die Ergebnisse als JSON
+        baseline_path: Optionale frühere Ergebnisdatei zum Vergleich
+        tolerance: Erlaubte relative Verlangsamung gegenüber der Baseline
+
+    Returns:
+        Liste der Namen der langsamer gewordenen Fälle
+    """
+    results = {}
+
+    def report(name, result):
+        results[name] = result
+        rate = f"{result['megapixels_per_second']:>8.2f}" if 'megapixels_per_second' in result else f"{'-':>8}"
+        print(f"{name:>30} {result['seconds']:>10.3f} {rate} {result['peak_rss_mb'] or 0:>10.1f}")
+
+    print(f"{'Case':>30} {'Time (s)':>10} {'MP/s':>8} {'RSS (MB)':>10}")
+
+    sessions = []
+    report('model_load', run_case(lambda: sessions.append(create_session(threads=threads))))
+    session = sessions[-1]
+
+    with tempfile.TemporaryDirectory(prefix='objectcut-bench-') as work_dir:
+        for resolution in resolutions:
+            width, height = (int(value) for value in resolution.split('x'))
+            data = make_image(width, height)
+            input_path = os.path.join(work_dir, f'{resolution}.jpg')
+            output_path = os.path.join(work_dir, f'{resolution}.png')
+            with open(input_path, 'wb') as input_file:
+                input_file.write(data)
+
+            # Gleiche Arbeit wie remove_background, die Stufen stammen aus dem gemessenen Durchlauf
+            result = run_case(lambda: stage_times(input_path, output_path, session, max_size), repeat)
+            result['megapixels_per_second'] = round(width * height / 1e6 / result['seconds'], 3)
+            report(f'remove_background_{resolution}', result)
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump({'suite': 'objectcut', 'created': round(time.time()), 'environment': environment(),
+                       'settings': {'model': MODEL_NAME, 'max_size': max_size, 'threads': threads,
+                                    'resolutions': resolutions, 'repeat': repeat},
+                       'results': results}, json_file, indent=2)
+        print(f"Results written to {json_path}")
+
+    if baseline_path:
+        return compare_baseline(results, baseline_path, tolerance)
+    return []
+
+
+def collect_images(paths, resolutions):
+    """Lädt die angegebenen Bilder oder erzeugt synthetische Bilder in den angegebenen Größen"""
+    if paths:
+        return [(path.rsplit('/', 1)[-1][:14], load_image(path)) for path in paths]
+
+    images = []
+    for resolution in resolutions.split(','):
+        width, height = (int(value) for value in resolution.split('x'))
+        images.append((resolution, make_image(width, height)))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ObjectCut background removal benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    resolution_parser = subparsers.add_parser('resolution', help='Downscaled inference across image resolutions')
+    resolution_parser.add_argument('images', nargs='*', help='Images to benchmark (default: synthetic images)')
+    resolution_parser.add_argument('--resolutions', default='1024x768,2048x1536,4000x3000,6000x4000',
+                                   help='Synthetic image sizes when no images are given '
+                                        '(default: 1024x768,2048x1536,4000x3000,6000x4000)')
+    resolution_parser.add_argument('--max-sizes', default='512,1024,2048',
+                                   help='Comma-separated max inference sizes to compare (default: 512,1024,2048)')
+    resolution_parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+
+    models_parser = subparsers.add_parser('models', help='Latency, throughput and mask IoU per model')
+    models_parser.add_argument('images', nargs='*', help='Images to benchmark (default: synthetic images)')
+    models_parser.add_argument('--resolutions', default='800x600,1600x1200,3000x2000',
+                               help='Synthetic image sizes when no images are given '
+                                    '(default: 800x600,1600x1200,3000x2000)')
+    models_parser.add_argument('--models', default='bria-rmbg,u2net,u2net:int8,u2netp,isnet-general-use',
+                               help='Comma-separated models, append :int8 for the quantized variant '
+                                    '(default: bria-rmbg,u2net,u2net:int8,u2netp,isnet-general-use)')
+    models_parser.add_argument('--reference', default=MODEL_NAME,
+                               help=f'Model whose masks define IoU 1.0 (default: {MODEL_NAME})')
+    models_parser.add_argument('--max-size', type=int, default=MAX_SIZE,
+                               help=f'Max inference size (default: {MAX_SIZE})')
+    models_parser.add_argument('--threads', type=int, help='onnxruntime intra-op threads (default: all cores)')
+    models_parser.add_argument('--optimization', choices=list(GRAPH_OPTIMIZATION_LEVELS), default='all',
+                               help='onnxruntime graph optimization level (default: all)')
+    models_parser.add_argument('--repeat', type=int, default=3, help='Runs over all images (default: 3)')
+    models_parser.add_argument('--json', help='Write the results to this JSON file')
+
+    suite_parser = subparsers.add_parser('suite', help='remove_background on synthetic images, '
+                                                      'with JSON output and baseline comparison')
+    suite_parser.add_argument('--resolutions', default='640x480,1920x1080,4000x3000',
+                              help='Synthetic image sizes (default: 640x480,1920x1080,4000x3000)')
+    suite_parser.add_argument('--max-size', type=int, default=MAX_SIZE,
+                              help=f'Max inference size (default: {MAX_SIZE})')
+    suite_parser.add_argument('--threads', type=int, help='onnxruntime intra-op threads (default: all cores)')
+    suite_parser.add_argument('--repeat', type=int, default=3, help='Runs per case (default: 3)')
+    suite_parser.add_argument('--json', help='Write the results to this JSON file')
+    suite_parser.add_argument('--baseline', help='Compare with a previous results file; exits with status 1 '
+                                                 'on regressions')
+    suite_parser.add_argument('--tolerance', type=float, default=0.15,
+                              help='Allowed relative slowdown against the baseline (default: 0.15)')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'suite':
+        regressions = benchmark_suite(args.resolutions.split(','), args.max_size, args.threads, args.repeat,
+                                      args.json, args.baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        return
+
+    images = collect_images(args.images, args.resolutions)
+
+    if args.benchmark == 'resolution':
+        max_sizes = [int(size) for size in args.max_sizes.split(',')]
+        session = create_session()
+        benchmark_resolutions(images, max_sizes, session, repeat=args.repeat)
+    elif args.benchmark == 'models':
+        benchmark_models(images, args.models.split(','), args.reference, args.max_size, args.threads,
+                         args.optimization, args.repeat, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,1166 @@
 #!/usr/bin/env python3
 import sys
 import os
-from rembg import remove
-from PIL import Image
+import argparse
+import glob
+import json
+import base64
+import hashlib
+import tempfile
+import fcntl
+import threading
+import socketserver
+import struct
+import contextlib
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import onnxruntime as ort
+import numpy as np
+from rembg import remove, new_session
+from rembg.sessions import sessions_class
+from PIL import Image, ImageColor, ImageOps
 import io
 
-def remove_background(input_path, output_path):
+# Standardmodell. Entspricht dem Modell, das rembg 2.0.85 ohne explizite Session verwendet,
+# damit bisherige Aufrufer dieselben Masken erhalten. Es ist fest eingetragen, damit Cache-Schlüssel
+# und Benchmarks nicht vom Standard der installierten rembg-Version abhängen
+MODEL_NAME = "bria-rmbg"
+
+# Optimierungsstufen des onnxruntime-Graphen
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# Maximale Kantenlänge für die Maskenberechnung (0 = immer volle Auflösung, wie bisher).
+# Die rembg-Modelle arbeiten intern mit höchstens 1024 px, mit --max-size 1024 werden größere
+# Bilder vorher verkleinert. Das ändert die Masken und ist daher nur auf Wunsch aktiv
+MAX_SIZE = 0
+
+# Ausgabeformate und ihre Standardparameter. PNG mit niedriger Kompressionsstufe
+# kodiert deutlich schneller als die Pillow-Voreinstellung 6
+OUTPUT_FORMATS = {'png': 'PNG', 'webp': 'WEBP'}
+PNG_COMPRESS_LEVEL = 1
+WEBP_QUALITY = 90
+
+# Ausgaben, die aus einer einzigen Maskenberechnung abgeleitet werden können
+OUTPUT_KINDS = ('cutout', 'mask', 'crop', 'composite')
+BG_COLOR = 'white'
+
+# Maskenwert, ab dem ein Pixel für den Zuschnitt auf das Motiv zählt
+CROP_THRESHOLD = 8
+
+# Verarbeitungsoptionen, die Aufträge im Dienstmodus einzeln überschreiben können
+JOB_OPTIONS = ('max_size', 'refine', 'format', 'compress_level', 'quality', 'outputs', 'bgcolor', 'crop_padding')
+
+# Rahmenkopf im Binärprotokoll: Länge des JSON-Kopfs und der Bilddaten (je uint32, Big Endian)
+FRAME_HEADER = struct.Struct('>II')
+
+# Perceptual-Treffer werden nur ausgeliefert, wenn ein 32x32-Vorschaubild (RGB) dem des
+# Originalbildes gleicht. Neu kodierte Kopien (JPEG ab Qualität 30, WebP) bleiben deutlich
+# unter diesen Grenzen, bearbeitete Bilder liegen darüber
+PERCEPTUAL_THUMBNAIL_SIZE = 32
+PERCEPTUAL_MAX_MSE = 4.0
+PERCEPTUAL_MAX_DIFF = 10
+
+# Dateiendungen, die im Batch-Modus als Bilder erkannt werden
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
+
+
+class MaskCache:
+    def __init__(self, cache_dir, max_size_mb=512, perceptual=False):
+        """
+        Festplatten-Cache für berechnete Alphamasken
+
+        Gespeichert wird nur die Maske als PNG, das Ergebnis wird bei jedem Treffer neu
+        zusammengesetzt. Dadurch bleibt ein Eintrag für alle Ausgabeformate gültig.
+        Schlüssel ist der Hash der Bilddaten und der maskenrelevanten Einstellungen.
+        Optional wird zusätzlich ein Differenz-Hash (dHash) der Pixel hinterlegt, über
+        den auch neu kodierte Kopien desselben Bildes gefunden werden. Ein solcher Treffer
+        gilt nur, wenn auch ein kleines Vorschaubild mit dem des Originals übereinstimmt.
+
+        Args:
+            cache_dir: Verzeichnis für die Cache-Einträge
+            max_size_mb: Größenlimit in MB, am längsten ungenutzte Masken werden verdrängt
+            perceptual: Neu kodierte Bilder über den dHash wiedererkennen
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.perceptual = perceptual
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Für den Prozess-Pool: jeder Prozess erhält eigene Zähler und eine eigene Sperre
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.hits = self.perceptual_hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def dhash(image, hash_size=8):
+        """Berechnet den Differenz-Hash eines Bildes als Hex-String (64 Bit bei hash_size 8)"""
+        pixels = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+        return np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes().hex()
+
+    @staticmethod
+    def key(data, settings):
+        """
+        Berechnet einen Cache-Schlüssel
+
+        Args:
+            data: Bilddaten oder Hash-String
+            settings: Einstellungen, die die Maske beeinflussen
+
+        Returns:
+            SHA-256-Hex-String
+        """
+        digest = hashlib.sha256(data if isinstance(data, bytes) else data.encode('utf-8'))
+        digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def entry_path(self, key, suffix='.png'):
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def perceptual_key(self, image, settings):
+        return self.key(f"{self.dhash(image)}:{image.width}x{image.height}", settings)
+
+    @staticmethod
+    def thumbnail(image):
+        """Verkleinert ein Bild auf das Vorschaubild, mit dem Perceptual-Treffer geprüft werden"""
+        size = (PERCEPTUAL_THUMBNAIL_SIZE, PERCEPTUAL_THUMBNAIL_SIZE)
+        return np.asarray(image.convert('RGB').resize(size, Image.BOX), dtype=np.uint8)
+
+    @staticmethod
+    def thumbnails_match(first, second):
+        """Prüft, ob zwei Vorschaubilder höchstens so weit abweichen wie neu kodierte Kopien"""
+        difference = first.astype(np.float32) - second.astype(np.float32)
+        return float(np.mean(difference ** 2)) <= PERCEPTUAL_MAX_MSE and np.abs(difference).max() <= PERCEPTUAL_MAX_DIFF
+
+    def get(self, input_data, image, settings):
+        """
+        Sucht die Maske eines Bildes
+
+        Args:
+            input_data: Kodierte Bilddaten
+            image: Dekodiertes Bild mit korrigierter Orientierung
+            settings: Einstellungen, die die Maske beeinflussen
+
+        Returns:
+            Maske (Modus L) oder None bei einem Fehlschlag
+        """
+        mask = self.load(self.key(input_data, settings), image.size)
+        perceptual_hit = False
+
+        if mask is None and self.perceptual:
+            # Der Verweis enthält den Schlüssel der Maske, die für das Originalbild berechnet wurde,
+            # und dessen Vorschaubild
+            ref_path = self.entry_path(self.perceptual_key(image, settings), '.ref')
+            try:
+                with open(ref_path, 'r', encoding='ascii') as ref_file:
+                    ref = json.load(ref_file)
+                thumbnail = np.frombuffer(base64.b64decode(ref['thumbnail']), dtype=np.uint8)
+                original = thumbnail.reshape(PERCEPTUAL_THUMBNAIL_SIZE, PERCEPTUAL_THUMBNAIL_SIZE, 3)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError, TypeError):
+                # Beschädigter Verweis oder altes Format ohne Vorschaubild
+                with contextlib.suppress(OSError):
+                    os.unlink(ref_path)
+            else:
+                # Ähnlicher dHash, aber sichtbar anderes Bild: der Verweis bleibt für das Original gültig
+                if self.thumbnails_match(original, self.thumbnail(image)):
+                    mask = self.load(ref['key'], image.size)
+                    if mask is None:
+                        with contextlib.suppress(OSError):
+                            os.unlink(ref_path)
+            perceptual_hit = mask is not None
+
+        self.record(mask is not None, perceptual_hit)
+        return mask
+
+    def load(self, key, size):
+        """Lädt eine Maske und verwirft Einträge, die beschädigt sind oder nicht zur Bildgröße passen"""
+        path = self.entry_path(key)
+        try:
+            with Image.open(path) as cached:
+                mask = cached.convert('L')
+            if mask.size != size:
+                raise ValueError(f"size {mask.size} does not match image size {size}")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Discarding mask cache entry {key}: {e}", file=sys.stderr)
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+            return None
+
+        # Eintrag als zuletzt verwendet markieren
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return mask
+
+    def put(self, input_data, image, settings, mask):
+        """
+        Speichert die Maske eines Bildes
+
+        Args:
+            input_data: Kodierte Bilddaten
+            image: Dekodiertes Bild mit korrigierter Orientierung
+            settings: Einstellungen, die die Maske beeinflussen
+            mask: Berechnete Maske (Modus L)
+        """
+        key = self.key(input_data, settings)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Erst vollständig schreiben, dann unter dem endgültigen Namen veröffentlichen
+        temp_fd, temp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.png', dir=self.cache_dir)
+        try:
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                mask.save(temp_file, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+            os.replace(temp_path, path)
+
+            if self.perceptual:
+                ref_path = self.entry_path(self.perceptual_key(image, settings), '.ref')
+                os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+                temp_ref_path = f"{ref_path}.{os.getpid()}.{threading.get_ident()}"
+                thumbnail = base64.b64encode(self.thumbnail(image).tobytes()).decode('ascii')
+                with open(temp_ref_path, 'w', encoding='ascii') as ref_file:
+                    json.dump({'key': key, 'thumbnail': thumbnail}, ref_file)
+                os.replace(temp_ref_path, ref_path)
+        except OSError as e:
+            print(f"Warning: Could not store mask in cache: {e}", file=sys.stderr)
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Entfernt die am längsten ungenutzten Masken, bis der Cache in sein Größenlimit passt"""
+        entries = []
+        total_size = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix.startswith('.') or not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        # Verweise ohne Maske werden beim nächsten Zugriff verworfen
+        for last_used, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+            total_size -= size
+
+    def record(self, hit, perceptual_hit=False):
+        """Aktualisiert die Treffer-Zähler, sowohl für diesen Prozess als auch im Cache-Verzeichnis"""
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.perceptual_hits += perceptual_hit
+            else:
+                self.misses += 1
+
+        stats_path = os.path.join(self.cache_dir, 'stats.json')
+        # Prozesse des Pools (--pool process) aktualisieren die Summen gleichzeitig
+        with open(f"{stats_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(stats_path, 'r', encoding='utf-8') as stats_file:
+                    totals = json.load(stats_file)
+            except (OSError, ValueError):
+                totals = {'hits': 0, 'perceptual_hits': 0, 'misses': 0}
+            totals['hits' if hit else 'misses'] += 1
+            totals['perceptual_hits'] = totals.get('perceptual_hits', 0) + perceptual_hit
+
+            temp_path = f"{stats_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, 'w', encoding='utf-8') as stats_file:
+                json.dump(totals, stats_file)
+            os.replace(temp_path, stats_path)
+
+    def stats(self):
+        """Gibt die Treffer-Zähler dieses Prozesses und aller Prozesse des Caches zurück"""
+        try:
+            with open(os.path.join(self.cache_dir, 'stats.json'), 'r', encoding='utf-8') as stats_file:
+                totals = json.load(stats_file)
+        except (OSError, ValueError):
+            totals = {'hits': 0, 'perceptual_hits': 0, 'misses': 0}
+
+        requests = self.hits + self.misses
+        total_requests = totals['hits'] + totals['misses']
+        return {
+            'hits': self.hits,
+            'perceptual_hits': self.perceptual_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+            'total_hits': totals['hits'],
+            'total_perceptual_hits': totals.get('perceptual_hits', 0),
+            'total_misses': totals['misses'],
+            'total_hit_rate': round(totals['hits'] / total_requests, 3) if total_requests else 0.0
+        }
+
+
+def model_names():
+    """Gibt die Namen aller Modelle zurück, die die installierte rembg-Version kennt"""
+    return sorted(session_class.name() for session_class in sessions_class)
+
+
+def quantized_model_path(model_name):
+    """
+    Liefert eine dynamisch auf INT8 quantisierte Variante eines rembg-Modells
+
+    Die Variante wird beim ersten Aufruf neben dem Originalmodell abgelegt
+    und danach wiederverwendet.
+
+    Args:
+        model_name: Name des rembg-Modells
+
+    Returns:
+        Pfad zur quantisierten ONNX-Datei
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    session_class = next((cls for cls in sessions_class if cls.name() == model_name), None)
+    if session_class is None:
+        raise ValueError(f"No session class found for model '{model_name}'")
+
+    source_path = str(session_class.download_models())
+    target_path = os.path.splitext(source_path)[0] + '.int8.onnx'
+    if not os.path.exists(target_path):
+        print(f"Quantizing {model_name} to INT8: {target_path}", file=sys.stderr)
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        quantize_dynamic(source_path, temp_path, weight_type=QuantType.QUInt8)
+        os.replace(temp_path, target_path)
+    return target_path
+
+
+def model_label(session):
+    """Bezeichnung des Modells einer Session, quantisierte Varianten mit Suffix"""
+    name = getattr(session, 'model_name', MODEL_NAME)
+    return f"{name}-int8" if getattr(session, 'quantized', False) else name
+
+
+def create_session(model_name=MODEL_NAME, threads=None, inter_threads=None, optimization='all', providers=None,
+                   quantize=False):
+    """
+    Erstellt eine rembg-Session, die Modell und onnxruntime-Graph im Speicher hält
+
+    Args:
+        model_name: Name des rembg-Modells (siehe model_names)
+        threads: Anzahl der onnxruntime-Intra-Op-Threads (None = onnxruntime-Standard)
+        inter_threads: Anzahl der Inter-Op-Threads. Mehr als einer schaltet die parallele
+                       Ausführung unabhängiger Graphknoten ein (None = sequentiell)
+        optimization: Optimierungsstufe des Graphen aus GRAPH_OPTIMIZATION_LEVELS
+        providers: Liste der Execution Provider (None = automatische Auswahl durch rembg)
+        quantize: INT8-quantisierte Variante des Modells verwenden
+
+    Returns:
+        rembg-Session zur Wiederverwendung in remove_background
+    """
+    print(f"Loading model: {model_name}{' (int8)' if quantize else ''}", file=sys.stderr)
+    sess_opts = ort.SessionOptions()
+    sess_opts.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[optimization]
+    if threads:
+        sess_opts.intra_op_num_threads = threads
+        sess_opts.inter_op_num_threads = 1
+    if inter_threads and inter_threads > 1:
+        sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        sess_opts.inter_op_num_threads = inter_threads
+
+    kwargs = {'providers': list(providers)} if providers else {}
+    session = new_session(model_name, sess_opts=sess_opts, **kwargs)
+
+    if quantize:
+        # Vor- und Nachverarbeitung der Modellklasse bleiben erhalten, nur der Graph wird ersetzt
+        session.inner_session = ort.InferenceSession(quantized_model_path(model_name), sess_options=sess_opts,
+                                                     providers=session.inner_session.get_providers())
+        session.quantized = True
+    return session
+
+
+def _box_filter(array, radius):
+    """Mittelwert über ein (2r+1)x(2r+1)-Fenster per Integralbild, Ränder werden fortgesetzt"""
+    size = 2 * radius + 1
+    integral = np.pad(np.pad(array, radius, mode='edge').cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return (integral[size:, size:] - integral[:-size, size:]
+            - integral[size:, :-size] + integral[:-size, :-size]) / (size * size)
+
+
+def refine_mask(image, small_image, small_mask, radius=4, eps=1e-3):
+    """
+    Skaliert eine Maske mit einem Fast Guided Filter auf die Originalgröße
+
+    Die Filterkoeffizienten werden auf dem verkleinerten Bild berechnet und hochskaliert,
+    das Originalbild dient als Führungsbild. Kanten folgen dadurch den Bildkanten der
+    vollen Auflösung statt dem weichen Verlauf der hochskalierten Maske.
+
+    Args:
+        image: Originalbild (RGB)
+        small_image: Verkleinertes Bild, auf dem die Maske berechnet wurde
+        small_mask: Maske in der Größe von small_image (Modus L)
+        radius: Filterradius in Pixeln des verkleinerten Bildes
+        eps: Regularisierung, größere Werte glätten stärker
+
+    Returns:
+        Verfeinerte Maske in Originalgröße (Modus L)
+    """
+    guide = np.asarray(small_image.convert('L'), dtype=np.float64) / 255
+    alpha = np.asarray(small_mask, dtype=np.float64) / 255
+
+    mean_guide = _box_filter(guide, radius)
+    mean_alpha = _box_filter(alpha, radius)
+    covariance = _box_filter(guide * alpha, radius) - mean_guide * mean_alpha
+    variance = _box_filter(guide * guide, radius) - mean_guide * mean_guide
+
+    a = covariance / (variance + eps)
+    b = mean_alpha - a * mean_guide
+
+    # Koeffizienten glätten und auf die Originalgröße bringen
+    a = Image.fromarray(_box_filter(a, radius).astype(np.float32), 'F').resize(image.size, Image.BILINEAR)
+    b = Image.fromarray(_box_filter(b, radius).astype(np.float32), 'F').resize(image.size, Image.BILINEAR)
+
+    refined = np.asarray(a) * (np.asarray(image.convert('L'), dtype=np.float32) / 255)
+    refined += np.asarray(b)
+    return Image.fromarray((np.clip(refined, 0, 1) * 255 + 0.5).astype(np.uint8), 'L')
+
+
+def compute_mask(image, session=None, max_size=MAX_SIZE, refine=False):
+    """
+    Berechnet die Vordergrundmaske, bei großen Bildern auf einer verkleinerten Kopie
+
+    Args:
+        image: Bild (RGB) mit korrigierter Orientierung
+        session: Geladene rembg-Session
+        max_size: Maximale Kantenlänge für die Inferenz (0/None = volle Auflösung)
+        refine: Maske beim Hochskalieren mit dem Guided Filter an den Bildkanten ausrichten
+
+    Returns:
+        Maske in der Größe von image (Modus L)
+    """
+    small_image = image
+    if max_size and max(image.size) > max_size:
+        small_image = image.copy()
+        small_image.thumbnail((max_size, max_size), Image.BILINEAR)
+
+    mask = remove(small_image, session=session, only_mask=True)
+
+    if refine:
+        return refine_mask(image, small_image, mask)
+    if small_image is image:
+        return mask
+    return mask.resize(image.size, Image.BILINEAR)
+
+
+def load_image(input_data, session=None, max_size=MAX_SIZE, refine=False, cache=None):
+    """
+    Dekodiert ein Bild und berechnet seine Vordergrundmaske
+
+    Bei großen Bildern wird die Maske auf einer verkleinerten Kopie berechnet und auf die
+    Originalgröße gebracht. Mit Cache wird eine bereits berechnete Maske wiederverwendet.
+
+    Args:
+        input_data: Kodiertes Eingabebild
+        session: Geladene rembg-Session
+        max_size: Maximale Kantenlänge für die Inferenz (0/None = volle Auflösung)
+        refine: Kanten beim Hochskalieren der Maske verfeinern
+        cache: Optionaler MaskCache
+
+    Returns:
+        Tuple aus Bild (RGBA, Orientierung laut EXIF korrigiert) und Maske (Modus L)
+    """
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(input_data))).convert('RGBA')
+
+    mask = None
+    if cache is not None:
+        settings = {'model': model_label(session), 'max_size': max_size, 'refine': refine}
+        mask = cache.get(input_data, image, settings)
+
+    if mask is None:
+        mask = compute_mask(image, session, max_size, refine)
+        if cache is not None:
+            cache.put(input_data, image, settings, mask)
+
+    return image, mask
+
+
+def render_outputs(image, mask, outputs=('cutout',), bgcolor=BG_COLOR, crop_padding=0):
+    """
+    Leitet aus Bild und Maske die gewünschten Ausgaben ab, ohne das Modell erneut auszuführen
+
+    Args:
+        image: Bild (RGBA)
+        mask: Vordergrundmaske (Modus L)
+        outputs: Auszugebende Arten aus OUTPUT_KINDS
+        bgcolor: Hintergrundfarbe für 'composite' (Farbname, '#rrggbb' oder RGB-Tuple)
+        crop_padding: Rand in Pixeln um das Motiv für 'crop'
+
+    Returns:
+        Dictionary von Ausgabeart auf Bild
+    """
+    unknown = set(outputs) - set(OUTPUT_KINDS)
+    if unknown:
+        raise ValueError(f"Unsupported outputs: {', '.join(sorted(unknown))}")
+
+    rendered = {}
+    cutout = None
+    if 'cutout' in outputs or 'crop' in outputs:
+        # Wie rembg: Hintergrundpixel komplett transparent, damit die Ausgabe klein bleibt
+        cutout = Image.composite(image, Image.new('RGBA', image.size, 0), mask)
+
+    for kind in outputs:
+        if kind == 'mask':
+            rendered[kind] = mask
+        elif kind == 'cutout':
+            rendered[kind] = cutout
+        elif kind == 'crop':
+            # Schwache Maskenreste am Rand sollen die Box nicht aufblähen
+            box = mask.point(lambda value: 255 if value > CROP_THRESHOLD else 0).getbbox()
+            if box is None:
+                rendered[kind] = cutout
+            else:
+                left, top, right, bottom = box
+                rendered[kind] = cutout.crop((max(0, left - crop_padding), max(0, top - crop_padding),
+                                              min(image.width, right + crop_padding),
+                                              min(image.height, bottom + crop_padding)))
+        elif kind == 'composite':
+            color = ImageColor.getrgb(bgcolor) if isinstance(bgcolor, str) else tuple(bgcolor)
+            composite = Image.new('RGB', image.size, color[:3])
+            composite.paste(image.convert('RGB'), mask=mask)
+            rendered[kind] = composite
+
+    return rendered
+
+
+def encode_image(image, format='png', compress_level=PNG_COMPRESS_LEVEL, quality=WEBP_QUALITY):
+    """
+    Kodiert ein Bild im Speicher
+
+    Args:
+        image: Zu kodierendes Bild
+        format: 'png' oder 'webp'
+        compress_level: zlib-Stufe für PNG (0 = unkomprimiert, 9 = kleinste Datei)
+        quality: WebP-Qualität (100 = verlustfrei)
+
+    Returns:
+        Kodierte Bilddaten
+    """
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {format}")
+
+    output = io.BytesIO()
+    if format == 'webp':
+        image.save(output, format='WEBP', quality=quality, lossless=quality >= 100)
+    else:
+        image.save(output, format='PNG', compress_level=compress_level)
+    return output.getvalue()
+
+
+def remove_background_outputs(input_data, session=None, max_size=MAX_SIZE, refine=False, format='png',
+                              compress_level=PNG_COMPRESS_LEVEL, quality=WEBP_QUALITY, outputs=('cutout',),
+                              bgcolor=BG_COLOR, crop_padding=0, cache=None):
+    """
+    Berechnet die Maske einmal und kodiert daraus alle gewünschten Ausgaben im Speicher
+
+    Args:
+        input_data: Kodiertes Eingabebild
+        session: Geladene rembg-Session
+        max_size: Maximale Kantenlänge für die Inferenz (0/None = volle Auflösung)
+        refine: Kanten beim Hochskalieren der Maske verfeinern
+        format: Ausgabeformat ('png' oder 'webp')
+        compress_level: zlib-Stufe für PNG
+        quality: WebP-Qualität (100 = verlustfrei)
+        outputs: Auszugebende Arten aus OUTPUT_KINDS
+        bgcolor: Hintergrundfarbe für 'composite'
+        crop_padding: Rand in Pixeln um das Motiv für 'crop'
+        cache: Optionaler MaskCache
+
+    Returns:
+        Dictionary von Ausgabeart auf kodierte Bilddaten, in der Reihenfolge von outputs
+    """
+    image, mask = load_image(input_data, session, max_size, refine, cache)
+    rendered = render_outputs(image, mask, outputs, bgcolor, crop_padding)
+    return {kind: encode_image(rendered[kind], format, compress_level, quality) for kind in outputs}
+
+
+def remove_background_data(input_data, session=None, max_size=MAX_SIZE, refine=False, format='png',
+                           compress_level=PNG_COMPRESS_LEVEL, quality=WEBP_QUALITY, cache=None):
+    """
+    Entfernt den Hintergrund vollständig im Speicher, ohne Umweg über Dateien
+
+    Args:
+        input_data: Kodiertes Eingabebild
+        session: Geladene rembg-Session
+        max_size: Maximale Kantenlänge für die Inferenz (0/None = volle Auflösung)
+        refine: Kanten beim Hochskalieren der Maske verfeinern
+        format: Ausgabeformat ('png' oder 'webp')
+        compress_level: zlib-Stufe für PNG
+        quality: WebP-Qualität (100 = verlustfrei)
+        cache: Optionaler MaskCache
+
+    Returns:
+        Kodierte Bilddaten des freigestellten Bildes
+    """
+    return remove_background_outputs(input_data, session, max_size, refine, format, compress_level, quality,
+                                     cache=cache)['cutout']
+
+
+def output_files(output_path, outputs):
+    """
+    Bildet die Ausgabearten auf Dateipfade ab
+
+    Die freigestellte Version behält den angegebenen Pfad, weitere Ausgaben erhalten
+    die Art als Suffix, z.B. bild.png, bild-mask.png und bild-crop.png.
+    """
+    root, extension = os.path.splitext(output_path)
+    if len(outputs) == 1:
+        return {outputs[0]: output_path}
+    return {kind: output_path if kind == 'cutout' else f"{root}-{kind}{extension}" for kind in outputs}
+
+
+def remove_background(input_path, output_path, session=None, max_size=MAX_SIZE, refine=False, format='png',
+                      compress_level=PNG_COMPRESS_LEVEL, quality=WEBP_QUALITY, outputs=('cutout',),
+                      bgcolor=BG_COLOR, crop_padding=0, cache=None):
     """
     Entfernt den Hintergrund eines Bildes mit dem rembg-Paket
-    
+
     Args:
-        input_path: Pfad zum Eingabebild
-        output_path: Pfad für das Ausgabebild mit transparentem Hintergrund
+        input_path: Pfad zum Eingabebild ('-' = stdin)
+        output_path: Pfad für das Ausgabebild mit transparentem Hintergrund ('-' = stdout,
+                     nur bei einer einzelnen Ausgabe). Weitere Ausgaben siehe output_files.
+        session: Bereits geladene rembg-Session. Ohne Session lädt rembg das
+                 Modell bei jedem Aufruf neu.
+        max_size: Maximale Kantenlänge für die Maskenberechnung (0/None = volle Auflösung)
+        refine: Kanten beim Hochskalieren der Maske verfeinern
+        format: Ausgabeformat ('png' oder 'webp')
+        compress_level: zlib-Stufe für PNG
+        quality: WebP-Qualität (100 = verlustfrei)
+        outputs: Auszugebende Arten aus OUTPUT_KINDS
+        bgcolor: Hintergrundfarbe für 'composite'
+        crop_padding: Rand in Pixeln um das Motiv für 'crop'
+        cache: Optionaler MaskCache
     """
     try:
         # Bildpfad aus Befehlszeilenargumenten lesen
         print(f"Processing image: {input_path}", file=sys.stderr)
-        
+
+        if output_path == '-' and len(outputs) > 1:
+            raise ValueError("Multiple outputs cannot be written to stdout")
+
         # Bild einlesen
-        with open(input_path, 'rb') as input_file:
-            input_data = input_file.read()
-            
+        if input_path == '-':
+            input_data = sys.stdin.buffer.read()
+        else:
+            with open(input_path, 'rb') as input_file:
+                input_data = input_file.read()
+
         # Hintergrund mit rembg entfernen
-        output_data = remove(input_data)
-        
-        # Ausgabe speichern
-        with open(output_path, 'wb') as output_file:
-            output_file.write(output_data)
-            
+        output_data = remove_background_outputs(input_data, session, max_size, refine, format, compress_level,
+                                                quality, outputs, bgcolor, crop_padding, cache)
+
+        # Ausgaben speichern
+        for kind, path in output_files(output_path, outputs).items():
+            if path == '-':
+                sys.stdout.buffer.write(output_data[kind])
+                sys.stdout.buffer.flush()
+            else:
+                with open(path, 'wb') as output_file:
+                    output_file.write(output_data[kind])
+
         print(f"Background removed successfully. Output saved to: {output_path}", file=sys.stderr)
         return True
-        
+
     except Exception as e:
         print(f"Error removing background: {str(e)}", file=sys.stderr)
         return False
 
+
+def collect_inputs(source):
+    """
+    Ermittelt die Eingabebilder für den Batch-Modus
+
+    Args:
+        source: Verzeichnis, Glob-Muster oder Manifest-Datei mit einem Bildpfad
+                pro Zeile (relative Pfade beziehen sich auf das Manifest)
+
+    Returns:
+        Sortierte Liste der Bildpfade
+    """
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+
+    if os.path.isfile(source) and os.path.splitext(source)[1].lower() not in IMAGE_EXTENSIONS:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r', encoding='utf-8') as manifest:
+            lines = [line.strip() for line in manifest]
+        return [os.path.join(base_dir, line) for line in lines if line and not line.startswith('#')]
+
+    return sorted(path for path in glob.glob(source, recursive=True)
+                  if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def output_paths(input_paths, output_dir, extension='.png'):
+    """
+    Bildet Eingabepfade auf Ausgabepfade ab und erhält dabei die Unterverzeichnisse
+    relativ zum gemeinsamen Basisverzeichnis, damit gleichnamige Dateien sich nicht überschreiben
+    """
+    if not input_paths:
+        return []
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_paths])
+    return [os.path.join(output_dir, os.path.splitext(os.path.relpath(os.path.abspath(path), base_dir))[0] + extension)
+            for path in input_paths]
+
+
+def process_file(session, input_path, output_path, options=None, cache=None):
+    """
+    Entfernt den Hintergrund eines Bildes und misst die Laufzeit
+
+    Args:
+        session: Geladene rembg-Session
+        input_path: Pfad zum Eingabebild
+        output_path: Pfad für das Ausgabebild
+        options: Weitere Argumente für remove_background (Schlüssel aus JOB_OPTIONS)
+        cache: Optionaler MaskCache
+
+    Returns:
+        Status-Dictionary für den Batch-Bericht
+    """
+    start = time.perf_counter()
+    if not os.path.isfile(input_path):
+        success, error = False, f"Input file not found: {input_path}"
+    else:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        success = remove_background(input_path, output_path, session, **(options or {}), cache=cache)
+        error = None if success else "Error removing background"
+
+    status = {"input": input_path, "output": output_path if success else None,
+              "success": success, "seconds": round(time.perf_counter() - start, 3)}
+    outputs = (options or {}).get('outputs', ('cutout',))
+    if success and len(outputs) > 1:
+        status["outputs"] = output_files(output_path, outputs)
+    if error:
+        status["error"] = error
+    return status
+
+
+# Session und Cache des Prozess-Workers, werden im Initializer einmal pro Prozess angelegt
+_worker_session = None
+_worker_cache = None
+
+
+def _init_worker(threads, session_options, cache):
+    global _worker_session, _worker_cache
+    _worker_session = create_session(threads=threads, **session_options)
+    _worker_cache = cache
+
+
+def _process_in_worker(input_path, output_path, options):
+    return process_file(_worker_session, input_path, output_path, options, _worker_cache)
+
+
+def batch_remove(input_paths, output_dir, workers=2, pool='thread', threads=None, report_path=None, options=None,
+                 cache=None, session_options=None):
+    """
+    Entfernt den Hintergrund vieler Bilder mit einem Worker-Pool
+
+    Im Thread-Pool teilen sich alle Worker eine Session und deren onnxruntime-Threadpool,
+    Dekodieren und Kodieren überlappen dabei mit der Inferenz. Im Prozess-Pool lädt jeder
+    Prozess seine eigene Session, die CPU-Kerne werden auf die Prozesse aufgeteilt.
+
+    Args:
+        input_paths: Liste der Eingabebilder
+        output_dir: Ausgabeverzeichnis
+        workers: Anzahl gleichzeitig verarbeiteter Bilder
+        pool: 'thread' oder 'process'
+        threads: onnxruntime-Intra-Op-Threads pro Session (None = automatisch)
+        report_path: Pfad des JSON-Berichts (None = report.json im Ausgabeverzeichnis)
+        options: Weitere Argumente für remove_background (Schlüssel aus JOB_OPTIONS)
+        cache: Optionaler MaskCache, im Prozess-Pool arbeitet jeder Prozess mit einer Kopie
+        session_options: Weitere Argumente für create_session (Modell, Provider, Optimierung)
+
+    Returns:
+        Bericht als Dictionary mit Status und Laufzeit jeder Datei
+    """
+    workers = max(1, workers)
+    session_options = session_options or {}
+    if threads is None:
+        # Threads teilen sich den Intra-Op-Pool der einen Session, Prozesse brauchen je einen eigenen
+        cpu_count = os.cpu_count() or 1
+        threads = cpu_count if pool == 'thread' else max(1, cpu_count // workers)
+    os.makedirs(output_dir, exist_ok=True)
+
+    outputs = output_paths(input_paths, output_dir, '.' + (options or {}).get('format', 'png'))
+    total = len(input_paths)
+    print(f"Processing {total} images with {workers} {pool} worker(s), {threads} onnxruntime thread(s) each",
+          file=sys.stderr)
+
+    start = time.perf_counter()
+    if pool == 'process':
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(threads, session_options, cache))
+        submit = lambda input_path, output_path: executor.submit(_process_in_worker, input_path, output_path, options)
+    else:
+        session = create_session(threads=threads, **session_options)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        submit = lambda input_path, output_path: executor.submit(process_file, session, input_path, output_path,
+                                                                      options, cache)
+
+    results = []
+    with executor:
+        futures = {submit(input_path, output_path): index
+                   for index, (input_path, output_path) in enumerate(zip(input_paths, outputs))}
+        for done, future in enumerate(as_completed(futures), start=1):
+            status = future.result()
+            results.append((futures[future], status))
+            state = "ok" if status["success"] else f"failed ({status['error']})"
+            print(f"[{done}/{total}] {os.path.basename(status['input'])}: {state} in {status['seconds']:.2f}s",
+                  file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    files = [status for _, status in sorted(results, key=lambda item: item[0])]
+    succeeded = sum(1 for status in files if status["success"])
+    report = {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": total - succeeded,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(total / elapsed, 3) if elapsed > 0 else None,
+        "workers": workers,
+        "pool": pool,
+        "threads": threads,
+        "model": session_options.get('model_name', MODEL_NAME) + ('-int8' if session_options.get('quantize') else ''),
+        "files": files,
+    }
+    if cache is not None:
+        report["mask_cache"] = cache.stats()
+
+    report_path = report_path or os.path.join(output_dir, 'report.json')
+    with open(report_path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Processed {succeeded}/{total} images in {elapsed:.1f}s, report saved to: {report_path}", file=sys.stderr)
+    return report
+
+
+def merge_options(options, job):
+    """
+    Kombiniert die Standardoptionen des Dienstes mit den Angaben eines Auftrags
+
+    Args:
+        options: Standardwerte für die Schlüssel aus JOB_OPTIONS
+        job: Auftrag bzw. Rahmenkopf
+
+    Returns:
+        Optionen für remove_background, 'outputs' als Tuple
+    """
+    merged = {**(options or {}), **{key: job[key] for key in JOB_OPTIONS if key in job}}
+    if isinstance(merged.get('outputs'), str):
+        merged['outputs'] = tuple(kind.strip() for kind in merged['outputs'].split(',') if kind.strip())
+    elif 'outputs' in merged:
+        merged['outputs'] = tuple(merged['outputs'])
+    return merged
+
+
+def run_job(session, line, options=None, cache=None):
+    """
+    Verarbeitet einen einzelnen Auftrag des Dienstmodus
+
+    Args:
+        session: Geladene rembg-Session
+        line: JSON-Zeile mit 'input', 'output' und optional 'id' sowie den Schlüsseln aus JOB_OPTIONS
+        options: Standardwerte für die Schlüssel aus JOB_OPTIONS
+        cache: Optionaler MaskCache
+
+    Returns:
+        Antwort-Dictionary mit 'id', 'success', den Pfaden je Ausgabeart und ggf. 'error'
+    """
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": None, "success": False, "error": f"Invalid job: {e}"}
+
+    job_id = job.get("id")
+    input_path = job.get("input")
+    output_path = job.get("output")
+
+    if not input_path or not output_path:
+        return {"id": job_id, "success": False, "error": "Job requires 'input' and 'output'"}
+    if not os.path.isfile(input_path):
+        return {"id": job_id, "success": False, "error": f"Input file not found: {input_path}"}
+
+    job_options = merge_options(options, job)
+    if not remove_background(input_path, output_path, session, **job_options, cache=cache):
+        return {"id": job_id, "success": False, "error": "Error removing background"}
+
+    response = {"id": job_id, "success": True, "output": output_path,
+                "outputs": output_files(output_path, job_options.get('outputs', ('cutout',)))}
+    if cache is not None:
+        response["mask_cache"] = cache.stats()
+    return response
+
+
+def read_frame(stream):
+    """
+    Liest einen Rahmen des Binärprotokolls
+
+    Returns:
+        Tuple aus JSON-Kopf und Bilddaten oder None am Ende des Streams
+    """
+    prefix = stream.read(FRAME_HEADER.size)
+    if len(prefix) < FRAME_HEADER.size:
+        return None
+    header_length, data_length = FRAME_HEADER.unpack(prefix)
+    header = stream.read(header_length)
+    data = stream.read(data_length)
+    if len(header) < header_length or len(data) < data_length:
+        return None
+    return json.loads(header), data
+
+
+def write_frame(stream, header, data=b''):
+    """Schreibt einen Rahmen des Binärprotokolls: Längenpräfix, JSON-Kopf und Bilddaten"""
+    header = json.dumps(header).encode('utf-8')
+    stream.write(FRAME_HEADER.pack(len(header), len(data)))
+    stream.write(header)
+    stream.write(data)
+    stream.flush()
+
+
+def run_frame(session, header, data, options=None, cache=None):
+    """
+    Verarbeitet einen Auftrag des Binärprotokolls vollständig im Speicher
+
+    Args:
+        session: Geladene rembg-Session
+        header: JSON-Kopf mit optional 'id' und den Schlüsseln aus JOB_OPTIONS
+        data: Kodiertes Eingabebild
+        options: Standardwerte für die Schlüssel aus JOB_OPTIONS
+        cache: Optionaler MaskCache
+
+    Returns:
+        Tuple aus Antwortkopf und kodierten Ergebnissen. Bei mehreren Ausgaben werden die
+        Bilddaten aneinandergehängt, 'outputs' im Kopf nennt Art und Länge jedes Teils.
+    """
+    job_id = header.get("id")
+    job_options = merge_options(options, header)
+    start = time.perf_counter()
+    try:
+        output_data = remove_background_outputs(data, session, **job_options, cache=cache)
+    except Exception as e:
+        print(f"Error removing background: {str(e)}", file=sys.stderr)
+        return {"id": job_id, "success": False, "error": str(e)}, b''
+
+    response = {"id": job_id, "success": True, "format": job_options.get('format', 'png'),
+                "outputs": [{"kind": kind, "size": len(encoded)} for kind, encoded in output_data.items()],
+                "seconds": round(time.perf_counter() - start, 3)}
+    if cache is not None:
+        response["mask_cache"] = cache.stats()
+    return response, b''.join(output_data.values())
+
+
+def handle_stream(session, rfile, wfile, options=None, binary=False, cache=None):
+    """
+    Beantwortet Aufträge eines Streams, bis dieser endet
+
+    Args:
+        session: Geladene rembg-Session
+        rfile: Binärer Eingabestream
+        wfile: Binärer Ausgabestream
+        options: Standardwerte für die Schlüssel aus JOB_OPTIONS
+        binary: Binärprotokoll mit Längenpräfix statt JSON-Zeilen mit Dateipfaden
+        cache: Optionaler MaskCache
+    """
+    if not binary:
+        for line in rfile:
+            if not line.strip():
+                continue
+            wfile.write((json.dumps(run_job(session, line, options, cache)) + "\n").encode("utf-8"))
+            wfile.flush()
+        return
+
+    while True:
+        try:
+            frame = read_frame(rfile)
+        except json.JSONDecodeError as e:
+            write_frame(wfile, {"id": None, "success": False, "error": f"Invalid job: {e}"})
+            continue
+        if frame is None:
+            return
+        write_frame(wfile, *run_frame(session, *frame, options, cache))
+
+
+def serve(session, socket_path=None, options=None, binary=False, cache=None):
+    """
+    Startet den Dienstmodus, in dem die Session für alle Aufträge geladen bleibt
+
+    Aufträge werden von stdin oder von Clients eines Unix-Sockets gelesen, jeder Auftrag
+    erhält genau eine Antwort. Im Textprotokoll ist jeder Auftrag eine JSON-Zeile mit
+    Dateipfaden. Im Binärprotokoll enthält jeder Rahmen einen JSON-Kopf und die Bilddaten,
+    die Antwort das kodierte Ergebnis, ohne dass Dateien auf der Platte anfallen.
+
+    Args:
+        session: Geladene rembg-Session
+        socket_path: Pfad des Unix-Sockets. Ohne Pfad werden Aufträge von stdin
+                     gelesen und Antworten nach stdout geschrieben.
+        options: Standardwerte für die Schlüssel aus JOB_OPTIONS
+        binary: Binärprotokoll mit Längenpräfix verwenden
+        cache: Optionaler MaskCache
+    """
+    ready = {"event": "ready", "model": model_label(session)}
+
+    if socket_path is None:
+        protocol_out = sys.stdout.buffer
+
+        # stdout ist für Antworten reserviert, Statusmeldungen gehen nach stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            if binary:
+                write_frame(protocol_out, ready)
+            else:
+                protocol_out.write((json.dumps(ready) + "\n").encode("utf-8"))
+                protocol_out.flush()
+            handle_stream(session, sys.stdin.buffer, protocol_out, options, binary, cache)
+        return
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                handle_stream(session, self.rfile, self.wfile, options, binary, cache)
+            except (BrokenPipeError, ConnectionResetError):
+                print("Client disconnected before the job finished", file=sys.stderr)
+
+    # Veralteten Socket eines vorherigen Dienstes entfernen
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # Aufträge werden nacheinander verarbeitet, da sie sich die Session teilen
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        print(f"Background removal service listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Remove the background of an image with rembg')
+    parser.add_argument('input', nargs='?', help="Input image path ('-' = stdin)")
+    parser.add_argument('output', nargs='?', help="Output image path ('-' = stdout)")
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep the model loaded and read jobs as JSON lines from stdin (or --socket)')
+    parser.add_argument('--socket', help='Unix socket path to listen on in --serve mode')
+    parser.add_argument('--binary', action='store_true',
+                        help='Use length-prefixed frames carrying the image bytes in --serve mode instead of file paths')
+    parser.add_argument('--batch', metavar='SOURCE',
+                        help='Process a directory, glob pattern or manifest file (one image path per line)')
+    parser.add_argument('-o', '--output-dir', default='output', help='Output directory in --batch mode')
+    parser.add_argument('-w', '--workers', type=int, default=2, help='Images processed concurrently (default: 2)')
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                        help='Worker pool type: threads share one session, processes load one each (default: thread)')
+    parser.add_argument('--threads', type=int,
+                        help='onnxruntime intra-op threads per session (default: all cores, split across processes)')
+    parser.add_argument('--report', help='Path of the JSON summary report (default: <output-dir>/report.json)')
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE,
+                        help=f'Longest side used for mask inference, larger images are downscaled; '
+                             f'1024 matches the internal resolution of the rembg models '
+                             f'(default: {MAX_SIZE} = full resolution)')
+    parser.add_argument('--refine', action='store_true',
+                        help='Refine mask edges against the full-resolution image when upscaling')
+    parser.add_argument('-f', '--format', choices=list(OUTPUT_FORMATS), default='png',
+                        help='Output format (default: png)')
+    parser.add_argument('--compress-level', type=int, default=PNG_COMPRESS_LEVEL, choices=range(10), metavar='0-9',
+                        help=f'PNG zlib compression level (default: {PNG_COMPRESS_LEVEL})')
+    parser.add_argument('--quality', type=int, default=WEBP_QUALITY,
+                        help=f'WebP quality, 100 = lossless (default: {WEBP_QUALITY})')
+    parser.add_argument('--outputs', default='cutout',
+                        help=f"Comma-separated outputs computed from one mask: {', '.join(OUTPUT_KINDS)} "
+                             f"(default: cutout). Extra outputs are written next to the output as <name>-<kind>.<ext>")
+    parser.add_argument('--bgcolor', default=BG_COLOR,
+                        help=f'Background colour for the composite output, name or #rrggbb (default: {BG_COLOR})')
+    parser.add_argument('--crop-padding', type=int, default=0,
+                        help='Padding in pixels around the subject for the crop output (default: 0)')
+    parser.add_argument('-m', '--model', default=MODEL_NAME, choices=model_names(), metavar='MODEL',
+                        help=f"rembg model, e.g. bria-rmbg, u2net, u2netp, isnet-general-use (default: {MODEL_NAME})")
+    parser.add_argument('--quantize', action='store_true',
+                        help='Use a dynamically INT8-quantized copy of the model (created on first use)')
+    parser.add_argument('--providers',
+                        help='Comma-separated onnxruntime execution providers (default: chosen by rembg)')
+    parser.add_argument('--optimization', choices=list(GRAPH_OPTIMIZATION_LEVELS), default='all',
+                        help='onnxruntime graph optimization level (default: all)')
+    parser.add_argument('--inter-threads', type=int,
+                        help='onnxruntime inter-op threads, more than one enables parallel execution (default: 1)')
+    parser.add_argument('--cache-dir', help='Cache computed masks in this directory (disabled by default)')
+    parser.add_argument('--cache-max-mb', type=int, default=512, help='Size limit of the mask cache in MB (default: 512)')
+    parser.add_argument('--perceptual-cache', action='store_true',
+                        help='Also match re-encoded copies of cached images by their perceptual hash '
+                             '(hits are verified against a 32x32 thumbnail of the original)')
+    args = parser.parse_args()
+
+    options = {'max_size': args.max_size, 'refine': args.refine, 'format': args.format,
+               'compress_level': args.compress_level, 'quality': args.quality,
+               'outputs': tuple(kind.strip() for kind in args.outputs.split(',') if kind.strip()),
+               'bgcolor': args.bgcolor, 'crop_padding': args.crop_padding}
+
+    unknown = set(options['outputs']) - set(OUTPUT_KINDS)
+    if unknown or not options['outputs']:
+        parser.error(f"--outputs must be a comma-separated subset of: {', '.join(OUTPUT_KINDS)}")
+    cache = MaskCache(args.cache_dir, args.cache_max_mb, args.perceptual_cache) if args.cache_dir else None
+    session_options = {'model_name': args.model, 'inter_threads': args.inter_threads,
+                       'optimization': args.optimization, 'quantize': args.quantize,
+                       'providers': args.providers.split(',') if args.providers else None}
+
+    # Dienstmodus: Session einmal laden und Aufträge entgegennehmen
+    if args.serve:
+        serve(create_session(threads=args.threads, **session_options), args.socket, options, args.binary, cache)
+        sys.exit(0)
+
+    # Batch-Modus: viele Bilder mit einem Worker-Pool verarbeiten
+    if args.batch:
+        input_paths = collect_inputs(args.batch)
+        if not input_paths:
+            print(f"No images found for: {args.batch}", file=sys.stderr)
+            sys.exit(1)
+        report = batch_remove(input_paths, args.output_dir, args.workers, args.pool, args.threads, args.report,
+                              options, cache, session_options)
+        sys.exit(0 if report["failed"] == 0 else 1)
+
     # Überprüfen, ob genügend Befehlszeilenargumente vorhanden sind
-    if len(sys.argv) != 3:
+    if not args.input or not args.output:
         print("Usage: python remove_bg.py <input_image_path> <output_image_path>", file=sys.stderr)
         sys.exit(1)
-        
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
+
+    input_path = args.input
+    output_path = args.output
+
     # Überprüfen, ob die Eingabedatei existiert
-    if not os.path.isfile(input_path):
+    if input_path != '-' and not os.path.isfile(input_path):
         print(f"Input file not found: {input_path}", file=sys.stderr)
         sys.exit(1)
-        
+
     # Hintergrund entfernen
-    success = remove_background(input_path, output_path)
-    
+    success = remove_background(input_path, output_path, create_session(threads=args.threads, **session_options),
+                                **options, cache=cache)
+
     # Exitcode basierend auf Erfolg
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
@@ -5,8 +5,6 @@ const cors = require('cors');
 const path = require('path');
 const multer = require('multer');
 const { spawn } = require('child_process');
-const fs = require('fs');
-const os = require('os');
 
 const app = express();
 const PORT = process.env.PORT || 4991;
@@ -15,24 +13,8 @@ const PORT = process.env.PORT || 4991;
 app.use(cors());
 app.use(express.json());
 
-// Temporärer Speicherort für Uploads
-const uploadDir = path.join(os.tmpdir(), 'objectcut-uploads');
-if (!fs.existsSync(uploadDir)) {
-    fs.mkdirSync(uploadDir, { recursive: true });
-}
-
-// Multer-Konfiguration für Datei-Uploads
-const storage = multer.diskStorage({
-    destination: (req, file, cb) => {
-        cb(null, uploadDir);
-    },
-    filename: (req, file, cb) => {
-        // Eindeutigen Dateinamen generieren
-        const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
-        const ext = path.extname(file.originalname);
-        cb(null, 'input-' + uniqueSuffix + ext);
-    }
-});
+// Uploads bleiben im Speicher und gehen direkt an den Python-Dienst, ohne Umweg über die Platte
+const storage = multer.memoryStorage();
 
 const upload = multer({
     storage,
@@ -49,6 +31,140 @@ const upload = multer({
     }
 });
 
+// Unterstützte Ausgabeformate
+const OUTPUT_TYPES = {
+    png: 'image/png',
+    webp: 'image/webp'
+};
+
+// Ausgaben, die der Python-Dienst aus einer Maskenberechnung ableiten kann
+const OUTPUT_KINDS = ['cutout', 'mask', 'crop', 'composite'];
+
+// Residenter Python-Dienst, der die rembg-Session zwischen Anfragen geladen hält
+const PYTHON_PATH = '/var/www/html/objectcut-react/venv/bin/python3';
+let worker = null;
+let nextJobId = 1;
+const pendingJobs = new Map();
+// Höchstdauer eines Auftrags, danach erhält die Anfrage einen Fehler statt ewig zu warten
+const JOB_TIMEOUT_MS = parseInt(process.env.OBJECTCUT_JOB_TIMEOUT_MS, 10) || 120000;
+
+// Binärprotokoll: Länge des JSON-Kopfs und der Bilddaten (je uint32, Big Endian), dann beide Teile
+function encodeFrame(header, data) {
+    const headerBuffer = Buffer.from(JSON.stringify(header));
+    const prefix = Buffer.alloc(8);
+    prefix.writeUInt32BE(headerBuffer.length, 0);
+    prefix.writeUInt32BE(data.length, 4);
+    return Buffer.concat([prefix, headerBuffer, data]);
+}
+
+function getWorker() {
+    if (worker) {
+        return worker;
+    }
+
+    const args = [path.join(__dirname, 'remove_bg.py'), '--serve', '--binary'];
+    // Modell und Variante optional per Umgebungsvariable wählen
+    if (process.env.OBJECTCUT_MODEL) {
+        args.push('--model', process.env.OBJECTCUT_MODEL);
+    }
+    if (process.env.OBJECTCUT_QUANTIZE === '1') {
+        args.push('--quantize');
+    }
+    // Große Bilder für die Maskenberechnung verkleinern (z.B. 1024)
+    if (process.env.OBJECTCUT_MAX_SIZE) {
+        args.push('--max-size', process.env.OBJECTCUT_MAX_SIZE);
+    }
+    // Masken wiederholt hochgeladener Bilder aus dem Cache verwenden
+    if (process.env.OBJECTCUT_CACHE_DIR) {
+        args.push('--cache-dir', process.env.OBJECTCUT_CACHE_DIR);
+        // Neu kodierte Kopien nur auf ausdrücklichen Wunsch über den Perceptual-Hash erkennen
+        if (process.env.OBJECTCUT_PERCEPTUAL_CACHE === '1') {
+            args.push('--perceptual-cache');
+        }
+    }
+
+    const proc = spawn(PYTHON_PATH, args);
+    worker = proc;
+    console.log(`Background removal worker started (pid ${proc.pid})`);
+
+    // Antworten rahmenweise lesen und dem wartenden Auftrag zuordnen
+    let buffer = Buffer.alloc(0);
+    proc.stdout.on('data', (data) => {
+        buffer = Buffer.concat([buffer, data]);
+        while (buffer.length >= 8) {
+            const headerLength = buffer.readUInt32BE(0);
+            const dataLength = buffer.readUInt32BE(4);
+            const frameLength = 8 + headerLength + dataLength;
+            if (buffer.length < frameLength) {
+                break;
+            }
+            let message;
+            try {
+                message = JSON.parse(buffer.subarray(8, 8 + headerLength).toString());
+            } catch (err) {
+                console.error('Invalid worker response header');
+                message = { id: null, success: false, error: 'Invalid worker response header' };
+            }
+            const result = Buffer.from(buffer.subarray(8 + headerLength, frameLength));
+            buffer = buffer.subarray(frameLength);
+
+            if (message.event === 'ready') {
+                console.log(`Background removal worker ready (model: ${message.model})`);
+                continue;
+            }
+            // Der Dienst beantwortet Rahmen der Reihe nach, eine Antwort ohne ID (z.B. auf einen
+            // unlesbaren Rahmen) gehört daher zum ältesten offenen Auftrag
+            const id = message.id == null ? pendingJobs.keys().next().value : message.id;
+            const job = pendingJobs.get(id);
+            if (!job) {
+                console.error(`Worker response for unknown job ${message.id}`);
+                continue;
+            }
+            pendingJobs.delete(id);
+            clearTimeout(job.timer);
+            job.resolve({ ...message, data: result });
+        }
+    });
+
+    proc.stderr.on('data', (data) => {
+        console.log(`Python stderr: ${data}`);
+    });
+
+    // Bei Absturz offene Aufträge beenden, der nächste Auftrag startet den Dienst neu
+    const handleExit = (reason) => {
+        if (worker !== proc) {
+            return;
+        }
+        console.error(`Background removal worker stopped: ${reason}`);
+        worker = null;
+        pendingJobs.forEach((job) => {
+            clearTimeout(job.timer);
+            job.resolve({ success: false, error: `Worker stopped: ${reason}` });
+        });
+        pendingJobs.clear();
+    };
+    proc.on('error', (err) => handleExit(err.message));
+    proc.on('exit', (code, signal) => handleExit(signal || `exit code ${code}`));
+    proc.stdin.on('error', (err) => handleExit(err.message));
+
+    return proc;
+}
+
+function removeBackground(imageData, options = {}) {
+    return new Promise((resolve) => {
+        const id = nextJobId++;
+        const job = { resolve };
+        // Nach Ablauf der Frist antwortet die Anfrage mit einem Fehler. Der Auftrag bleibt bis zur
+        // Antwort des Dienstes eingetragen, damit die Zuordnung über die Reihenfolge stimmt.
+        job.timer = setTimeout(() => {
+            job.resolve = () => {};
+            resolve({ success: false, error: `Timeout after ${JOB_TIMEOUT_MS} ms` });
+        }, JOB_TIMEOUT_MS);
+        pendingJobs.set(id, job);
+        getWorker().stdin.write(encodeFrame({ id, ...options }, imageData));
+    });
+}
+
 // API-Route für die Hintergrundentfernung
 app.post('/api/remove-background', upload.single('image'), async (req, res) => {
     try {
@@ -56,69 +172,55 @@ app.post('/api/remove-background', upload.single('image'), async (req, res) => {
             return res.status(400).json({ error: 'Keine Bilddatei hochgeladen' });
         }
 
-        const inputPath = req.file.path;
-        const outputPath = path.join(uploadDir, 'output-' + path.basename(inputPath));
-
-        console.log(`Processing image: ${inputPath}`);
-        console.log(`Output will be saved to: ${outputPath}`);
+        // Ausgabeformat optional per Query oder Formularfeld wählen (Standard: PNG)
+        const format = (req.query.format || req.body.format || 'png').toLowerCase();
+        if (!OUTPUT_TYPES[format]) {
+            return res.status(400).json({ error: `Nicht unterstütztes Ausgabeformat: ${format}` });
+        }
 
-        // Python-Skript ausführen
-        const pythonProcess = spawn('/var/www/html/objectcut-react/venv/bin/python3', [
-            path.join(__dirname, 'remove_bg.py'),
-            inputPath,
-            outputPath
-        ]);
+        // Mehrere Ausgaben (z.B. outputs=cutout,mask) werden aus einer einzigen Maskenberechnung erzeugt
+        const outputs = (req.query.outputs || req.body.outputs || 'cutout').split(',').map((kind) => kind.trim());
+        if (outputs.some((kind) => !OUTPUT_KINDS.includes(kind))) {
+            return res.status(400).json({ error: `Nicht unterstützte Ausgabe, erlaubt: ${OUTPUT_KINDS.join(', ')}` });
+        }
+        const options = { format, outputs };
+        const bgcolor = req.query.bgcolor || req.body.bgcolor;
+        if (bgcolor) {
+            options.bgcolor = bgcolor;
+        }
 
-        let errorOutput = '';
+        console.log(`Processing image: ${req.file.originalname} (${req.file.size} bytes, ${format}, ${outputs.join('+')})`);
 
-        // Fehlerausgabe sammeln
-        pythonProcess.stderr.on('data', (data) => {
-            console.log(`Python stderr: ${data}`);
-            errorOutput += data.toString();
-        });
+        // Bilddaten an den residenten Python-Dienst senden
+        const response = await removeBackground(req.file.buffer, options);
 
-        // Warten auf Prozessende
-        const exitCode = await new Promise((resolve) => {
-            pythonProcess.on('close', (code) => {
-                resolve(code);
-            });
-        });
-
-        // Überprüfen, ob das Skript erfolgreich war
-        if (exitCode !== 0) {
-            console.error(`Python process exited with code ${exitCode}`);
-            console.error(`Error output: ${errorOutput}`);
+        // Überprüfen, ob der Auftrag erfolgreich war
+        if (!response.success) {
+            console.error(`Background removal failed: ${response.error}`);
             return res.status(500).json({
                 error: 'Fehler bei der Hintergrundentfernung',
-                details: errorOutput
+                details: response.error
             });
         }
 
-        // Überprüfen, ob die Ausgabedatei existiert
-        if (!fs.existsSync(outputPath)) {
-            return res.status(500).json({
-                error: 'Ausgabedatei wurde nicht erstellt',
-                details: errorOutput
-            });
+        if (response.mask_cache) {
+            console.log(`Mask cache: ${response.mask_cache.hits} hits, ${response.mask_cache.misses} misses`);
         }
 
-        // Datei senden
-        res.sendFile(outputPath, (err) => {
-            if (err) {
-                console.error('Error sending file:', err);
-                res.status(500).json({ error: 'Fehler beim Senden der Datei' });
-            }
+        // Eine Ausgabe direkt als Bild senden
+        if (outputs.length === 1) {
+            return res.type(OUTPUT_TYPES[format]).send(response.data);
+        }
 
-            // Aufräumen: Temporäre Dateien löschen
-            setTimeout(() => {
-                try {
-                    fs.unlinkSync(inputPath);
-                    fs.unlinkSync(outputPath);
-                } catch (err) {
-                    console.error('Fehler beim Löschen temporärer Dateien:', err);
-                }
-            }, 1000);
+        // Mehrere Ausgaben als Data-URLs, die Teile liegen hintereinander in den Antwortdaten
+        const result = {};
+        let offset = 0;
+        response.outputs.forEach(({ kind, size }) => {
+            const part = response.data.subarray(offset, offset + size);
+            result[kind] = `data:${OUTPUT_TYPES[format]};base64,${part.toString('base64')}`;
+            offset += size;
         });
+        res.json(result);
     } catch (error) {
         console.error('Server error:', error);
         res.status(500).json({
@@ -131,22 +233,16 @@ app.post('/api/remove-background', upload.single('image'), async (req, res) => {
 // Server starten
 app.listen(PORT, () => {
     console.log(`Server läuft auf Port ${PORT}`);
-    console.log(`Upload-Verzeichnis: ${uploadDir}`);
+
+    // Modell schon beim Start laden, damit die erste Anfrage nicht darauf wartet
+    getWorker();
 });
 
 // Aufräumen beim Beenden
 process.on('SIGINT', () => {
-    console.log('Server wird beendet. Räume temporäre Dateien auf...');
-    try {
-        // Verzeichnis löschen, falls es existiert und leer ist
-        if (fs.existsSync(uploadDir)) {
-            const files = fs.readdirSync(uploadDir);
-            files.forEach(file => {
-                fs.unlinkSync(path.join(uploadDir, file));
-            });
-        }
-    } catch (err) {
-        console.error('Fehler beim Aufräumen:', err);
+    console.log('Server wird beendet...');
+    if (worker) {
+        worker.kill();
     }
     process.exit();
-});
\ No newline at end of file
+});
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_bg  # noqa: E402
+import remove_bg  # noqa: E402
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    """Replaces rembg inference with a brightness threshold, so no model has to be downloaded"""
+    sessions = []
+
+    def remove(image, session=None, only_mask=True):
+        luminance = np.asarray(image.convert('L'))
+        return Image.fromarray(np.where(luminance > 160, 255, 0).astype(np.uint8), 'L')
+
+    def create_session(*args, **kwargs):
+        sessions.append(object())
+        return sessions[-1]
+
+    monkeypatch.setattr(remove_bg, 'remove', remove)
+    monkeypatch.setattr(benchmark_bg, 'create_session', create_session)
+    return sessions
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+import benchmark_bg
+
+
+def test_run_case_seeds_every_run():
+    values = []
+    result = benchmark_bg.run_case(lambda: values.append(np.random.rand()), repeat=3)
+    assert len(set(values)) == 1
+    assert 'stages' not in result
+
+
+def test_suite_records_stages_of_the_timed_run(tmp_path, fake_session):
+    json_path = tmp_path / 'results.json'
+    assert benchmark_bg.benchmark_suite(['64x48', '320x240'], max_size=0, repeat=2, json_path=str(json_path)) == []
+
+    report = json.loads(json_path.read_text())
+    assert report['settings']['resolutions'] == ['64x48', '320x240']
+    assert set(report['results']) == {'model_load', 'remove_background_64x48', 'remove_background_320x240'}
+    for resolution, pixels in (('64x48', 64 * 48), ('320x240', 320 * 240)):
+        result = report['results'][f'remove_background_{resolution}']
+        assert list(result['stages']) == ['read', 'decode', 'mask', 'render', 'encode', 'write']
+        # The stages are part of the measured run, not of a separate one
+        assert sum(result['stages'].values()) <= result['seconds'] + 1e-3
+        assert result['megapixels_per_second'] == round(pixels / 1e6 / result['seconds'], 3)
+
+
+def test_suite_flags_slower_resolutions_against_baseline(tmp_path, fake_session):
+    baseline_path = tmp_path / 'baseline.json'
+    benchmark_bg.benchmark_suite(['320x240'], max_size=0, repeat=1, json_path=str(baseline_path))
+
+    baseline = json.loads(baseline_path.read_text())
+    baseline['results']['remove_background_320x240']['seconds'] = 1e-6
+    baseline['results']['model_load']['seconds'] = 3600
+    baseline_path.write_text(json.dumps(baseline))
+
+    regressions = benchmark_bg.benchmark_suite(['320x240'], max_size=0, repeat=1, baseline_path=str(baseline_path))
+    assert regressions == ['remove_background_320x240']
+
+
+def test_models_benchmark_scores_masks_against_reference(tmp_path, fake_session):
+    images = benchmark_bg.collect_images([], '320x240,640x480')
+    json_path = tmp_path / 'models.json'
+
+    results = benchmark_bg.benchmark_models(images, ['u2netp', 'u2net:int8'], reference_spec='u2net', max_size=0,
+                                            repeat=2, json_path=str(json_path))
+
+    assert [result['model'] for result in results] == ['u2netp', 'u2net:int8']
+    # Every spec gets its own session, the reference included
+    assert len(fake_session) == 3
+    assert all(result['iou'] == 1.0 for result in results)
+    assert json.loads(json_path.read_text())['reference'] == 'u2net'
+
+
+def test_downscaled_masks_stay_close_to_full_resolution(fake_session, capsys):
+    images = benchmark_bg.collect_images([], '1024x768')
+    benchmark_bg.benchmark_resolutions(images, [256, 512], session=None, repeat=1)
+
+    rows = capsys.readouterr().out.splitlines()[1:]
+    # Reference row plus one row per max size with and without refinement
+    assert len(rows) == 1 + 2 * 2
+    assert all(float(row.split()[-1]) > 0.9 for row in rows)
@@ -0,0 +1,20 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import remove_bg
+
+
+def record_hits(cache_dir, count):
+    cache = remove_bg.MaskCache(cache_dir)
+    for i in range(count):
+        cache.record(hit=i % 2 == 0, perceptual_hit=i % 4 == 0)
+
+
+def test_stats_survive_concurrent_processes(tmp_path):
+    # Same start method as batch_remove with --pool process
+    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context('spawn')) as pool:
+        list(pool.map(record_hits, [str(tmp_path)] * 4, [50] * 4))
+
+    with open(tmp_path / "stats.json") as f:
+        assert json.load(f) == {"hits": 100, "perceptual_hits": 52, "misses": 100}
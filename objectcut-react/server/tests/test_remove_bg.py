@@ -0,0 +1,93 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import remove_bg
+
+
+@pytest.fixture
+def image_data():
+    """PNG with a bright 40x30 subject at (20, 10) on a dark background, which fake_session masks exactly"""
+    image = Image.new('RGB', (100, 60), (30, 60, 90))
+    image.paste((250, 240, 200), (20, 10, 60, 40))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def decode(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_all_outputs_come_from_one_model_pass(monkeypatch, fake_session, image_data):
+    calls = []
+    remove = remove_bg.remove
+    monkeypatch.setattr(remove_bg, 'remove', lambda *args, **kwargs: calls.append(1) or remove(*args, **kwargs))
+
+    outputs = remove_bg.remove_background_outputs(image_data, outputs=remove_bg.OUTPUT_KINDS)
+
+    assert list(outputs) == list(remove_bg.OUTPUT_KINDS)
+    assert len(calls) == 1
+
+
+def test_output_modes(fake_session, image_data):
+    outputs = remove_bg.remove_background_outputs(image_data, outputs=('mask', 'cutout', 'crop', 'composite'),
+                                                  bgcolor='#ff0000', crop_padding=5)
+    source = np.asarray(decode(image_data))
+    subject = np.zeros(source.shape[:2], dtype=bool)
+    subject[10:40, 20:60] = True
+
+    mask = decode(outputs['mask'])
+    assert mask.mode == 'L'
+    assert np.array_equal(np.asarray(mask) == 255, subject)
+
+    cutout = np.asarray(decode(outputs['cutout']))
+    assert cutout.shape == (60, 100, 4)
+    assert np.array_equal(cutout[..., :3][subject], source[subject])
+    assert np.array_equal(cutout[..., 3] == 255, subject)
+    # Background pixels are fully transparent black, as with rembg
+    assert not cutout[~subject].any()
+
+    crop = decode(outputs['crop'])
+    assert crop.size == (40 + 2 * 5, 30 + 2 * 5)
+
+    composite = np.asarray(decode(outputs['composite']))
+    assert composite.shape == (60, 100, 3)
+    assert np.array_equal(composite[subject], source[subject])
+    assert (composite[~subject] == (255, 0, 0)).all()
+
+
+def test_crop_padding_stops_at_image_border(fake_session, image_data):
+    crop = remove_bg.remove_background_outputs(image_data, outputs=('crop',), crop_padding=50)['crop']
+    assert decode(crop).size == (100, 60)
+
+
+@pytest.mark.parametrize('format, quality, lossless', [('png', 90, True), ('webp', 100, True), ('webp', 80, False)])
+def test_encode_image_formats(format, quality, lossless):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (32, 48, 4), dtype=np.uint8)
+    # Like a cutout: lossless WebP does not keep the colour of fully transparent pixels
+    pixels[pixels[..., 3] == 0] = 0
+    image = Image.fromarray(pixels, 'RGBA')
+
+    decoded = decode(remove_bg.encode_image(image, format, quality=quality))
+
+    assert decoded.format == remove_bg.OUTPUT_FORMATS[format]
+    assert decoded.size == image.size
+    assert np.array_equal(np.asarray(decoded.convert('RGBA')), np.asarray(image)) == lossless
+
+
+def test_unsupported_format_and_output_are_rejected(fake_session, image_data):
+    image = Image.new('RGBA', (4, 4))
+    with pytest.raises(ValueError):
+        remove_bg.encode_image(image, 'jpeg')
+    with pytest.raises(ValueError):
+        remove_bg.render_outputs(image, Image.new('L', (4, 4)), outputs=('shadow',))
+
+
+def test_output_files_keep_cutout_path():
+    assert remove_bg.output_files('out/photo.png', ('cutout',)) == {'cutout': 'out/photo.png'}
+    assert remove_bg.output_files('out/photo.png', ('mask', 'cutout', 'crop')) == {
+        'mask': 'out/photo-mask.png', 'cutout': 'out/photo.png', 'crop': 'out/photo-crop.png'}
@@ -0,0 +1,571 @@
+# benchmark.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import soundfile as sf
+import torch
+from demucs.audio import AudioFile
+
+from voicextract import PRECISIONS, PRESETS, Telemetry, VocalExtractor
+
+
+def crossfade_segments_concat(segments, overlap_samples):
+    """
+    Previous crossfade implementation that grows the result with torch.cat,
+    kept as a reference for benchmarking
+
+    Args:
+        segments: List of audio segments as tensors
+        overlap_samples: Number of overlapping samples
+
+    Returns:
+        Combined audio tensor
+    """
+    if len(segments) == 1:
+        return segments[0]
+
+    fade_in = torch.linspace(0., 1., overlap_samples)
+    fade_out = 1. - fade_in
+
+    result = segments[0][..., :-overlap_samples]
+
+    for i in range(len(segments) - 1):
+        current = segments[i]
+        next_seg = segments[i + 1]
+
+        blended = fade_out * current[..., -overlap_samples:] + fade_in * next_seg[..., :overlap_samples]
+        result = torch.cat([result, blended], dim=-1)
+
+        if i < len(segments) - 2:
+            result = torch.cat([result, next_seg[..., overlap_samples:-overlap_samples]], dim=-1)
+        else:
+            result = torch.cat([result, next_seg[..., overlap_samples:]], dim=-1)
+
+    return result
+
+
+def make_segments(count, segment_samples, channels=2, stems=2):
+    """
+    Creates random stacked stem segments as produced by the segmented extraction path
+
+    Args:
+        count: Number of segments
+        segment_samples: Length of each segment in samples
+        channels: Number of audio channels
+        stems: Number of stems stacked per segment (vocals and accompaniment)
+
+    Returns:
+        List of tensors with shape (stems, channels, segment_samples)
+    """
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(stems, channels, segment_samples, generator=generator) * 2 - 1 for _ in range(count)]
+
+
+def time_call(function, repeat):
+    """Returns the best wall time of repeated calls in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_crossfade(counts, segment_seconds, sample_rate=44100, repeat=3, reference_limit=500):
+    """
+    Compares the preallocated overlap-add merge with the previous torch.cat merge
+
+    Args:
+        counts: Segment counts to benchmark
+        segment_seconds: Length of each segment in seconds
+        sample_rate: Sample rate of the synthetic segments
+        repeat: Number of runs per measurement (best run is reported)
+        reference_limit: Largest segment count for which the quadratic reference is run
+    """
+    segment_samples = int(segment_seconds * sample_rate)
+    overlap_samples = segment_samples // 4  # 25% overlap, as in extract_vocals
+
+    print(f"Crossfade merge, {segment_seconds}s segments, vocals + accompaniment stacked")
+    print(f"{'Segments':>10} {'Audio (s)':>10} {'torch.cat (s)':>14} {'overlap-add (s)':>16} {'Speedup':>8}")
+
+    for count in counts:
+        segments = make_segments(count, segment_samples)
+        audio_seconds = (segment_samples + (count - 1) * (segment_samples - overlap_samples)) / sample_rate
+
+        merged = VocalExtractor.crossfade_segments(segments, overlap_samples)
+        new_time = time_call(lambda: VocalExtractor.crossfade_segments(segments, overlap_samples), repeat)
+
+        if count <= reference_limit:
+            reference = crossfade_segments_concat(segments, overlap_samples)
+            if not torch.allclose(merged, reference, atol=1e-6):
+                raise AssertionError(f"Merged output differs from reference for {count} segments")
+            old_time = time_call(lambda: crossfade_segments_concat(segments, overlap_samples), repeat)
+            print(f"{count:>10} {audio_seconds:>10.0f} {old_time:>14.4f} {new_time:>16.4f} {old_time / new_time:>7.1f}x")
+        else:
+            print(f"{count:>10} {audio_seconds:>10.0f} {'skipped':>14} {new_time:>16.4f} {'-':>8}")
+
+        del segments, merged
+
+
+def sdr(reference, estimate):
+    """Signal-to-distortion ratio of an estimate against a reference signal in dB"""
+    error = (reference - estimate).pow(2).sum()
+    if error == 0:
+        return float('inf')
+    return 10 * torch.log10(reference.pow(2).sum() / error).item()
+
+
+def benchmark_precision(inputs, precisions, model_name='htdemucs', seconds=30.0, repeat=1):
+    """
+    Compares separation speed and quality of the inference precisions on CPU
+
+    Quality is the SDR of vocals and accompaniment against the fp32 result, so 'inf'
+    means identical output. The random shifts of apply_model are seeded for every run.
+
+    Args:
+        inputs: Audio files of the test set
+        precisions: Precisions to benchmark (fp32 is always run as the reference)
+        model_name: Name of the demucs model
+        seconds: Length of the excerpt taken from the start of each file
+        repeat: Number of runs per measurement (best run is reported)
+    """
+    precisions = ['fp32'] + [precision for precision in precisions if precision != 'fp32']
+    references = {}
+
+    print(f"Precision benchmark, model {model_name}, {seconds:g}s per file, {torch.get_num_threads()} threads")
+    print(f"{'File':>16} {'Precision':>10} {'Load (s)':>9} {'Separate (s)':>13} {'RTF':>7} {'Speedup':>8} "
+          f"{'SDR voc (dB)':>13} {'SDR acc (dB)':>13}")
+
+    for precision in precisions:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            extractor = VocalExtractor(model_name, device='cpu', precision=precision, warmup=True)
+        load_time = time.perf_counter() - start
+        if extractor.precision != precision:
+            print(f"{'':>16} {precision:>10} not supported on this CPU")
+            continue
+
+        for input_file in inputs:
+            wav = AudioFile(input_file).read(duration=seconds, channels=extractor.model.audio_channels,
+                                             samplerate=extractor.model.samplerate)
+            if wav.dim() == 2:
+                wav = wav.unsqueeze(0)
+            audio_seconds = wav.shape[-1] / extractor.model.samplerate
+
+            def run():
+                random.seed(0)
+                return extractor.separate(wav)
+
+            elapsed = time_call(run, repeat)
+            vocals, accompaniment = run()
+
+            name = os.path.basename(input_file)[:16]
+            if precision == 'fp32':
+                references[input_file] = (vocals, accompaniment, elapsed)
+            reference_vocals, reference_accompaniment, reference_time = references[input_file]
+            print(f"{name:>16} {precision:>10} {load_time:>9.2f} {elapsed:>13.2f} {elapsed / audio_seconds:>7.3f} "
+                  f"{reference_time / elapsed:>7.2f}x {sdr(reference_vocals, vocals):>13.1f} "
+                  f"{sdr(reference_accompaniment, accompaniment):>13.1f}")
+
+        del extractor
+
+
+def benchmark_presets(inputs, presets, seconds=30.0, repeat=1, json_path=None):
+    """
+    Measures the real-time factor of the speed/quality presets
+
+    Quality is the SDR of vocals and accompaniment against the 'best' preset, if it is
+    part of the run. The random shifts of apply_model are seeded for every run.
+
+    Args:
+        inputs: Audio files of the test set
+        presets: Names of the presets to benchmark
+        seconds: Length of the excerpt taken from the start of each file
+        repeat: Number of runs per measurement (best run is reported)
+        json_path: Optional path for the results as JSON
+    """
+    outputs = {}
+    results = []
+    keys = []
+
+    for preset in presets:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            extractor = VocalExtractor(device='cpu', preset=preset)
+        load_time = time.perf_counter() - start
+
+        for input_file in inputs:
+            wav = AudioFile(input_file).read(duration=seconds, channels=extractor.model.audio_channels,
+                                             samplerate=extractor.model.samplerate)
+            if wav.dim() == 2:
+                wav = wav.unsqueeze(0)
+
+            def run():
+                random.seed(0)
+                return extractor.separate(wav)
+
+            elapsed = time_call(run, repeat)
+            outputs[preset, input_file] = run()
+            keys.append((preset, input_file))
+            results.append({'preset': preset, 'file': os.path.basename(input_file), 'model': extractor.model_name,
+                            'threads': torch.get_num_threads(), 'load_seconds': round(load_time, 2),
+                            'seconds': round(elapsed, 3),
+                            'realtime_factor': round(elapsed / (wav.shape[-1] / extractor.model.samplerate), 4)})
+
+        extractor.apply_preset(None)
+        del extractor
+
+    print(f"Preset benchmark, {seconds:g}s per file")
+    print(f"{'File':>16} {'Preset':>9} {'Model':>12} {'Threads':>8} {'Load (s)':>9} {'Separate (s)':>13} "
+          f"{'RTF':>7} {'SDR voc (dB)':>13} {'SDR acc (dB)':>13}")
+    for result, (preset, input_file) in zip(results, keys):
+        if 'best' in presets:
+            vocals, accompaniment = outputs[preset, input_file]
+            reference_vocals, reference_accompaniment = outputs['best', input_file]
+            result['sdr_vocals'] = round(sdr(reference_vocals, vocals), 2)
+            result['sdr_accompaniment'] = round(sdr(reference_accompaniment, accompaniment), 2)
+        print(f"{result['file'][:16]:>16} {result['preset']:>9} {result['model']:>12} {result['threads']:>8} "
+              f"{result['load_seconds']:>9.2f} {result['seconds']:>13.2f} {result['realtime_factor']:>7.3f} "
+              f"{result.get('sdr_vocals', float('nan')):>13.1f} {result.get('sdr_accompaniment', float('nan')):>13.1f}")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump({'environment': environment(), 'seconds': seconds,
+                       'presets': {name: PRESETS[name] for name in presets}, 'results': results}, json_file, indent=2)
+
+
+def make_audio(path, seconds, sample_rate=44100):
+    """
+    Writes a reproducible synthetic song: a sustained chord, a vibrato melody that
+    pauses every other two seconds and short noise bursts as percussion
+
+    Args:
+        path: Output path of the WAV file
+        seconds: Length in seconds
+        sample_rate: Sample rate
+    """
+    generator = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+
+    chord = sum(0.1 * np.sin(2 * np.pi * frequency * t) for frequency in (110, 165, 220))
+    melody = 0.2 * np.sin(2 * np.pi * (440 * t + 3 * np.sin(2 * np.pi * 5 * t))) * (np.sin(np.pi * t / 2) > 0)
+    beats = 0.05 * generator.standard_normal(t.size) * (np.mod(t, 0.5) < 0.05)
+
+    audio = np.stack([chord + melody + beats, chord + 0.8 * melody + beats], axis=1)
+    sf.write(path, audio.astype(np.float32), sample_rate, subtype='FLOAT')
+
+
+class PeakMemory:
+    def __init__(self, interval=0.01):
+        """
+        Samples the resident set size of this process while the context is active
+
+        Falls back to the lifetime peak reported by getrusage where /proc is not
+        available (e.g. macOS), which then only grows across cases.
+
+        Args:
+            interval: Sampling interval in seconds
+        """
+        self.interval = interval
+        self.peak_bytes = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def rss():
+        """Returns the current resident set size in bytes, or None if it cannot be read"""
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self.rss() or 0)
+
+    def __enter__(self):
+        self.peak_bytes = self.rss() or 0
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.rss() or 0)
+
+    @property
+    def peak_mb(self):
+        if self.peak_bytes:
+            return round(self.peak_bytes / (1024 * 1024), 1)
+        return Telemetry.memory().get('rss_peak_mb')
+
+
+def run_case(function, repeat=1, audio_seconds=None):
+    """
+    Measures one benchmark case
+
+    The random generators are seeded before every run, so the shifts of apply_model
+    are the same across runs and machines.
+
+    Args:
+        function: Callable to measure; may return a dictionary of stage timings
+        repeat: Number of runs (best run is reported)
+        audio_seconds: Duration of the processed audio, used for the real-time factor
+
+    Returns:
+        Dictionary with wall time, real-time factor, peak RSS and stage timings of the best run
+    """
+    best = None
+    for _ in range(repeat):
+        random.seed(0)
+        torch.manual_seed(0)
+        with PeakMemory() as memory, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            stages = function()
+            elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best['seconds']:
+            best = {'seconds': round(elapsed, 4), 'peak_rss_mb': memory.peak_mb}
+            if audio_seconds:
+                best['audio_seconds'] = round(audio_seconds, 3)
+                best['realtime_factor'] = round(elapsed / audio_seconds, 4)
+            if isinstance(stages, dict):
+                best['stages'] = stages
+    return best
+
+
+def environment():
+    """Describes the machine and library versions a suite was run with"""
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'cpu_count': os.cpu_count(),
+        'threads': torch.get_num_threads()
+    }
+
+
+def compare_baseline(results, baseline_path, tolerance=0.15):
+    """
+    Compares suite results with a stored baseline
+
+    Args:
+        results: Dictionary of case name -> result, as written by the suite
+        baseline_path: Path of a previous suite JSON file
+        tolerance: Allowed relative slowdown before a case counts as a regression
+
+    Returns:
+        List of the names of regressed cases
+    """
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%})")
+    print(f"{'Case':>34} {'Baseline (s)':>13} {'Current (s)':>12} {'Change':>8}")
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:>34} {'-':>13} {result['seconds']:>12.4f} {'new':>8}")
+            continue
+        change = result['seconds'] / baseline[name]['seconds'] - 1
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>34} {baseline[name]['seconds']:>13.4f} {result['seconds']:>12.4f} {change:>+7.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        print(f"Not run (in baseline only): {', '.join(missing)}")
+    return regressions
+
+
+def benchmark_suite(lengths, segment_sizes, model_name='htdemucs', format='wav', crossfade_counts=(100, 1000),
+                    repeat=1, json_path=None, baseline_path=None, tolerance=0.15):
+    """
+    Runs the hot paths of VocalExtractor on synthetic audio and records the results
+
+    Covers extract_vocals on the whole file and in segments of each size, the
+    segment merge (crossfade_segments) and stem encoding (save_audio as MP3 and WAV).
+    Model loading is measured once and excluded from the extraction cases.
+
+    Args:
+        lengths: Lengths of the synthetic test tracks in seconds
+        segment_sizes: Segment sizes in seconds for the segmented extraction cases
+        model_name: Name of the demucs model
+        format: Output format of the extraction cases
+        crossfade_counts: Segment counts for the crossfade cases
+        repeat: Number of runs per case (best run is reported)
+        json_path: Optional path for the results as JSON
+        baseline_path: Optional suite JSON to compare the results with
+        tolerance: Allowed relative slowdown against the baseline
+
+    Returns:
+        List of the names of cases that regressed against the baseline
+    """
+    results = {}
+    stages = {}
+
+    def report(name, result):
+        results[name] = result
+        rtf = f"{result['realtime_factor']:>7.3f}" if 'realtime_factor' in result else f"{'-':>7}"
+        print(f"{name:>34} {result['seconds']:>10.3f} {rtf} {result['peak_rss_mb'] or 0:>10.1f}")
+
+    print(f"{'Case':>34} {'Time (s)':>10} {'RTF':>7} {'RSS (MB)':>10}")
+
+    def record_stage(event):
+        if event['event'] == 'stage':
+            stages[event['stage']] = event['seconds']
+
+    telemetry = Telemetry()
+    telemetry.listener = record_stage
+
+    extractor = None
+
+    def load():
+        nonlocal extractor
+        extractor = VocalExtractor(model_name, telemetry=telemetry)
+
+    report('model_load', run_case(load))
+
+    with tempfile.TemporaryDirectory(prefix='voicextract-bench-') as work_dir:
+        for length in lengths:
+            input_file = os.path.join(work_dir, f'synthetic_{length}s.wav')
+            make_audio(input_file, length, extractor.model.samplerate)
+            output_dir = os.path.join(work_dir, 'output')
+
+            for segment_size in [None] + [size for size in segment_sizes if size < length]:
+                extractor.segment_size = segment_size
+
+                def extract():
+                    stages.clear()
+                    if not extractor.extract_vocals(input_file, output_dir, format):
+                        raise RuntimeError(f"Extraction of {input_file} failed")
+                    return dict(stages)
+
+                name = f"extract_{'whole' if segment_size is None else f'segment{segment_size}'}_{length}s"
+                report(name, run_case(extract, repeat, length))
+
+        extractor.segment_size = None
+
+        sample_rate = extractor.model.samplerate
+        for count in crossfade_counts:
+            segments = make_segments(count, sample_rate)
+            overlap_samples = sample_rate // 4
+            audio_seconds = (count * (sample_rate - overlap_samples) + overlap_samples) / sample_rate
+            report(f'crossfade_{count}x1s',
+                   run_case(lambda: VocalExtractor.crossfade_segments(segments, overlap_samples), repeat,
+                            audio_seconds))
+            del segments
+
+        wav, _ = sf.read(os.path.join(work_dir, f'synthetic_{max(lengths)}s.wav'), dtype='float32', always_2d=True)
+        wav = wav.T
+        for stem_format in ('mp3', 'wav'):
+            path = os.path.join(work_dir, f'stem.{stem_format}')
+            report(f'save_audio_{stem_format}_{max(lengths)}s',
+                   run_case(lambda: extractor.save_audio(wav, path, sample_rate, stem_format), repeat,
+                            wav.shape[1] / sample_rate))
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump({'suite': 'voicextract', 'created': round(time.time()), 'environment': environment(),
+                       'settings': {'model': model_name, 'format': format, 'lengths': lengths,
+                                    'segment_sizes': segment_sizes, 'repeat': repeat},
+                       'results': results}, json_file, indent=2)
+        print(f"Results written to {json_path}")
+
+    if baseline_path:
+        return compare_baseline(results, baseline_path, tolerance)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VoiceXtract benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    crossfade_parser = subparsers.add_parser('crossfade', help='Segment merge (crossfade_segments)')
+    crossfade_parser.add_argument('--counts', default='10,50,100,250,500,1000',
+                                  help='Comma-separated segment counts (default: 10,50,100,250,500,1000)')
+    crossfade_parser.add_argument('--segment-seconds', type=float, default=1.0,
+                                  help='Segment length in seconds (default: 1.0)')
+    crossfade_parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    crossfade_parser.add_argument('--reference-limit', type=int, default=500,
+                                  help='Largest segment count for the torch.cat reference (default: 500)')
+
+    precision_parser = subparsers.add_parser('precision', help='Speed and SDR of bf16/int8 against fp32 on CPU')
+    precision_parser.add_argument('inputs', nargs='*',
+                                  default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.mp3')],
+                                  help='Audio files of the test set (default: test.mp3)')
+    precision_parser.add_argument('-m', '--model', default='htdemucs', help='Model to benchmark (default: htdemucs)')
+    precision_parser.add_argument('--precisions', default=','.join(PRECISIONS),
+                                  help=f"Comma-separated precisions (default: {','.join(PRECISIONS)})")
+    precision_parser.add_argument('--seconds', type=float, default=30.0,
+                                  help='Seconds taken from the start of each file (default: 30)')
+    precision_parser.add_argument('--repeat', type=int, default=1, help='Runs per measurement (default: 1)')
+
+    presets_parser = subparsers.add_parser('presets', help='Real-time factor and SDR of the speed/quality presets')
+    presets_parser.add_argument('inputs', nargs='*',
+                                default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.mp3')],
+                                help='Audio files of the test set (default: test.mp3)')
+    presets_parser.add_argument('--presets', default=','.join(PRESETS),
+                                help=f"Comma-separated presets (default: {','.join(PRESETS)})")
+    presets_parser.add_argument('--seconds', type=float, default=30.0,
+                                help='Seconds taken from the start of each file (default: 30)')
+    presets_parser.add_argument('--repeat', type=int, default=1, help='Runs per measurement (default: 1)')
+    presets_parser.add_argument('--json', help='Write the results to this JSON file')
+
+    suite_parser = subparsers.add_parser('suite', help='Hot paths on synthetic audio, with JSON output '
+                                                      'and baseline comparison')
+    suite_parser.add_argument('--lengths', default='10,30,60',
+                              help='Comma-separated lengths of the synthetic tracks in seconds (default: 10,30,60)')
+    suite_parser.add_argument('--segment-sizes', default='5,10',
+                              help='Comma-separated segment sizes for segmented extraction (default: 5,10)')
+    suite_parser.add_argument('-m', '--model', default='htdemucs', help='Model to benchmark (default: htdemucs)')
+    suite_parser.add_argument('-f', '--format', default='wav', choices=['mp3', 'wav'],
+                              help='Output format of the extraction cases (default: wav)')
+    suite_parser.add_argument('--threads', type=int, help='torch threads (default: all cores)')
+    suite_parser.add_argument('--repeat', type=int, default=1, help='Runs per case (default: 1)')
+    suite_parser.add_argument('--json', help='Write the results to this JSON file')
+    suite_parser.add_argument('--baseline', help='Compare with a previous results file; exits with status 1 '
+                                                 'on regressions')
+    suite_parser.add_argument('--tolerance', type=float, default=0.15,
+                              help='Allowed relative slowdown against the baseline (default: 0.15)')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'crossfade':
+        counts = [int(count) for count in args.counts.split(',')]
+        benchmark_crossfade(counts, args.segment_seconds, repeat=args.repeat,
+                            reference_limit=args.reference_limit)
+    elif args.benchmark == 'precision':
+        benchmark_precision(args.inputs, args.precisions.split(','), args.model, args.seconds, args.repeat)
+    elif args.benchmark == 'presets':
+        benchmark_presets(args.inputs, args.presets.split(','), args.seconds, args.repeat, args.json)
+    elif args.benchmark == 'suite':
+        if args.threads:
+            torch.set_num_threads(args.threads)
+        regressions = benchmark_suite([int(length) for length in args.lengths.split(',')],
+                                      [int(size) for size in args.segment_sizes.split(',')], args.model,
+                                      args.format, repeat=args.repeat, json_path=args.json,
+                                      baseline_path=args.baseline, tolerance=args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
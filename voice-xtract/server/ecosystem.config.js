@@ -4,11 +4,20 @@ module.exports = {
         script: "./server.js",
         env: {
             NODE_ENV: "production",
-            PORT: 4992
+            PORT: 4992,
+            VOICEXTRACT_SOCKET: "/tmp/voicextract.sock"
         },
         instances: 1,
         autorestart: true,
         watch: false,
         max_memory_restart: "1G"
+    }, {
+        name: "voicextract-worker",
+        script: "./voicextract.py",
+        interpreter: "python3",
+        args: "--serve --socket /tmp/voicextract.sock --cache-dir cache --checkpoint-dir checkpoints",
+        instances: 1,
+        autorestart: true,
+        watch: false
     }]
-};
\ No newline at end of file
+};
@@ -5,6 +5,7 @@ const path = require('path');
 const fs = require('fs-extra');
 const {v4: uuidv4} = require('uuid');
 const {spawn} = require('child_process');
+const net = require('net');
 
 const app = express();
 const PORT = process.env.PORT || 4992;
@@ -67,14 +68,25 @@ const upload = multer({
 // Store tasks and their statuses
 const tasks = new Map();
 
+// Geschwindigkeits-/Qualitätsstufen von voicextract.py (--preset), z.B. 'fast' für kostenlose Aufträge
+const PRESETS = ['fast', 'balanced', 'best'];
+
 // API routes - Verwende einfache /api Pfade
 app.post('/api/upload', upload.array('files', 5), (req, res) => {
     try {
         const {taskId} = req;
         const {model, format} = req.body;
+        const preset = req.body.preset || process.env.VOICEXTRACT_DEFAULT_PRESET;
+
+        if (preset && !PRESETS.includes(preset)) {
+            return res.status(400).json({
+                message: `Unknown preset: ${preset}`,
+                presets: PRESETS
+            });
+        }
 
         console.log(`Upload request received for task ${taskId}`);
-        console.log(`Files: ${req.files.length}, Model: ${model}, Format: ${format}`);
+        console.log(`Files: ${req.files.length}, Model: ${model}, Format: ${format}, Preset: ${preset}`);
 
         // Store task info
         tasks.set(taskId, {
@@ -82,7 +94,9 @@ app.post('/api/upload', upload.array('files', 5), (req, res) => {
             files: req.files.map(file => file.originalname),
             uploadDir: path.join(UPLOAD_DIR, taskId),
             outputDir: path.join(OUTPUT_DIR, taskId),
-            model: model || 'htdemucs',
+            // Ohne explizites Modell bestimmt das Preset das Modell
+            model: model || (preset ? null : 'htdemucs'),
+            preset: preset || null,
             format: format || 'mp3',
             progress: 0,
             results: {}
@@ -213,6 +227,8 @@ app.get('/api/download-audio/:taskId/:type', (req, res) => {
             audioFile = path.join(outputDir, `vocals.${task.format}`);
         } else if (type === 'accompaniment') {
             audioFile = path.join(outputDir, `accompaniment.${task.format}`);
+        } else if (type === 'preview_vocals' || type === 'preview_accompaniment') {
+            audioFile = path.join(outputDir, `${type}.${task.format}`);
         } else {
             return res.status(400).json({message: 'Ungültiger Audio-Typ'});
         }
@@ -278,7 +294,7 @@ function processTask(taskId) {
 }
 
 async function processFiles(task, taskId) {
-    const {files, uploadDir, outputDir, model, format} = task;
+    const {files, uploadDir, outputDir, model, format, preset} = task;
     const results = {};
     let fileIndex = 0;
 
@@ -302,7 +318,7 @@ async function processFiles(task, taskId) {
 
             // Run Python script
             console.log(`Running Python script for file: ${filename}`);
-            const result = await runPythonScript(inputFile, fileOutputDir, model, format);
+            const result = await runPythonScript(inputFile, fileOutputDir, model, format, preset);
 
             console.log(`Processing completed for ${filename}`);
             console.log(`Results: ${JSON.stringify(result)}`);
@@ -345,7 +361,211 @@ async function processFiles(task, taskId) {
     }, 3600000); // Remove after 1 hour
 }
 
-function runPythonScript(inputFile, outputDir, model, format) {
+// Telemetrie-Events einer Datei in den Task übernehmen (gleiches Format für fd 3 und Worker-Socket)
+function createTelemetryHandler(taskId, inputFile) {
+    if (!tasks.has(taskId)) {
+        return () => {};
+    }
+
+    const task = tasks.get(taskId);
+    const fileIndex = task.files.findIndex(f =>
+        path.join(task.uploadDir, f) === inputFile
+    );
+    const totalFiles = task.files.length;
+
+    task.telemetry = task.telemetry || {};
+    task.telemetry[path.basename(inputFile)] = {stages: {}};
+
+    return (event) => {
+        if (!tasks.has(taskId)) {
+            return;
+        }
+        const updatedTask = tasks.get(taskId);
+        const fileTelemetry = updatedTask.telemetry[path.basename(inputFile)];
+
+        if (event.event === 'progress') {
+            // Gesamtfortschritt berechnen: Anteil für vorherige Dateien + Anteil für aktuelle Datei
+            const fileContribution = 100 / totalFiles;
+            const totalProgress = Math.floor(
+                fileIndex * fileContribution + (event.progress / 100) * fileContribution
+            );
+            // Vermeide Rückschritte im Fortschritt
+            updatedTask.progress = Math.max(updatedTask.progress, totalProgress);
+            if (event.message) {
+                updatedTask.status = event.message;
+            }
+        } else if (event.event === 'stage') {
+            fileTelemetry.stages[event.stage] = event.seconds;
+            if (event.stage === 'preview') {
+                // Vorschau ist über /api/download-audio/:taskId/preview_vocals abrufbar
+                fileTelemetry.previewReady = true;
+            }
+        } else if (event.event === 'segment') {
+            fileTelemetry.throughput = event.throughput;
+            fileTelemetry.eta = event.eta;
+        } else if (event.event === 'done') {
+            fileTelemetry.seconds = event.seconds;
+            fileTelemetry.realtimeFactor = event.realtime_factor;
+            fileTelemetry.cached = event.cached;
+            if (event.skipped_seconds !== undefined) {
+                fileTelemetry.skippedSeconds = event.skipped_seconds;
+            }
+            fileTelemetry.eta = 0;
+        }
+
+        if (event.rss_peak_mb !== undefined) {
+            fileTelemetry.rssPeakMb = event.rss_peak_mb;
+        }
+
+        tasks.set(taskId, updatedTask);
+    };
+}
+
+// JSON Lines aus einem Stream lesen und jede Zeile als Objekt weitergeben
+function onJsonLines(stream, onObject) {
+    let buffer = '';
+    stream.on('data', (data) => {
+        buffer += data.toString();
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+            if (!line.trim()) {
+                continue;
+            }
+            let object;
+            try {
+                object = JSON.parse(line);
+            } catch (err) {
+                console.error(`Invalid JSON line: ${line}`);
+                continue;
+            }
+            onObject(object);
+        }
+    });
+}
+
+// Ausgabedateien prüfen und den Fortschritt des Tasks abschließen
+function collectOutputs(outputDir, format, taskId) {
+    const vocalPath = path.join(outputDir, `vocals.${format}`);
+    const accompPath = path.join(outputDir, `accompaniment.${format}`);
+
+    console.log(`Checking for output files:`);
+    console.log(`- Vocals: ${vocalPath} (exists: ${fs.existsSync(vocalPath)})`);
+    console.log(`- Accompaniment: ${accompPath} (exists: ${fs.existsSync(accompPath)})`);
+
+    const result = {
+        vocals: fs.existsSync(vocalPath) ? 'vocals' : null,
+        accompaniment: fs.existsSync(accompPath) ? 'accompaniment' : null
+    };
+
+    if (!result.vocals && !result.accompaniment) {
+        throw new Error('No output files were generated');
+    }
+
+    // Bei erfolgreichem Abschluss den Fortschritt auf 100% setzen
+    if (tasks.has(taskId)) {
+        const updatedTask = tasks.get(taskId);
+        updatedTask.progress = 100;
+        tasks.set(taskId, updatedTask);
+    }
+
+    return result;
+}
+
+// Job direkt an den laufenden Worker (voicextract.py --serve --socket) schicken, ohne Python zu starten.
+// Schlägt der Verbindungsaufbau fehl, wird mit err.workerUnavailable abgelehnt.
+function runWorkerJob(socketPath, job, onEvent) {
+    return new Promise((resolve, reject) => {
+        let connected = false;
+        let settled = false;
+
+        const finish = (err, result) => {
+            if (settled) {
+                return;
+            }
+            settled = true;
+            client.destroy();
+            if (err) {
+                reject(err);
+            } else {
+                resolve(result);
+            }
+        };
+
+        const client = net.createConnection(socketPath, () => {
+            connected = true;
+            console.log(`Worker job: ${JSON.stringify(job)}`);
+            client.end(JSON.stringify(job) + '\n');
+        });
+
+        onJsonLines(client, (event) => {
+            if (event.event === 'progress') {
+                onEvent({event: 'progress', progress: event.progress, message: event.message});
+            } else if (event.event === 'telemetry') {
+                // Worker-Telemetrie trägt den ursprünglichen Eventtyp in 'type'
+                onEvent({...event, event: event.type});
+            } else if (event.event === 'preview') {
+                console.log(`Preview files: ${JSON.stringify(event.result)}`);
+            } else if (event.event === 'result') {
+                finish(null, event.result);
+            } else if (event.event === 'error') {
+                finish(new Error(`Worker error: ${event.error}`));
+            }
+        });
+
+        client.on('error', (err) => {
+            if (!connected) {
+                err.workerUnavailable = true;
+            }
+            finish(err);
+        });
+
+        client.on('close', () => {
+            finish(new Error('Worker closed the connection without a result'));
+        });
+    });
+}
+
+function runPythonScript(inputFile, outputDir, model, format, preset) {
+    // Aktueller Task und Task ID aus der Closure
+    const taskDir = path.dirname(outputDir);
+    const taskId = path.basename(taskDir);
+    const onEvent = createTelemetryHandler(taskId, inputFile);
+
+    const socketPath = process.env.VOICEXTRACT_SOCKET;
+    if (!socketPath) {
+        return spawnPythonScript(inputFile, outputDir, model, format, preset, taskId, onEvent);
+    }
+
+    // Job an den residenten Worker übergeben, der das Modell bereits geladen hat
+    const job = {
+        input: path.resolve(inputFile),
+        output: path.resolve(outputDir),
+        format
+    };
+    if (model) {
+        job.model = model;
+    }
+    if (preset) {
+        job.preset = preset;
+    }
+    if (process.env.VOICEXTRACT_PREVIEW_SECONDS) {
+        job.preview = parseFloat(process.env.VOICEXTRACT_PREVIEW_SECONDS);
+    }
+
+    return runWorkerJob(socketPath, job, onEvent)
+        .then(() => collectOutputs(outputDir, format, taskId))
+        .catch((err) => {
+            if (!err.workerUnavailable) {
+                throw err;
+            }
+            console.error(`Worker not reachable at ${socketPath} (${err.message}), processing locally...`);
+            return spawnPythonScript(inputFile, outputDir, model, format, preset, taskId, onEvent);
+        });
+}
+
+function spawnPythonScript(inputFile, outputDir, model, format, preset, taskId, onEvent) {
     return new Promise((resolve, reject) => {
         // Check if Python script exists
         const scriptPath = path.join(__dirname, 'voicextract.py');
@@ -362,98 +582,40 @@ function runPythonScript(inputFile, outputDir, model, format) {
             scriptPath,
             inputFile,
             '--output', outputDir,
-            '--model', model,
             '--format', format
         ];
+        if (model) {
+            args.push('--model', model);
+        }
+        if (preset) {
+            args.push('--preset', preset);
+        }
+
+        // Vorschau der ersten Sekunden vor der vollständigen Trennung erzeugen
+        if (process.env.VOICEXTRACT_PREVIEW_SECONDS) {
+            args.push('--preview', process.env.VOICEXTRACT_PREVIEW_SECONDS);
+        }
+
+        // Telemetrie-Events (JSON Lines) kommen über einen eigenen Kanal auf fd 3
+        args.push('--events-fd', '3');
 
         console.log(`Python command: python3 ${args.join(' ')}`);
 
         // Spawn Python process
-        const pythonProcess = spawn('python3', args);
+        const pythonProcess = spawn('python3', args, {
+            stdio: ['ignore', 'pipe', 'pipe', 'pipe']
+        });
 
         let outputData = '';
         let errorData = '';
 
-        // Aktueller Task und Task ID aus der Closure
-        const taskDir = path.dirname(outputDir);
-        const taskId = path.basename(taskDir);
-
-        // Initiale Werte für den Fortschritt
-        let lastProgress = 0;
-        let initialProgressSent = false;
-
-        // Task-Info abrufen, wenn vorhanden
-        if (tasks.has(taskId)) {
-            const task = tasks.get(taskId);
-            const fileIndex = task.files.findIndex(f =>
-                path.join(task.uploadDir, f) === inputFile
-            );
-            const totalFiles = task.files.length;
-
-            // Wenn der Upload abgeschlossen ist, starten wir mit mindestens 5%
-            if (!initialProgressSent) {
-                const updatedTask = tasks.get(taskId);
-                updatedTask.progress = Math.max(updatedTask.progress, 5);
-                tasks.set(taskId, updatedTask);
-                initialProgressSent = true;
-
-                // Aktualisiere alle 2 Sekunden den Fortschritt minimal, falls keine Updates kommen
-                const progressInterval = setInterval(() => {
-                    if (tasks.has(taskId)) {
-                        const currentTask = tasks.get(taskId);
-                        // Nur aktualisieren, wenn der Status noch 'processing' ist
-                        if (currentTask.state === 'processing' && currentTask.progress < 95) {
-                            // Erhöhe den Fortschritt leicht, wenn für längere Zeit kein Update kommt
-                            const newProgress = Math.min(95, currentTask.progress + 1);
-                            if (newProgress > currentTask.progress) {
-                                currentTask.progress = newProgress;
-                                tasks.set(taskId, currentTask);
-                            }
-                        } else {
-                            clearInterval(progressInterval);
-                        }
-                    } else {
-                        clearInterval(progressInterval);
-                    }
-                }, 2000);
-            }
+        pythonProcess.stdout.on('data', (data) => {
+            const output = data.toString();
+            outputData += output;
+            console.log(`Python output: ${output}`);
+        });
 
-            pythonProcess.stdout.on('data', (data) => {
-                const output = data.toString();
-                outputData += output;
-                console.log(`Python output: ${output}`);
-
-                // Verbesserte Erkennung für Fortschrittsangaben
-                const progressMatches = output.matchAll(/Progress:\s*(\d+)%/g);
-                for (const match of progressMatches) {
-                    const pythonProgress = parseInt(match[1]);
-
-                    // Vermeide Rückschritte im Fortschritt
-                    if (pythonProgress > lastProgress) {
-                        lastProgress = pythonProgress;
-
-                        // Gesamtfortschritt berechnen: Anteil für vorherige Dateien + Anteil für aktuelle Datei
-                        const fileContribution = 100 / totalFiles;
-                        const previousFilesProgress = fileIndex * fileContribution;
-                        const currentFileProgress = (pythonProgress / 100) * fileContribution;
-                        const totalProgress = Math.floor(previousFilesProgress + currentFileProgress);
-
-                        // Aktualisiere Task-Progress
-                        if (tasks.has(taskId)) {
-                            const updatedTask = tasks.get(taskId);
-                            updatedTask.progress = Math.max(updatedTask.progress, totalProgress);
-                            tasks.set(taskId, updatedTask);
-                        }
-                    }
-                }
-            });
-        } else {
-            pythonProcess.stdout.on('data', (data) => {
-                const output = data.toString();
-                outputData += output;
-                console.log(`Python output: ${output}`);
-            });
-        }
+        onJsonLines(pythonProcess.stdio[3], onEvent);
 
         pythonProcess.stderr.on('data', (data) => {
             const error = data.toString();
@@ -469,31 +631,11 @@ function runPythonScript(inputFile, outputDir, model, format) {
                 return reject(new Error(`Python process failed with code ${code}: ${errorData}`));
             }
 
-            // Check if output files exist
-            const vocalPath = path.join(outputDir, `vocals.${format}`);
-            const accompPath = path.join(outputDir, `accompaniment.${format}`);
-
-            console.log(`Checking for output files:`);
-            console.log(`- Vocals: ${vocalPath} (exists: ${fs.existsSync(vocalPath)})`);
-            console.log(`- Accompaniment: ${accompPath} (exists: ${fs.existsSync(accompPath)})`);
-
-            const result = {
-                vocals: fs.existsSync(vocalPath) ? 'vocals' : null,
-                accompaniment: fs.existsSync(accompPath) ? 'accompaniment' : null
-            };
-
-            if (!result.vocals && !result.accompaniment) {
-                return reject(new Error('No output files were generated'));
+            try {
+                resolve(collectOutputs(outputDir, format, taskId));
+            } catch (err) {
+                reject(err);
             }
-
-            // Bei erfolgreichem Abschluss den Fortschritt auf 100% setzen
-            if (tasks.has(taskId)) {
-                const updatedTask = tasks.get(taskId);
-                updatedTask.progress = 100;
-                tasks.set(taskId, updatedTask);
-            }
-
-            resolve(result);
         });
     });
 }
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+from demucs.apply import BagOfModels
+from demucs.htdemucs import HTDemucs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voicextract  # noqa: E402
+
+
+@pytest.fixture
+def tiny_models(monkeypatch):
+    """Replaces the pretrained demucs models with tiny untrained ones, recording every load"""
+    loaded = []
+
+    def get_model(name):
+        loaded.append(name)
+        torch.manual_seed(0)
+        model = HTDemucs(sources=["drums", "bass", "other", "vocals"], channels=8, t_layers=1,
+                         bottom_channels=0, segment=4)
+        return BagOfModels([model])
+
+    monkeypatch.setattr(voicextract, "get_model", get_model)
+    return loaded
+
+
+@pytest.fixture
+def audio_file(tmp_path):
+    """Two seconds of stereo noise at 44.1 kHz"""
+    path = tmp_path / "input.wav"
+    rng = np.random.default_rng(0)
+    sf.write(path, 0.1 * rng.standard_normal((2 * 44100, 2)), 44100)
+    return str(path)
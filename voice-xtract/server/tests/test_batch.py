@@ -0,0 +1,23 @@
+import shutil
+import sys
+
+import voicextract
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["voicextract.py", *args])
+    voicextract.main()
+
+
+def test_incremental_run_without_changes_loads_no_model(monkeypatch, tmp_path, tiny_models, audio_file):
+    input_dir = tmp_path / "songs"
+    input_dir.mkdir()
+    shutil.copy(audio_file, input_dir / "song.wav")
+    args = [str(input_dir), "-o", str(tmp_path / "out"), "-f", "wav", "-d", "cpu", "--incremental"]
+
+    run_main(monkeypatch, *args)
+    assert (tmp_path / "out" / "song" / "vocals.wav").exists()
+    assert tiny_models == ["htdemucs"]
+
+    run_main(monkeypatch, *args)
+    assert tiny_models == ["htdemucs"]
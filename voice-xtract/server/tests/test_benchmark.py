@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from benchmark import compare_baseline
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"results": {"fast": {"seconds": 1.0}, "slow": {"seconds": 2.0},
+                                            "dropped": {"seconds": 1.0}}}))
+    return str(path)
+
+
+def test_only_slowdowns_beyond_tolerance_are_regressions(baseline):
+    results = {"fast": {"seconds": 1.1}, "slow": {"seconds": 2.4}}
+    assert compare_baseline(results, baseline, tolerance=0.15) == ["slow"]
+
+
+def test_speedups_and_new_cases_are_not_regressions(baseline, capsys):
+    results = {"fast": {"seconds": 0.5}, "slow": {"seconds": 2.0}, "added": {"seconds": 9.0}}
+    assert compare_baseline(results, baseline) == []
+    assert "Not run (in baseline only): dropped" in capsys.readouterr().out
+
+
+def test_tolerance_is_configurable(baseline):
+    assert compare_baseline({"fast": {"seconds": 1.1}}, baseline, tolerance=0.05) == ["fast"]
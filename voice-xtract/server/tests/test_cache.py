@@ -0,0 +1,39 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+import voicextract
+
+
+def record_hits(cache_dir, count):
+    cache = voicextract.ResultCache(cache_dir)
+    for i in range(count):
+        cache.record(hit=i % 2 == 0)
+
+
+def test_stats_survive_concurrent_processes(tmp_path):
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(record_hits, [str(tmp_path)] * 4, [50] * 4))
+
+    with open(tmp_path / "stats.json") as f:
+        assert json.load(f) == {"hits": 100, "misses": 100}
+
+
+def test_batch_segments_do_not_change_output_or_cache_key(tiny_models, audio_file, tmp_path):
+    # 5.3 s in 1 s segments leaves a shorter final segment, which must not be padded into a batch
+    rng = np.random.default_rng(0)
+    wav = torch.from_numpy(0.1 * rng.standard_normal((1, 2, int(5.3 * 44100)))).float()
+    cache = voicextract.ResultCache(str(tmp_path))
+    outputs, keys = {}, set()
+    for batch_segments in (1, 2, 4):
+        # The fast preset runs without random shifts, so the outputs are comparable
+        extractor = voicextract.VocalExtractor(device="cpu", segment_size=1, preset="fast",
+                                               batch_segments=batch_segments)
+        outputs[batch_segments] = extractor.separate_audio(wav)
+        keys.add(cache.key(audio_file, extractor.cache_settings()))
+
+    for batch_segments in (2, 4):
+        torch.testing.assert_close(outputs[batch_segments], outputs[1], rtol=0, atol=1e-6)
+    assert len(keys) == 1
\ No newline at end of file
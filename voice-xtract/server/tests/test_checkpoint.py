@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import voicextract
+
+
+def counting_separate(monkeypatch, extractor, fail_at=None):
+    """Counts model passes; the pass number fail_at raises as if the worker was killed"""
+    calls = []
+    separate = extractor.separate
+
+    def wrapper(mix, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == fail_at:
+            raise RuntimeError("killed")
+        return separate(mix, *args, **kwargs)
+
+    monkeypatch.setattr(extractor, "separate", wrapper)
+    return calls
+
+
+def test_resume_skips_completed_segments(monkeypatch, tmp_path, tiny_models, audio_file):
+    checkpoint_dir = tmp_path / "checkpoints"
+    # 1 s segments with 25% overlap split the 2 s input into 3 segments
+    extractor = voicextract.VocalExtractor(device="cpu", preset="fast", segment_size=1,
+                                           checkpoint_dir=str(checkpoint_dir))
+
+    counting_separate(monkeypatch, extractor, fail_at=3)
+    assert extractor.extract_vocals(audio_file, str(tmp_path / "out"), "wav") == {}
+    assert len(os.listdir(checkpoint_dir)) == 1
+
+    calls = counting_separate(monkeypatch, extractor)
+    result = extractor.extract_vocals(audio_file, str(tmp_path / "out"), "wav")
+    # Only the segment that failed is separated again, and the checkpoint is gone afterwards
+    assert len(calls) == 1
+    assert os.listdir(checkpoint_dir) == []
+
+    reference = voicextract.VocalExtractor(device="cpu", preset="fast", segment_size=1).extract_vocals(
+        audio_file, str(tmp_path / "reference"), "wav")
+    for stem in ("vocals", "accompaniment"):
+        assert np.array_equal(sf.read(result[stem])[0], sf.read(reference[stem])[0])
+
+
+@pytest.mark.parametrize("segment_size, passes", [(None, 1), (1, 3)])
+def test_short_inputs_are_only_segmented_on_request(monkeypatch, tmp_path, tiny_models, audio_file,
+                                                    segment_size, passes):
+    extractor = voicextract.VocalExtractor(device="cpu", preset="fast", segment_size=segment_size,
+                                           checkpoint_dir=str(tmp_path / "checkpoints"))
+    calls = counting_separate(monkeypatch, extractor)
+
+    assert extractor.extract_vocals(audio_file, str(tmp_path / "out"), "wav")
+    assert len(calls) == passes
+
+
+def test_pipelined_batch_resumes_from_checkpoint(monkeypatch, tmp_path, tiny_models, audio_file):
+    # Different content, since checkpoints are keyed by content and settings
+    inputs = [audio_file, str(tmp_path / "second.wav")]
+    audio, sample_rate = sf.read(audio_file)
+    sf.write(inputs[1], audio[::-1], sample_rate)
+    checkpoint_dir = tmp_path / "checkpoints"
+    extractor = voicextract.VocalExtractor(device="cpu", preset="fast", segment_size=1,
+                                           checkpoint_dir=str(checkpoint_dir))
+
+    counting_separate(monkeypatch, extractor, fail_at=3)
+    results = extractor.batch_process(inputs, str(tmp_path / "out"), "wav")
+    assert [bool(results[path]) for path in inputs] == [False, True]
+    # The finished file's checkpoint was discarded after encoding
+    assert len(os.listdir(checkpoint_dir)) == 1
+
+    calls = counting_separate(monkeypatch, extractor)
+    results = extractor.batch_process(inputs, str(tmp_path / "out"), "wav")
+    assert all(results.values())
+    # One remaining segment of the first file, all three of the second
+    assert len(calls) == 1 + 3
+    assert os.listdir(checkpoint_dir) == []
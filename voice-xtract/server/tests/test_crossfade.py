@@ -0,0 +1,60 @@
+import pytest
+import torch
+
+import voicextract
+
+
+def overlap_add(segments, overlap_samples):
+    """Reference merge: every segment weighted by its fade window and summed at its offset"""
+    hop_offsets = [0]
+    for segment in segments[:-1]:
+        hop_offsets.append(hop_offsets[-1] + segment.shape[-1] - overlap_samples)
+    result = torch.zeros(segments[0].shape[:-1] + (hop_offsets[-1] + segments[-1].shape[-1],), dtype=torch.float64)
+
+    ramp = torch.linspace(0., 1., overlap_samples, dtype=torch.float64)
+    for i, (offset, segment) in enumerate(zip(hop_offsets, segments)):
+        window = torch.ones(segment.shape[-1], dtype=torch.float64)
+        if i > 0:
+            window[:overlap_samples] = ramp
+        if i < len(segments) - 1:
+            window[-overlap_samples:] = 1. - ramp
+        result[..., offset:offset + segment.shape[-1]] += segment.double() * window
+    return result
+
+
+def split(audio, segment_samples, overlap_samples):
+    """Cuts audio into overlapping segments the way separate_mix does"""
+    segments, start = [], 0
+    while True:
+        end = min(start + segment_samples, audio.shape[-1])
+        segments.append(audio[..., start:end])
+        if end == audio.shape[-1]:
+            return segments
+        start += segment_samples - overlap_samples
+
+
+@pytest.mark.parametrize("count, last_samples", [(2, 1000), (5, 400), (40, 251)])
+def test_crossfade_matches_overlap_add(count, last_samples):
+    torch.manual_seed(0)
+    # Stems, channels, time as in separate_mix; segments are unrelated so the fades matter
+    segments = [torch.randn(2, 2, 1000) for _ in range(count - 1)]
+    segments.append(torch.randn(2, 2, last_samples))
+
+    merged = voicextract.VocalExtractor.crossfade_segments(segments, 250)
+
+    torch.testing.assert_close(merged.double(), overlap_add(segments, 250), rtol=0, atol=1e-6)
+
+
+def test_crossfade_reconstructs_split_signal():
+    audio = torch.randn(2, 2, 44100)
+    segments = split(audio, 8000, 2000)
+
+    merged = voicextract.VocalExtractor.crossfade_segments(segments, 2000)
+
+    # The fades sum to one, so segments cut from one signal merge back into it
+    torch.testing.assert_close(merged, audio)
+
+
+def test_single_segment_is_returned_unchanged():
+    segment = torch.randn(2, 2, 500)
+    assert voicextract.VocalExtractor.crossfade_segments([segment], 125) is segment
@@ -0,0 +1,58 @@
+import io
+import json
+import sys
+
+import torch
+
+import voicextract
+
+
+def run_jobs(monkeypatch, extractor, jobs):
+    """Feeds jobs to the stdin worker and returns the protocol events"""
+    output = io.StringIO()
+    monkeypatch.setattr(sys, "stdin", io.StringIO("".join(json.dumps(job) + "\n" for job in jobs)))
+    monkeypatch.setattr(sys, "__stdout__", output)
+    voicextract.serve(extractor)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_job_without_model_uses_startup_model(monkeypatch, tmp_path, tiny_models, audio_file):
+    extractor = voicextract.VocalExtractor(model_name="htdemucs", device="cpu")
+    jobs = [
+        {"id": 1, "input": audio_file, "output": str(tmp_path / "first"), "format": "wav", "model": "mdx_extra"},
+        {"id": 2, "input": audio_file, "output": str(tmp_path / "second"), "format": "wav"},
+    ]
+
+    results = [event for event in run_jobs(monkeypatch, extractor, jobs) if event["event"] == "result"]
+
+    assert [event["id"] for event in results] == [1, 2]
+    assert extractor.model_name == "htdemucs"
+    # The startup model stayed resident and was reused instead of being loaded again
+    assert tiny_models == ["htdemucs", "mdx_extra"]
+    assert results[1]["model_pool"]["hits"] == 1
+
+
+def test_job_with_preset_uses_model_of_preset(monkeypatch, tmp_path, tiny_models, audio_file):
+    extractor = voicextract.VocalExtractor(model_name="htdemucs", device="cpu")
+    jobs = [{"id": 1, "input": audio_file, "output": str(tmp_path / "out"), "format": "wav", "preset": "best"}]
+
+    run_jobs(monkeypatch, extractor, jobs)
+
+    assert extractor.model_name == voicextract.PRESETS["best"]["model"]
+
+
+def test_preset_threads_are_restored_after_the_job(monkeypatch, tmp_path, tiny_models, audio_file):
+    extractor = voicextract.VocalExtractor(model_name="htdemucs", device="cpu")
+    threads = torch.get_num_threads()
+    # Pretend more cores than the current setting, so the preset changes the thread count
+    monkeypatch.setattr(extractor, "default_threads", threads + 3)
+    seen = []
+    extract_vocals = extractor.extract_vocals
+    monkeypatch.setattr(extractor, "extract_vocals",
+                        lambda *args: seen.append(torch.get_num_threads()) or extract_vocals(*args))
+    jobs = [{"id": 1, "input": audio_file, "output": str(tmp_path / "out"), "format": "wav", "preset": "balanced"}]
+
+    run_jobs(monkeypatch, extractor, jobs)
+
+    assert seen == [threads + 3]
+    assert torch.get_num_threads() == threads
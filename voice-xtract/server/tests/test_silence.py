@@ -0,0 +1,77 @@
+import torch
+
+import voicextract
+
+SAMPLE_RATE = 44100
+
+
+def quiet_gap_mix():
+    """2 s of noise, 3 s at -60 dBFS (below the default threshold) and 2 s of noise"""
+    torch.manual_seed(0)
+    return torch.cat([0.1 * torch.randn(1, 2, 2 * SAMPLE_RATE), 0.001 * torch.randn(1, 2, 3 * SAMPLE_RATE),
+                      0.1 * torch.randn(1, 2, 2 * SAMPLE_RATE)], dim=2)
+
+
+def passthrough_extractor(monkeypatch, mixes):
+    """Extractor whose model returns the whole mixture as vocals, recording what it was given"""
+    extractor = voicextract.VocalExtractor(device="cpu", preset="fast", skip_silence=True)
+
+    def separate(mix, model=None, **options):
+        mixes.append(mix.clone())
+        return mix.clone(), torch.zeros_like(mix)
+
+    monkeypatch.setattr(extractor, "separate", separate)
+    return extractor
+
+
+def test_audible_regions_are_separated_unchanged(monkeypatch, tiny_models):
+    wav = quiet_gap_mix()
+    mixes = []
+    extractor = passthrough_extractor(monkeypatch, mixes)
+
+    stems = extractor.separate_audio(wav)
+
+    regions = voicextract.find_active_regions(wav[0].numpy(), SAMPLE_RATE)
+    # Both noise bursts are covered completely, with their margins
+    assert regions[0][0] == 0 and regions[0][1] >= 2 * SAMPLE_RATE
+    assert regions[1][0] <= 5 * SAMPLE_RATE and regions[1][1] == 7 * SAMPLE_RATE
+    # The model saw exactly the audible regions, joined
+    assert len(mixes) == 1
+    assert torch.equal(mixes[0], torch.cat([wav[:, :, start:end] for start, end in regions], dim=2))
+
+    # Model output lands where it came from, the quiet gap bypasses the model
+    for start, end in regions:
+        assert torch.equal(stems[0, :, start:end], wav[0, :, start:end])
+        assert not stems[1, :, start:end].any()
+    gap = slice(regions[0][1], regions[1][0])
+    assert not stems[0, :, gap].any()
+    assert torch.equal(stems[1, :, gap], wav[0, :, gap])
+    assert extractor.last_skipped_seconds == (regions[1][0] - regions[0][1]) / SAMPLE_RATE
+
+
+def test_silent_input_skips_the_model(monkeypatch, tiny_models):
+    wav = torch.zeros(1, 2, 3 * SAMPLE_RATE)
+    mixes = []
+    extractor = passthrough_extractor(monkeypatch, mixes)
+
+    stems = extractor.separate_audio(wav)
+
+    assert mixes == []
+    assert not stems.any()
+    assert extractor.last_skipped_seconds == 3.0
+
+
+def test_skip_silence_with_model(tiny_models):
+    wav = quiet_gap_mix()
+    extractor = voicextract.VocalExtractor(device="cpu", preset="fast", skip_silence=True)
+
+    stems = extractor.separate_audio(wav)
+
+    regions = voicextract.find_active_regions(wav[0].numpy(), SAMPLE_RATE)
+    gap = slice(regions[0][1], regions[1][0])
+    assert not stems[0, :, gap].any()
+    assert torch.equal(stems[1, :, gap], wav[0, :, gap])
+    # Audible regions went through the model
+    for start, end in regions:
+        assert stems[0, :, start:end].abs().mean() > 1e-3
+        assert not torch.equal(stems[1, :, start:end], wav[0, :, start:end])
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+import torch
+from demucs.apply import BagOfModels, apply_model
+
+import voicextract
+
+
+def mixture(seconds):
+    torch.manual_seed(1)
+    return 0.1 * torch.randn(1, 2, int(seconds * 44100))
+
+
+@pytest.mark.parametrize("options", [
+    {"shifts": 0, "split": False},
+    {"shifts": 0, "split": True, "overlap": 0.25},
+    {"shifts": 0, "split": True, "overlap": 0.1, "segment": 2},
+    {"shifts": 2, "split": True, "overlap": 0.25},
+])
+def test_vocals_match_apply_model(tiny_models, options):
+    model = voicextract.get_model("htdemucs")
+    mix = mixture(3.5 if not options["split"] else 9)
+    vocal_idx = model.sources.index("vocals")
+
+    with torch.no_grad():
+        random.seed(0)
+        expected = apply_model(model, mix, **options)[:, vocal_idx]
+        random.seed(0)
+        vocals = voicextract.apply_vocals(model, mix, **options)
+
+    torch.testing.assert_close(vocals, expected, rtol=0, atol=1e-6)
+
+
+def test_submodels_without_vocals_weight_are_skipped(tiny_models):
+    accompaniment_model, vocals_model = (voicextract.get_model("htdemucs").models[0] for _ in range(2))
+    bag = BagOfModels([accompaniment_model, vocals_model], weights=[[1., 1., 1., 0.], [0., 0., 0., 1.]])
+    calls = []
+    accompaniment_model.register_forward_hook(lambda *args: calls.append(1))
+    mix = mixture(2)
+
+    with torch.no_grad():
+        vocals = voicextract.apply_vocals(bag, mix, shifts=0)
+        assert calls == []
+        expected = apply_model(bag, mix, shifts=0)[:, bag.sources.index("vocals")]
+
+    torch.testing.assert_close(vocals, expected, rtol=0, atol=1e-6)
+
+
+def test_accompaniment_is_mixture_minus_vocals(tiny_models):
+    mix = mixture(2)
+    four_stems = voicextract.VocalExtractor(device="cpu", preset="fast")
+    two_stems = voicextract.VocalExtractor(device="cpu", preset="fast", two_stems=True)
+
+    vocals, accompaniment = two_stems.separate(mix)
+    expected_vocals, _ = four_stems.separate(mix)
+
+    torch.testing.assert_close(vocals, expected_vocals, rtol=0, atol=1e-6)
+    assert torch.equal(accompaniment, mix - vocals)
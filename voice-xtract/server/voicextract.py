@@ -3,7 +3,7 @@ import os
 import torch
 import numpy as np
 from demucs.pretrained import get_model
-from demucs.apply import apply_model
+from demucs.apply import apply_model, BagOfModels, TensorChunk
 from demucs.audio import AudioFile
 import argparse
 from pathlib import Path
@@ -15,20 +15,910 @@ import gc
 import time
 import sys
 import traceback
+import json
+import socket
+import socketserver
+import contextlib
+import fcntl
+import hashlib
+import shutil
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ModelPool:
+    def __init__(self, load_model, max_memory_mb=None):
+        """
+        Keeps several loaded models resident and evicts the least recently used
+        ones once their combined size exceeds the memory budget
+
+        Args:
+            load_model: Callable that loads a model by name
+            max_memory_mb: Memory budget for resident models in MB
+                          None = no limit
+        """
+        self.load_model = load_model
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.models = OrderedDict()  # model name -> (model, size in bytes)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    @staticmethod
+    def model_size(model):
+        """Returns the memory occupied by the parameters and buffers of a model in bytes"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def memory_used(self):
+        """Returns the combined size of all resident models in bytes"""
+        return sum(size for _, size in self.models.values())
+
+    def get(self, model_name):
+        """
+        Returns a model from the pool, loading it on a miss
+
+        Args:
+            model_name: Name of the demucs model
+
+        Returns:
+            The loaded model
+        """
+        if model_name in self.models:
+            self.hits += 1
+            self.models.move_to_end(model_name)
+            return self.models[model_name][0]
+
+        self.misses += 1
+        start_load = time.time()
+        model = self.load_model(model_name)
+        self.load_time += time.time() - start_load
+
+        self.models[model_name] = (model, self.model_size(model))
+        self.evict(keep=model_name)
+        return model
+
+    def evict(self, keep=None):
+        """
+        Evicts least recently used models until the pool fits into the memory budget
+
+        Args:
+            keep: Name of a model that must stay resident (e.g. the one just loaded)
+        """
+        if self.max_memory_bytes is None:
+            return
+
+        evicted = False
+        for name in list(self.models):
+            if self.memory_used() <= self.max_memory_bytes:
+                break
+            if name == keep:
+                continue
+
+            del self.models[name]
+            self.evictions += 1
+            evicted = True
+            print(f"Evicted model {name} from the model pool")
+
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def stats(self):
+        """Returns hit/miss counters and load times of the pool"""
+        requests = self.hits + self.misses
+        return {
+            'models': list(self.models),
+            'memory_mb': round(self.memory_used() / (1024 * 1024), 1),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+            'load_time': round(self.load_time, 2),
+            'avg_load_time': round(self.load_time / self.misses, 2) if self.misses else 0.0
+        }
+
+
+# Estimated model activation memory per input sample, used to size automatic batches
+ACTIVATION_BYTES_PER_SAMPLE = 4096
+MAX_BATCH_SEGMENTS = 16
+
+# Silence detection: frame length of the energy envelope, default level below which a frame
+# counts as silent, shortest silence worth skipping and context kept around audible regions
+SILENCE_FRAME_SECONDS = 0.05
+SILENCE_THRESHOLD_DB = -50.0
+SILENCE_MIN_SECONDS = 1.0
+SILENCE_MARGIN_SECONDS = 0.25
+
+# Crossfade between the excerpts of a preview taken from several positions of a track
+PREVIEW_CROSSFADE_SECONDS = 0.5
+
+# Inference precisions: full float, bfloat16 autocast, dynamic INT8 quantization (CPU only)
+PRECISIONS = ("fp32", "bf16", "int8")
+
+# Checkpoints of interrupted segmented jobs that are not resumed within this time are removed
+CHECKPOINT_MAX_AGE_SECONDS = 7 * 24 * 3600
+# Without a segment size, only inputs of at least CHECKPOINT_MIN_SECONDS are split for checkpoints
+# (into CHECKPOINT_SEGMENT_SECONDS segments), since only segmented jobs can resume. Shorter inputs
+# are separated at once, exactly as without checkpoints.
+CHECKPOINT_MIN_SECONDS = 600
+CHECKPOINT_SEGMENT_SECONDS = 60
+
+DEFAULT_MODEL = "htdemucs"
+
+# Speed/quality presets: model, apply_model arguments (random shifts, overlap of the model's
+# internal chunks, chunked processing, chunk length in seconds) and torch threads
+# (None = all cores; 'fast' is capped so that cheap jobs leave cores to others).
+# The transformer models cannot run unchunked on inputs longer than their training segment
+# of 7.8s and pad shorter chunks to it, so the longest chunk is also the fastest (the segment
+# is capped at the training segment of the model in use).
+PRESETS = {
+    "fast": {"model": "htdemucs", "shifts": 0, "overlap": 0.1, "split": True, "segment": 7.8, "threads": 2},
+    "balanced": {"model": "htdemucs", "shifts": 1, "overlap": 0.25, "split": True, "segment": 7.8,
+                 "threads": None},
+    "best": {"model": "htdemucs_ft", "shifts": 2, "overlap": 0.5, "split": True, "segment": 7.8,
+             "threads": None}
+}
+
+
+def available_memory():
+    """Returns the available system memory in bytes, or None if it cannot be determined"""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def find_active_regions(audio, sample_rate, threshold_db=SILENCE_THRESHOLD_DB, min_silence=SILENCE_MIN_SECONDS,
+                        margin=SILENCE_MARGIN_SECONDS):
+    """
+    Finds the audible regions of a signal from its energy envelope
+
+    The signal is reduced to one RMS value per frame of SILENCE_FRAME_SECONDS, so the
+    pass costs a fraction of a second even for long recordings. Audible regions are
+    widened by the margin on both sides and gaps shorter than min_silence are not split.
+
+    Args:
+        audio: Audio data as NumPy array with shape (channels, samples)
+        sample_rate: Sample rate
+        threshold_db: Level in dBFS below which a frame counts as silent
+        min_silence: Shortest silence in seconds that separates two regions
+        margin: Seconds of context kept before and after each audible region
+
+    Returns:
+        List of (start, end) sample ranges, empty if the whole signal is silent
+    """
+    total_samples = audio.shape[-1]
+    frame = max(1, int(sample_rate * SILENCE_FRAME_SECONDS))
+    frames = -(-total_samples // frame)
+
+    # Mean square over channels and frames; the last frame is averaged over its actual length
+    power = np.zeros(frames * frame, dtype=np.float64)
+    power[:total_samples] = np.square(audio, dtype=np.float64).mean(axis=0)
+    frame_lengths = np.full(frames, frame)
+    frame_lengths[-1] = total_samples - (frames - 1) * frame
+    energy = power.reshape(frames, frame).sum(axis=1) / frame_lengths
+
+    active = 10 * np.log10(energy + 1e-12) > threshold_db
+    margin_frames = int(round(margin / SILENCE_FRAME_SECONDS))
+    if margin_frames:
+        active = np.convolve(active, np.ones(2 * margin_frames + 1), mode="same") > 0
+
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    min_gap = max(1, int(round(min_silence / SILENCE_FRAME_SECONDS)))
+
+    regions = []
+    for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    return [(int(start) * frame, min(int(end) * frame, total_samples)) for start, end in regions]
+
+
+def apply_vocals(model, mix, shifts=1, split=True, overlap=0.25, segment=None):
+    """
+    Computes only the vocals of a mixture, following demucs' apply_model
+
+    Random shifts, chunking and the overlap-add of chunks work as in apply_model, but
+    only the vocals are accumulated, so the full-length tensor of all sources is never
+    allocated. Sub-models of a bag whose weight for vocals is zero (e.g. the
+    per-source models of htdemucs_ft) are not run at all.
+
+    Args:
+        model: Demucs model or bag of models with a 'vocals' source
+        mix: Audio tensor (or TensorChunk) with shape (batch, channels, time)
+        shifts: Number of random shifts to average
+        split: Process the mixture in chunks of the model's segment length
+        overlap: Overlap of consecutive chunks
+        segment: Chunk length in seconds, None = the model's segment length
+
+    Returns:
+        Vocals tensor with shape (batch, channels, time)
+    """
+    options = {"shifts": shifts, "split": split, "overlap": overlap, "segment": segment}
+    vocal_idx = model.sources.index('vocals')
+
+    if isinstance(model, BagOfModels):
+        estimate = 0.
+        total_weight = 0.
+        for sub_model, weights in zip(model.models, model.weights):
+            if not weights[vocal_idx]:
+                continue
+            estimate = estimate + weights[vocal_idx] * apply_vocals(sub_model, mix, **options)
+            total_weight += weights[vocal_idx]
+        return estimate / total_weight
+
+    batch, channels, length = mix.shape
+
+    if shifts:
+        max_shift = int(0.5 * model.samplerate)
+        padded_mix = TensorChunk(mix).padded(length + 2 * max_shift)
+        vocals = 0.
+        for _ in range(shifts):
+            offset = random.randint(0, max_shift)
+            shifted = TensorChunk(padded_mix, offset, length + max_shift - offset)
+            vocals = vocals + apply_vocals(model, shifted, **{**options, "shifts": 0})[..., max_shift - offset:]
+        return vocals / shifts
+
+    if split:
+        segment_length = int(model.samplerate * (segment or model.segment))
+        stride = int((1 - overlap) * segment_length)
+        # Triangular weights with the maximum in the middle of the chunk, as in apply_model
+        weight = torch.cat([torch.arange(1, segment_length // 2 + 1, device=mix.device),
+                            torch.arange(segment_length - segment_length // 2, 0, -1, device=mix.device)])
+        weight = weight / weight.max()
+
+        vocals = torch.zeros(batch, channels, length, device=mix.device)
+        sum_weight = torch.zeros(length, device=mix.device)
+        for offset in range(0, length, stride):
+            chunk = TensorChunk(mix, offset, segment_length)
+            # All sources exist only for the length of one chunk
+            chunk_vocals = apply_model(model, chunk, shifts=0, split=False, segment=segment)[:, vocal_idx]
+            chunk_length = chunk_vocals.shape[-1]
+            vocals[..., offset:offset + segment_length] += weight[:chunk_length] * chunk_vocals
+            sum_weight[offset:offset + segment_length] += weight[:chunk_length]
+        return vocals / sum_weight
+
+    return apply_model(model, mix, shifts=0, split=False, segment=segment)[:, vocal_idx]
+
+
+def bf16_supported(device):
+    """
+    Checks whether bfloat16 runs natively on the device
+
+    On CPUs without AVX512-BF16 or AMX, bfloat16 is emulated and slower than fp32.
+    """
+    if device == "cuda":
+        return torch.cuda.is_bf16_supported()
+    for check in ("_is_avx512_bf16_supported", "_is_amx_tile_supported"):
+        if getattr(torch.cpu, check, lambda: False)():
+            return True
+    return False
+
+
+class Telemetry:
+    def __init__(self, stream=None):
+        """
+        Machine-readable event channel with one JSON object per line
+
+        Events carry an 'event' type and a timestamp: 'progress' updates, 'stage'
+        timings, per-segment 'segment' throughput and ETA, 'done' summaries and
+        memory high-water marks.
+
+        Args:
+            stream: Writable text stream for the events. None = events are only
+                    passed to the listener (if any)
+        """
+        self.stream = stream
+        # Optional callable that receives every event dictionary (used by the worker)
+        self.listener = None
+
+    @classmethod
+    def open(cls, fd=None, socket_path=None):
+        """
+        Opens the event channel on an inherited file descriptor or a Unix socket
+
+        Args:
+            fd: File descriptor number (e.g. 3, passed by the parent process)
+            socket_path: Path of a Unix socket to connect to
+
+        Returns:
+            Telemetry instance
+        """
+        if fd is not None:
+            return cls(os.fdopen(fd, "w", buffering=1, encoding="utf-8"))
+        if socket_path is not None:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(socket_path)
+            return cls(client.makefile("w", buffering=1, encoding="utf-8"))
+        return cls()
+
+    @staticmethod
+    def memory():
+        """Returns memory high-water marks of this process in MB"""
+        usage = {}
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            usage["rss_peak_mb"] = round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        except ImportError:
+            pass
+        if torch.cuda.is_available():
+            usage["cuda_peak_mb"] = round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1)
+        return usage
+
+    def emit(self, event, **fields):
+        """
+        Sends an event
+
+        Args:
+            event: Event type
+            fields: Event data (must be JSON serializable)
+        """
+        if self.stream is None and self.listener is None:
+            return
+
+        data = {"event": event, "time": round(time.time(), 3), **fields}
+        if self.listener is not None:
+            self.listener(data)
+        if self.stream is not None:
+            try:
+                self.stream.write(json.dumps(data) + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                # Reader went away, keep processing without telemetry
+                self.stream = None
+
+    def stage(self, name, start, **fields):
+        """
+        Sends the timing of a finished processing stage
+
+        Args:
+            name: Stage name (e.g. 'decode', 'separate', 'encode')
+            start: Start time of the stage as returned by time.time()
+            fields: Additional stage data
+        """
+        self.emit("stage", stage=name, seconds=round(time.time() - start, 3), **fields)
+
+
+class ResultCache:
+    def __init__(self, cache_dir, max_size_mb=2048):
+        """
+        Disk cache for extraction results, addressed by the input content and settings
+
+        Each entry is a directory with the output files and a manifest of their sizes
+        and hashes. Entries are written to a temporary directory and renamed into place,
+        and verified against the manifest before they are served.
+
+        Args:
+            cache_dir: Directory for cache entries
+            max_size_mb: Size limit of the cache in MB, least recently used entries
+                         are evicted when it is exceeded
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(path):
+        """Returns the SHA-256 hex digest of a file"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, input_file, settings):
+        """
+        Computes the cache key of an extraction
+
+        Args:
+            input_file: Path to input audio file
+            settings: Dictionary of settings that influence the output
+
+        Returns:
+            Hex string identifying the extraction
+        """
+        digest = hashlib.sha256()
+        digest.update(self.file_hash(input_file).encode("ascii"))
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, output_dir):
+        """
+        Copies a cached result into the output directory
+
+        Args:
+            key: Cache key
+            output_dir: Directory for output files
+
+        Returns:
+            Dictionary with paths to the extracted files, or None on a miss
+        """
+        entry_dir = self.entry_dir(key)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+            # Never serve an entry whose files do not match the manifest
+            for name, info in manifest["files"].items():
+                path = os.path.join(entry_dir, name)
+                if os.path.getsize(path) != info["size"] or self.file_hash(path) != info["sha256"]:
+                    raise ValueError(f"Corrupt cache entry {key}")
+
+        except FileNotFoundError:
+            self.record(hit=False)
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Discarding cache entry: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self.record(hit=False)
+            return None
+
+        os.makedirs(output_dir, exist_ok=True)
+        result = {}
+        for stem, name in manifest["stems"].items():
+            result[stem] = os.path.join(output_dir, name)
+            shutil.copyfile(os.path.join(entry_dir, name), result[stem])
+
+        # Mark entry as recently used
+        os.utime(manifest_path)
+        self.record(hit=True)
+        return result
+
+    def put(self, key, result):
+        """
+        Stores the output files of an extraction
+
+        Args:
+            key: Cache key
+            result: Dictionary with paths to the extracted files
+        """
+        entry_dir = self.entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            manifest = {"stems": {}, "files": {}, "created": time.time()}
+            for stem, path in result.items():
+                name = os.path.basename(path)
+                shutil.copyfile(path, os.path.join(temp_dir, name))
+                manifest["stems"][stem] = name
+                manifest["files"][name] = {"size": os.path.getsize(path), "sha256": self.file_hash(path)}
+
+            with open(os.path.join(temp_dir, "manifest.json"), "w") as f:
+                json.dump(manifest, f)
+
+            # Publish the complete entry at once
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not os.path.exists(entry_dir):
+                raise
+
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits into its size limit"""
+        entries = []
+        total_size = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    last_used = os.path.getmtime(os.path.join(entry_dir, "manifest.json"))
+                    size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry_dir))
+                total_size += size
+
+        for last_used, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+            try:
+                os.rmdir(os.path.dirname(entry_dir))
+            except OSError:
+                pass  # prefix directory still holds other entries
+
+    def record(self, hit):
+        """Updates the hit/miss counters, both for this process and persisted in the cache directory"""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        stats_path = os.path.join(self.cache_dir, "stats.json")
+        # Batch workers and pipeline threads update the totals concurrently
+        with open(f"{stats_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(stats_path) as f:
+                    totals = json.load(f)
+            except (OSError, ValueError):
+                totals = {"hits": 0, "misses": 0}
+            totals["hits" if hit else "misses"] += 1
+
+            temp_path = f"{stats_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, "w") as f:
+                json.dump(totals, f)
+            os.replace(temp_path, stats_path)
+
+    def stats(self):
+        """Returns hit/miss counters of this process and of all processes using the cache"""
+        try:
+            with open(os.path.join(self.cache_dir, "stats.json")) as f:
+                totals = json.load(f)
+        except (OSError, ValueError):
+            totals = {"hits": 0, "misses": 0}
+
+        requests = self.hits + self.misses
+        total_requests = totals["hits"] + totals["misses"]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+            'total_hits': totals["hits"],
+            'total_misses': totals["misses"],
+            'total_hit_rate': round(totals["hits"] / total_requests, 3) if total_requests else 0.0
+        }
+
+
+class SegmentCheckpoint:
+    def __init__(self, checkpoint_dir, key, segments, channels, segment_samples):
+        """
+        Scratch storage for the finished segments of a segmented extraction
+
+        Separated segments are written to a memory-mapped file, and a manifest records
+        which of them are complete. When an interrupted job is run again with the same
+        input and settings (the same key), completed segments are read back from the
+        file instead of being separated again.
+
+        Args:
+            checkpoint_dir: Directory for checkpoints
+            key: Hex string identifying the input and settings of the extraction
+            segments: List of (start, end) sample ranges of the segments
+            channels: Number of audio channels
+            segment_samples: Length of a full segment in samples
+        """
+        self.entry_dir = os.path.join(checkpoint_dir, key)
+        self.data_path = os.path.join(self.entry_dir, "segments.f32")
+        self.manifest_path = os.path.join(self.entry_dir, "manifest.json")
+        self.segments = segments
+        self.layout = {"segments": [list(bounds) for bounds in segments], "channels": channels,
+                       "segment_samples": segment_samples}
+
+        if not os.path.isdir(self.entry_dir):
+            self.prune(checkpoint_dir)
+        os.makedirs(self.entry_dir, exist_ok=True)
+
+        # Vocals and accompaniment of every segment, shorter segments leave the rest unused
+        shape = (len(segments), 2, channels, segment_samples)
+        self.completed = self.load(int(np.prod(shape)) * 4)
+        self.data = np.memmap(self.data_path, dtype=np.float32, mode="r+" if self.completed else "w+", shape=shape)
+
+    def load(self, data_size):
+        """Returns the indices of completed segments recorded by a previous run"""
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["layout"] != self.layout:
+                raise ValueError("segment layout changed")
+            if os.path.getsize(self.data_path) != data_size:
+                raise ValueError("scratch file has the wrong size")
+            return set(manifest["completed"])
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Discarding checkpoint: {e}")
+            return set()
+
+    def segment(self, index):
+        """Returns the stems of a completed segment as a tensor backed by the scratch file"""
+        start, end = self.segments[index]
+        return torch.from_numpy(self.data[index, :, :, :end - start])
+
+    def store(self, index, stems):
+        """Writes the stems of a segment, they count as completed after the next commit"""
+        self.data[index, :, :, :stems.shape[-1]] = stems.float().numpy()
+
+    def commit(self, indices):
+        """Flushes stored segments to disk and records them as completed"""
+        self.data.flush()
+        self.completed.update(indices)
+
+        temp_path = f"{self.manifest_path}.{os.getpid()}"
+        with open(temp_path, "w") as f:
+            json.dump({"layout": self.layout, "completed": sorted(self.completed), "updated": time.time()}, f)
+        os.replace(temp_path, self.manifest_path)
+
+    @staticmethod
+    def discard(checkpoint_dir, key):
+        """Removes the checkpoint of a finished extraction"""
+        shutil.rmtree(os.path.join(checkpoint_dir, key), ignore_errors=True)
+
+    @staticmethod
+    def prune(checkpoint_dir, max_age=CHECKPOINT_MAX_AGE_SECONDS):
+        """Removes checkpoints of abandoned jobs that have not been updated for max_age seconds"""
+        if not os.path.isdir(checkpoint_dir):
+            return
+        for key in os.listdir(checkpoint_dir):
+            entry_dir = os.path.join(checkpoint_dir, key)
+            try:
+                last_update = os.path.getmtime(entry_dir)
+                if os.path.exists(os.path.join(entry_dir, "manifest.json")):
+                    last_update = os.path.getmtime(os.path.join(entry_dir, "manifest.json"))
+            except OSError:
+                continue
+            if time.time() - last_update > max_age:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+
+
+class BatchIndex:
+    def __init__(self, path):
+        """
+        Persistent index of the files processed by incremental batch runs
+
+        For every input file it records size, modification time, content hash, the
+        settings it was processed with and the output files. A file whose entry still
+        matches is skipped by the next run. Size and modification time are checked
+        first; the content is only hashed when they changed, so touched or copied
+        files with the same content are not separated again.
+
+        Args:
+            path: Path of the JSON index file
+        """
+        self.path = path
+        self.files = {}
+
+        try:
+            with open(path) as f:
+                self.files = json.load(f)["files"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable batch index {path}: {e}")
+
+    def is_current(self, input_file, settings):
+        """
+        Checks whether a file was already processed with the same content and settings
+
+        Args:
+            input_file: Path to input audio file
+            settings: Dictionary of settings that influence the output
+
+        Returns:
+            True if the recorded outputs are up to date
+        """
+        entry = self.files.get(os.path.abspath(input_file))
+        if entry is None or entry["settings"] != settings:
+            return False
+        if not all(os.path.exists(path) for path in entry["outputs"].values()):
+            return False
+
+        stat = os.stat(input_file)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        # Modified time changed, the content may still be the same
+        if ResultCache.file_hash(input_file) != entry["sha256"]:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def update(self, input_file, settings, result):
+        """Records a successfully processed file and writes the index"""
+        stat = os.stat(input_file)
+        self.files[os.path.abspath(input_file)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": ResultCache.file_hash(input_file),
+            "settings": settings,
+            "outputs": {stem: os.path.abspath(path) for stem, path in result.items()},
+            "processed": time.time()
+        }
+        self.save()
+
+    def prune(self):
+        """Removes entries of input files that no longer exist"""
+        self.files = {path: entry for path, entry in self.files.items() if os.path.exists(path)}
+
+    def save(self):
+        """Writes the index atomically, so an interrupted run never leaves a partial file"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}"
+        with open(temp_path, "w") as f:
+            json.dump({"files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class StemWriter:
+    def __init__(self, path, sample_rate, channels, format="mp3", bitrate="192k"):
+        """
+        Writes a stem incrementally, as WAV via soundfile or as MP3 by piping raw PCM into ffmpeg
+
+        Args:
+            path: Output path
+            sample_rate: Sample rate
+            channels: Number of audio channels
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.process = None
+        self.sound_file = None
+
+        if format.lower() == "mp3":
+            try:
+                self.stderr = tempfile.TemporaryFile()
+                self.process = subprocess.Popen([
+                    "ffmpeg", "-y", "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels),
+                    "-i", "pipe:0", "-b:a", bitrate, path
+                ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self.stderr)
+                return
+            except FileNotFoundError:
+                print("ffmpeg not found. Please install ffmpeg.")
+                # Fallback: Save as WAV
+                self.path = os.path.splitext(path)[0] + ".wav"
+                print(f"Saving as WAV instead: {self.path}")
+
+        self.sound_file = sf.SoundFile(self.path, mode="w", samplerate=sample_rate, channels=channels)
+
+    def write(self, chunk):
+        """
+        Appends audio samples to the stem
+
+        Args:
+            chunk: Audio data as NumPy array with shape (channels, samples)
+        """
+        chunk = np.clip(chunk, -1, 1).astype(np.float32)
+
+        if self.process is not None:
+            # ffmpeg expects interleaved samples
+            self.process.stdin.write(np.ascontiguousarray(chunk.T).tobytes())
+        else:
+            self.sound_file.write(chunk.T)
+
+    def close(self):
+        """
+        Finishes the stem file
+
+        Returns:
+            Path of the written file
+
+        Raises:
+            RuntimeError: If ffmpeg failed to encode the stem
+        """
+        if self.sound_file is not None:
+            self.sound_file.close()
+            return self.path
+
+        self.process.stdin.close()
+        return_code = self.process.wait()
+        if return_code != 0:
+            self.stderr.seek(0)
+            message = self.stderr.read().decode("utf-8", errors="replace")
+            self.stderr.close()
+            raise RuntimeError(f"ffmpeg failed with code {return_code}: {message}")
+
+        self.stderr.close()
+        return self.path
+
+
+def read_pcm(stream, num_samples, channels):
+    """
+    Reads up to num_samples float32 frames from a raw PCM stream
+
+    Args:
+        stream: Binary stream with interleaved float32 samples
+        num_samples: Maximum number of frames to read
+        channels: Number of audio channels
+
+    Returns:
+        NumPy array with shape (channels, samples), empty at the end of the stream
+    """
+    frame_bytes = 4 * channels
+    data = bytearray()
+    remaining = num_samples * frame_bytes
+
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        data += chunk
+        remaining -= len(chunk)
+
+    usable = len(data) - len(data) % frame_bytes
+    return np.frombuffer(bytes(data[:usable]), dtype=np.float32).reshape(-1, channels).T
 
 
 class VocalExtractor:
-    def __init__(self, model_name="htdemucs", segment_size=None, device=None):
+    def __init__(self, model_name=None, segment_size=None, device=None, model_cache_mb=2048,
+                 stream=False, batch_segments=1, cache_dir=None, cache_max_mb=2048, telemetry=None,
+                 skip_silence=False, silence_threshold=SILENCE_THRESHOLD_DB, precision="fp32", warmup=None,
+                 preset=None, two_stems=False, checkpoint_dir=None):
         """
         Initializes the Vocal Extractor with demucs
 
         Args:
-            model_name: Name of the demucs model to use
-                       (htdemucs is a good standard model)
+            model_name: Name of the demucs model to use. None = the model of the
+                       preset, or htdemucs (a good standard model)
             segment_size: Size of audio segments for chunk processing (in seconds)
                          None = entire file is processed at once
             device: Device for processing, 'cuda' or 'cpu'. If None, automatically selected.
+            model_cache_mb: Memory budget in MB for models kept resident when switching
+                           between models. None = no limit
+            stream: Decode, separate and encode the audio window by window so that
+                    memory usage does not grow with the length of the file
+            batch_segments: Number of segments separated together in one model pass
+                            in segmented mode. 0 or None = choose from available memory
+            cache_dir: Directory for cached results of previous extractions. None = no cache
+            cache_max_mb: Size limit of the result cache in MB
+            telemetry: Telemetry channel for machine-readable events. None = disabled
+            skip_silence: Detect silent regions with a cheap energy pre-pass and leave them
+                          out of the model pass (vocals are silent there, the accompaniment
+                          is the unchanged input)
+            silence_threshold: Level in dBFS below which audio counts as silent
+            precision: Inference precision, one of PRECISIONS. 'bf16' runs the model under
+                       bfloat16 autocast, 'int8' quantizes its Linear and LSTM layers
+                       dynamically (CPU only). Falls back to 'fp32' where not supported
+            warmup: Run a dummy pass after loading a model. None = only on CUDA
+            preset: Speed/quality preset from PRESETS. None = demucs defaults
+            two_stems: Compute only the vocals and derive the accompaniment as mixture
+                       minus vocals, without materializing the other sources
+            checkpoint_dir: Directory for checkpoints of segmented extractions, so that an
+                            interrupted job resumes at its first unfinished segment. Without
+                            segment_size, only files of at least CHECKPOINT_MIN_SECONDS are split
+                            (into CHECKPOINT_SEGMENT_SECONDS segments) and checkpointed.
+                            None = disabled
         """
+        self.telemetry = telemetry or Telemetry()
+        # Duration of the audio processed by the last extraction in seconds
+        self.last_audio_seconds = None
+        # Seconds of silence the last extraction did not run through the model
+        self.last_skipped_seconds = None
+
+        # Optional callable(percentage, message) that receives every progress update,
+        # used by the worker daemon to forward progress as structured events
+        self.progress_callback = None
+        # Per-thread 'map' callable(percentage) that rescales progress (None = drop the update)
+        self.progress_scope = threading.local()
+
         self.report_progress(1, "Loading model...")
 
         # Automatic device selection if not specified
@@ -37,31 +927,120 @@ class VocalExtractor:
         else:
             self.device = device
 
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+        if precision == "bf16" and not bf16_supported(self.device):
+            print(f"Warning: bfloat16 is not supported natively on this {self.device}, using fp32")
+            precision = "fp32"
+        elif precision == "int8" and self.device != "cpu":
+            print("Warning: INT8 quantization is only available on CPU, using fp32")
+            precision = "fp32"
+        self.precision = precision
+        self.warmup = warmup
+
+        if model_name is None:
+            model_name = PRESETS[preset]["model"] if preset else DEFAULT_MODEL
+
+        # Thread count to return to when a preset without a thread limit is applied
+        self.default_threads = torch.get_num_threads()
+        self.apply_preset(preset)
+
         self.model_name = model_name
         self.segment_size = segment_size
+        self.stream = stream
+        self.batch_segments = batch_segments
+        self.skip_silence = skip_silence
+        self.two_stems = two_stems
+        self.silence_threshold = silence_threshold
+        self.result_cache = ResultCache(cache_dir, cache_max_mb) if cache_dir else None
+        self.checkpoint_dir = checkpoint_dir
+
+        self.model_pool = ModelPool(self.load_model, model_cache_mb)
+        self.model = self.model_pool.get(model_name)
+
+    def load_model(self, model_name):
+        """
+        Loads a demucs model onto the configured device
 
+        Args:
+            model_name: Name of the demucs model to load
+
+        Returns:
+            The loaded model
+        """
         try:
-            self.model = get_model(model_name)
-            self.model.to(self.device)
+            start_load = time.time()
+            model = get_model(model_name)
+            model.to(self.device)
+            model.eval()
+            if self.precision == "int8":
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM},
+                                                               dtype=torch.qint8)
+            self.telemetry.stage("model_load", start_load, model=model_name, precision=self.precision)
 
             # Output model info
             self.report_progress(3, f"Model {model_name} loaded")
-            print(f"Using device: {self.device}")
-            print(f"Model loaded: {model_name}, Sources: {self.model.sources}")
+            print(f"Using device: {self.device}, precision: {self.precision}")
+            print(f"Model loaded: {model_name}, Sources: {model.sources}")
 
             # Warmup for the model (can help reduce initial processing latency)
-            if self.device == "cuda":
+            if self.warmup or (self.warmup is None and self.device == "cuda"):
                 self.report_progress(4, "Performing model warmup...")
-                dummy_input = torch.randn(1, 2, 44100, device=self.device)  # 1 second audio
-                with torch.no_grad():
-                    _ = self.model(dummy_input)
-                torch.cuda.synchronize()
+                start_warmup = time.time()
+                # 1 second of audio
+                dummy_input = torch.zeros(1, model.audio_channels, model.samplerate, device=self.device)
+                with torch.no_grad(), self.precision_context():
+                    apply_model(model, dummy_input, shifts=0)
+                if self.device == "cuda":
+                    torch.cuda.synchronize()
+                self.telemetry.stage("warmup", start_warmup, model=model_name)
                 self.report_progress(5, "Model warmup completed")
 
+            return model
+
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
 
+    def apply_preset(self, preset):
+        """
+        Applies the apply_model settings and thread count of a preset (the model is chosen
+        separately, see use_model)
+
+        Args:
+            preset: Name of a preset from PRESETS, None = demucs defaults and all threads
+                    (a preset never uses more threads than were available at startup)
+        """
+        if preset is not None and preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}', expected one of {', '.join(PRESETS)}")
+
+        settings = PRESETS[preset] if preset else {}
+        self.preset = preset
+        self.apply_options = {key: settings[key] for key in ("shifts", "overlap", "split", "segment")
+                              if settings.get(key) is not None}
+        threads = settings.get("threads")
+        torch.set_num_threads(min(threads, self.default_threads) if threads else self.default_threads)
+
+    def precision_context(self):
+        """Returns the autocast context for the configured precision (a no-op unless 'bf16')"""
+        if self.precision == "bf16":
+            return torch.autocast(device_type=self.device, dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def use_model(self, model_name):
+        """
+        Switches the active model, taking it from the model pool if it is still resident
+
+        Args:
+            model_name: Name of the demucs model to use for the next jobs
+        """
+        if model_name == self.model_name:
+            return
+
+        self.report_progress(1, f"Switching model to {model_name}...")
+        self.model = self.model_pool.get(model_name)
+        self.model_name = model_name
+
     def report_progress(self, percentage, message=None):
         """
         Outputs a progress message that can be recognized by the server
@@ -70,19 +1049,112 @@ class VocalExtractor:
             percentage: Percentage as an integer (0-100)
             message: Optional message to output with the progress
         """
+        # Batch pipelines map per-file progress into the progress of the batch, or drop it
+        progress_map = getattr(self.progress_scope, "map", None)
+        if progress_map is not None:
+            percentage = progress_map(percentage)
+            if percentage is None:
+                return
+
         # Limit progress to valid values
         percentage = max(0, min(100, int(percentage)))
 
-        print(f"Progress: {percentage}%")
+        # Single write so lines from pipeline threads do not interleave
+        output = f"Progress: {percentage}%\n"
         if message:
-            print(f"Status: {message}")
+            output += f"Status: {message}\n"
+        sys.stdout.write(output)
 
         # Ensure output is displayed immediately
         sys.stdout.flush()
 
+        self.telemetry.emit("progress", progress=percentage, message=message)
+
+        if self.progress_callback is not None:
+            self.progress_callback(percentage, message)
+
+    def resolve_batch_segments(self, segment_samples):
+        """
+        Determines how many segments are separated together in one model pass
+
+        Args:
+            segment_samples: Length of a segment in samples
+
+        Returns:
+            Number of segments per batch (at least 1)
+        """
+        if self.batch_segments:
+            return max(1, int(self.batch_segments))
+
+        # Automatic: fit the batch into half of the currently available memory
+        if self.device == "cuda":
+            available_bytes, _ = torch.cuda.mem_get_info()
+        else:
+            available_bytes = available_memory()
+        if available_bytes is None:
+            return 1
+
+        # Rough per-segment estimate: model activations for one internal chunk of the model
+        # plus input and output buffers of all sources for the segment
+        model_segment = getattr(self.model, 'segment', None) or getattr(self.model, 'max_allowed_segment', None)
+        if not model_segment or model_segment == float('inf'):
+            model_segment = 8.0
+        chunk_samples = min(segment_samples, int(float(model_segment) * self.model.samplerate))
+        sources = 1 if self.two_stems else len(self.model.sources)
+        buffer_bytes = segment_samples * self.model.audio_channels * 4 * (sources + 3)
+        segment_bytes = chunk_samples * ACTIVATION_BYTES_PER_SAMPLE + buffer_bytes
+
+        return max(1, min(MAX_BATCH_SEGMENTS, int(available_bytes * 0.5 // segment_bytes)))
+
+    def separate(self, mix, model=None, **options):
+        """
+        Runs the model on a mixture and splits the result into vocals and accompaniment
+
+        Args:
+            mix: Audio tensor with shape (batch, channels, time)
+            model: Model to use instead of the active one
+            options: Additional arguments for demucs' apply_model (e.g. shifts), these
+                     take precedence over the preset
+
+        Returns:
+            Tuple of vocals and accompaniment tensors, each with shape (batch, channels, time)
+        """
+        if model is None:
+            model = self.model
+        stem_names = model.sources
+        if 'vocals' not in stem_names:
+            raise ValueError(f"Model has no vocals stem (stems: {stem_names})")
+        vocal_idx = stem_names.index('vocals')
+
+        options = {**self.apply_options, **options}
+        if options.get("segment") and isinstance(model, BagOfModels):
+            # Transformer models cannot process chunks longer than their training segment
+            options["segment"] = min(options["segment"], model.max_allowed_segment)
+
+        if self.two_stems:
+            with torch.no_grad(), self.precision_context():
+                vocals = apply_vocals(model, mix, **options)
+            vocals = vocals.float()
+            # Accompaniment is everything in the mixture that is not vocals
+            return vocals, torch.sub(mix, vocals)
+
+        with torch.no_grad(), self.precision_context():
+            sources = apply_model(model, mix, **options)
+        sources = sources.float()
+
+        vocals = sources[:, vocal_idx]
+
+        # Accompaniment is the sum of all sources except vocals
+        accompaniment = sources.sum(dim=1).sub_(vocals)
+
+        return vocals, accompaniment
+
     def save_audio(self, wav, path, sample_rate, format="mp3", bitrate="192k"):
         """
-        Saves audio data as MP3 or WAV file using ffmpeg
+        Saves audio data as MP3 or WAV file
+
+        WAV files are written directly to their final path. For MP3, the raw samples
+        are piped into ffmpeg's stdin, without an intermediate file.
 
         Args:
             wav: Audio data as NumPy array
@@ -90,64 +1162,274 @@ class VocalExtractor:
             sample_rate: Sample rate
             format: Output format ("mp3" or "wav")
             bitrate: Bitrate for MP3 compression
+
+        Returns:
+            Path of the written file (with .wav extension if MP3 encoding was not possible)
         """
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        chunk_samples = sample_rate * 10
 
-        # Clip values between -1 and 1
-        wav = np.clip(wav, -1, 1)
+        try:
+            writer = StemWriter(path, sample_rate, wav.shape[0], format, bitrate)
+            for start in range(0, wav.shape[1], chunk_samples):
+                writer.write(wav[:, start:start + chunk_samples])
+            return writer.close()
+
+        except (RuntimeError, BrokenPipeError) as e:
+            if format.lower() != "mp3":
+                raise
+            print(f"Error converting to MP3: {e}")
+            try:
+                writer.process.kill()
+                writer.process.wait()
+                writer.stderr.close()
+            except Exception:
+                pass
+
+            # Remove partial output before falling back to WAV
+            if os.path.exists(path):
+                os.unlink(path)
+            path = os.path.splitext(path)[0] + ".wav"
+            print(f"Saving as WAV instead: {path}")
+            return self.save_audio(wav, path, sample_rate, "wav")
+
+    def save_stems(self, stems, sample_rate, format="mp3", bitrate="192k"):
+        """
+        Saves several stems at the same time, each encoded by its own writer
 
-        # Temporary WAV file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-            temp_wav_path = temp_wav.name
+        Args:
+            stems: List of (audio data as NumPy array, output path) tuples
+            sample_rate: Sample rate
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
 
-        # Save WAV (with transposition for correct channel ordering)
-        sf.write(temp_wav_path, wav.T, sample_rate)
+        Returns:
+            List of the written paths, in the order of stems
+        """
+        self.report_progress(93, f"Encoding {len(stems)} stems as {format.upper()}...")
 
-        if format.lower() == "mp3":
-            try:
-                # Convert to MP3 with ffmpeg
-                self.report_progress(93, f"Converting to {format.upper()}...")
-                result = subprocess.run([
-                    "ffmpeg", "-y", "-i", temp_wav_path,
-                    "-b:a", bitrate, path
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-                # Successfully converted
-                self.report_progress(96, f"Conversion to {format.upper()} completed")
-
-            except subprocess.CalledProcessError as e:
-                print(f"Error converting to MP3: {e}")
-                print(f"ffmpeg error: {e.stderr.decode('utf-8') if e.stderr else 'Unknown'}")
-                # Fallback: Save as WAV if ffmpeg fails
-                import shutil
-                path = os.path.splitext(path)[0] + ".wav"
-                print(f"Saving as WAV instead: {path}")
-                shutil.copy(temp_wav_path, path)
+        with ThreadPoolExecutor(max_workers=len(stems)) as pool:
+            futures = [pool.submit(self.save_audio, wav, path, sample_rate, format, bitrate)
+                       for wav, path in stems]
+            paths = [future.result() for future in futures]
 
-            except FileNotFoundError:
-                print("ffmpeg not found. Please install ffmpeg.")
-                # Fallback: Save as WAV
-                import shutil
-                path = os.path.splitext(path)[0] + ".wav"
-                print(f"Saving as WAV instead: {path}")
-                shutil.copy(temp_wav_path, path)
+        self.report_progress(96, f"{format.upper()} output finalized")
+        return paths
+
+    def extract_vocals(self, input_file, output_dir, format="mp3", bitrate="192k"):
+        """
+        Extracts vocals from an audio file
+
+        Args:
+            input_file: Path to input audio file
+            output_dir: Directory for output files
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+
+        Returns:
+            Dictionary with paths to the extracted files
+        """
+        start_time = time.time()
+        self.last_audio_seconds = None
+        self.last_skipped_seconds = None
+        self.telemetry.emit("start", input=input_file, model=self.model_name, format=format)
+
+        cache_key, cached = self.lookup_cache(input_file, output_dir, format, bitrate)
+        if cached:
+            self.report_progress(100, "Extraction completed (served from cache)")
+            self.telemetry.emit("done", success=True, cached=True,
+                                seconds=round(time.time() - start_time, 3), **self.telemetry.memory())
+            return cached
+
+        if self.stream:
+            result = self.extract_vocals_streaming(input_file, output_dir, format, bitrate)
         else:
-            # Simply move the WAV file
-            self.report_progress(93, "Finalizing WAV output...")
-            import shutil
-            shutil.copy(temp_wav_path, path)
-            self.report_progress(96, "WAV output finalized")
+            result = self.extract_vocals_in_memory(input_file, output_dir, format, bitrate)
+
+        self.store_cache(cache_key, result)
+
+        total_time = time.time() - start_time
+        summary = {"success": bool(result), "cached": False, "seconds": round(total_time, 3)}
+        if self.last_audio_seconds:
+            summary["audio_seconds"] = round(self.last_audio_seconds, 3)
+            summary["realtime_factor"] = round(total_time / self.last_audio_seconds, 3)
+        if self.last_skipped_seconds is not None:
+            summary["skipped_seconds"] = round(self.last_skipped_seconds, 3)
+        self.telemetry.emit("done", **summary, **self.telemetry.memory())
+
+        return result
+
+    def extract_preview(self, input_file, output_dir, format="mp3", bitrate="192k", seconds=20, windows=1,
+                        model_name=None, budget=None):
+        """
+        Separates a short excerpt of a file, so that a first result is available within
+        seconds while the full extraction is still to come
+
+        Only the excerpts are decoded. With several windows, they are taken evenly across
+        the track and joined with short crossfades. The model runs without random shifts,
+        optionally a faster model is used. Windows are separated one after another until
+        the latency budget is used up; the first window is always completed.
+
+        Args:
+            input_file: Path to input audio file
+            output_dir: Directory for the preview files
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+            seconds: Length of each excerpt in seconds
+            windows: Number of excerpts (1 = the beginning of the track)
+            model_name: Model for the preview, None = the active model
+            budget: Latency budget in seconds, None = no limit
+
+        Returns:
+            Dictionary with paths to the preview files, empty if the preview failed
+        """
+        start_time = time.time()
 
-        # Delete temporary WAV file
         try:
-            os.unlink(temp_wav_path)
+            model = self.model_pool.get(model_name) if model_name else self.model
+            sample_rate = model.samplerate
+            audio_file = AudioFile(input_file)
+
+            try:
+                duration = audio_file.duration
+            except Exception:
+                duration = None
+            if windows > 1 and duration and duration > seconds:
+                starts = np.linspace(0, duration - seconds, windows)
+            else:
+                starts = [0.0]
+
+            self.report_progress(2, f"Separating preview ({len(starts)} x {seconds:g}s)...")
+
+            excerpts = []
+            for start in starts:
+                if excerpts and budget is not None and time.time() - start_time >= budget:
+                    print(f"Preview budget of {budget:g}s reached after {len(excerpts)} of {len(starts)} windows")
+                    break
+
+                wav = audio_file.read(seek_time=start, duration=seconds,
+                                      channels=model.audio_channels, samplerate=sample_rate)
+                if wav.dim() == 2:
+                    wav = wav.unsqueeze(0)
+                if wav.shape[-1] == 0:
+                    continue
+
+                vocals, accompaniment = self.separate(wav.to(self.device), model=model, shifts=0)
+                excerpts.append(torch.cat([vocals, accompaniment]).cpu())
+                del wav, vocals, accompaniment
+
+            if not excerpts:
+                raise ValueError(f"No audio decoded from {input_file}")
+
+            overlap_samples = max(1, min(int(PREVIEW_CROSSFADE_SECONDS * sample_rate),
+                                         min(excerpt.shape[-1] for excerpt in excerpts) // 2))
+            stems = self.crossfade_segments(excerpts, overlap_samples)
+            del excerpts
+
+            extension = f".{format.lower()}"
+            result = {
+                'vocals': self.save_audio(stems[0].numpy(), os.path.join(output_dir, f'preview_vocals{extension}'),
+                                          sample_rate, format, bitrate),
+                'accompaniment': self.save_audio(stems[1].numpy(),
+                                                 os.path.join(output_dir, f'preview_accompaniment{extension}'),
+                                                 sample_rate, format, bitrate)
+            }
+
+            preview_seconds = stems.shape[-1] / sample_rate
+            total_time = time.time() - start_time
+            self.telemetry.stage("preview", start_time, audio_seconds=round(preview_seconds, 3),
+                                 windows=len(starts), model=model_name or self.model_name)
+            self.report_progress(4, f"Preview ready ({preview_seconds:.0f}s of audio in {total_time:.1f}s)")
+
+            return result
+
         except Exception as e:
-            print(f"Warning: Could not delete temporary file: {e}")
+            # The full extraction still follows, so a failed preview is not fatal
+            print(f"Error during preview: {str(e)}")
+            traceback.print_exc()
+            return {}
 
-    def extract_vocals(self, input_file, output_dir, format="mp3", bitrate="192k"):
+    def lookup_cache(self, input_file, output_dir, format, bitrate):
         """
-        Extracts vocals from an audio file
+        Looks up a previous result for the same input and settings in the result cache
+
+        Returns:
+            Tuple of the cache key (None without cache) and the cached result (None on a miss)
+        """
+        if self.result_cache is None:
+            return None, None
+
+        start_lookup = time.time()
+        cache_key = self.result_cache.key(input_file, {**self.cache_settings(),
+                                                       "format": format.lower(), "bitrate": bitrate})
+        cached = self.result_cache.get(cache_key, output_dir)
+        self.telemetry.stage("cache_lookup", start_lookup, hit=bool(cached))
+        return cache_key, cached
+
+    def store_cache(self, cache_key, result):
+        """Stores a successful result under the key returned by lookup_cache"""
+        if not result or cache_key is None:
+            return
+
+        try:
+            self.result_cache.put(cache_key, result)
+        except OSError as e:
+            print(f"Warning: Could not store result in cache: {e}")
+
+    def cache_settings(self):
+        """
+        Returns the settings that influence the extracted audio, used as part of the cache key
+
+        Throughput settings such as batch_segments are left out. Segments of unequal length are
+        never batched together, so the output only differs within floating-point tolerance.
+
+        Returns:
+            Dictionary of settings
+        """
+        settings = {
+            "model": self.model_name,
+            "segment": self.segment_size,
+            "stream": self.stream
+        }
+        # Long inputs are segmented for checkpoints, which changes their output
+        if self.segment_size is None and self.checkpoint_dir is not None:
+            settings["checkpoint_segment"] = [CHECKPOINT_MIN_SECONDS, CHECKPOINT_SEGMENT_SECONDS]
+        # Only present when enabled, so entries cached with the default settings stay valid
+        if self.skip_silence:
+            settings["silence_threshold"] = self.silence_threshold
+        if self.precision != "fp32":
+            settings["precision"] = self.precision
+        if self.apply_options:
+            settings["apply"] = self.apply_options
+        if self.two_stems:
+            settings["two_stems"] = True
+        return settings
+
+    def effective_segment_size(self, audio_duration):
+        """Returns the segment size in seconds for an input, including the default used with checkpoints"""
+        if self.segment_size is None and self.checkpoint_dir is not None \
+                and audio_duration >= CHECKPOINT_MIN_SECONDS:
+            return CHECKPOINT_SEGMENT_SECONDS
+        return self.segment_size
+
+    def checkpoint_key(self, input_file):
+        """
+        Computes the key under which a segmented extraction is checkpointed
+
+        Returns:
+            Hex string identifying the input content and settings, or None when
+            checkpoints are disabled
+        """
+        if self.checkpoint_dir is None:
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(ResultCache.file_hash(input_file).encode("ascii"))
+        digest.update(json.dumps(self.cache_settings(), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def extract_vocals_in_memory(self, input_file, output_dir, format="mp3", bitrate="192k"):
+        """
+        Extracts vocals with the whole file decoded into memory, either at once or in segments
 
         Args:
             input_file: Path to input audio file
@@ -161,183 +1443,487 @@ class VocalExtractor:
         start_time = time.time()
         self.report_progress(5, "Starting extraction...")
 
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         try:
-            # Load audio
-            self.report_progress(7, "Loading audio file...")
-            wav = AudioFile(input_file).read(channels=self.model.audio_channels, samplerate=self.model.samplerate)
-            self.report_progress(10, "Audio loaded")
-
-            # Check if wav is already a tensor
-            if not isinstance(wav, torch.Tensor):
-                wav = torch.tensor(wav)
-
-            # Ensure audio has the right format (batch, channels, time)
-            if wav.dim() == 2:  # If it's (channels, time)
-                wav = wav.unsqueeze(0)  # Expand to (1, channels, time)
-            elif wav.dim() == 1:  # If it's just (time)
-                wav = wav.unsqueeze(0).unsqueeze(0)  # Expand to (1, 1, time)
-
-            # Move to the right device
-            self.report_progress(12, "Preparing audio data...")
-            wav = wav.to(self.device)
-            self.report_progress(15, "Audio preparation completed")
-
-            audio_duration = wav.shape[2] / self.model.samplerate
-            print(f"Audio duration: {audio_duration:.2f} seconds")
-            print(f"Audio shape: {wav.shape}")
-
-            # Define paths (with correct file extension)
-            extension = f".{format.lower()}"
-            vocal_path = os.path.join(output_dir, f'vocals{extension}')
-            accompaniment_path = os.path.join(output_dir, f'accompaniment{extension}')
+            checkpoint_key = self.checkpoint_key(input_file)
+            wav = self.load_audio(input_file)
+            stems = self.separate_audio(wav, start_time, checkpoint_key)
+            del wav
 
-            # Segmented processing or entire file at once
-            use_segments = self.segment_size is not None and wav.shape[2] > self.segment_size * self.model.samplerate
+            result = self.write_stems(stems, output_dir, format, bitrate)
+            if checkpoint_key and result:
+                SegmentCheckpoint.discard(self.checkpoint_dir, checkpoint_key)
 
-            if use_segments:
-                # Process audio in segments
-                segment_samples = int(self.segment_size * self.model.samplerate)
-                overlap_samples = segment_samples // 4  # 25% overlap
+            # Free memory
+            del stems
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+            gc.collect()
 
-                # Initialize output tensors
-                all_vocals = []
-                all_accompaniment = []
+            total_time = time.time() - start_time
+            self.report_progress(100, f"Extraction completed (Total time: {total_time:.1f}s)")
 
-                # Calculate number of segments
-                total_samples = wav.shape[2]
-                segments = []
+            return result
 
-                # Create overlapping segments
-                start = 0
-                while start < total_samples:
-                    end = min(start + segment_samples, total_samples)
-                    segments.append((start, end))
-                    start += segment_samples - overlap_samples
-
-                self.report_progress(18, f"Segmentation: {len(segments)} segments")
-                print(f"Audio will be processed in {len(segments)} segments")
-
-                # Process each segment with progress tracking
-                for i, (start, end) in enumerate(segments):
-                    segment = wav[:, :, start:end]
-
-                    # Calculate progress for this segment (20-70%)
-                    segment_progress = 20 + int((i / len(segments)) * 50)
-                    self.report_progress(segment_progress, f"Processing segment {i+1}/{len(segments)}")
-
-                    # Separate audio
-                    with torch.no_grad():
-                        segment_sources = apply_model(self.model, segment)
-
-                        # Intermediate progress for especially long segments
-                        if audio_duration > 180 and i % 2 == 0:  # more updates for long tracks
-                            interim_progress = segment_progress + 1
-                            self.report_progress(interim_progress, f"Segment {i+1}/{len(segments)} processed")
-
-                    # Indices for demucs sources
-                    stem_names = self.model.sources
-                    vocal_idx = stem_names.index('vocals')
-
-                    # Extract vocals
-                    segment_vocals = segment_sources[:, vocal_idx]
-
-                    # Create accompaniment
-                    segment_accompaniment = torch.zeros_like(segment_sources[:, 0])
-                    for idx, name in enumerate(stem_names):
-                        if idx != vocal_idx:
-                            segment_accompaniment += segment_sources[:, idx]
-
-                    # Save segments in lists
-                    all_vocals.append(segment_vocals.cpu())
-                    all_accompaniment.append(segment_accompaniment.cpu())
-
-                    # Free memory
-                    del segment_sources, segment_vocals, segment_accompaniment, segment
-                    if self.device == "cuda":
-                        torch.cuda.empty_cache()
-                    gc.collect()
-
-                    # Update after every third segment or the last segment
-                    if i % 3 == 0 or i == len(segments) - 1:
-                        elapsed = time.time() - start_time
-                        eta = (elapsed / (i + 1)) * (len(segments) - i - 1) if i > 0 else 0
-                        self.report_progress(segment_progress,
-                                            f"Segment {i+1}/{len(segments)}, ETA: {eta:.1f}s")
-
-                # Combine segments with crossfade
-                self.report_progress(70, "Merging segments...")
-                vocal_output = self.crossfade_segments(all_vocals, overlap_samples)
-                self.report_progress(75, "Vocals merged")
-                accompaniment_output = self.crossfade_segments(all_accompaniment, overlap_samples)
-                self.report_progress(80, "Accompaniment merged")
-
-                # Save files
-                self.report_progress(85, "Saving vocals...")
-                self.save_audio(vocal_output[0].numpy(), vocal_path, self.model.samplerate, format, bitrate)
-                self.report_progress(90, "Vocals saved")
-
-                self.report_progress(92, "Saving accompaniment...")
-                self.save_audio(accompaniment_output[0].numpy(), accompaniment_path, self.model.samplerate, format, bitrate)
-                self.report_progress(98, "Accompaniment saved")
+        except Exception as e:
+            print(f"Error during extraction: {str(e)}")
+            self.report_progress(99, f"Error: {str(e)}")
+            traceback.print_exc()
+            return {}
+
+    def load_audio(self, input_file):
+        """
+        Decodes an audio file into a tensor at the model's sample rate and channel count,
+        reporting progress and recording the audio duration of the extraction
+
+        Args:
+            input_file: Path to input audio file
+
+        Returns:
+            Audio tensor with shape (1, channels, time) on the processing device
+        """
+        self.report_progress(7, "Loading audio file...")
+        start_decode = time.time()
+        wav = self.decode_audio(input_file)
+        self.report_progress(15, "Audio loaded")
+
+        self.last_audio_seconds = wav.shape[-1] / self.model.samplerate
+        self.telemetry.stage("decode", start_decode, audio_seconds=round(self.last_audio_seconds, 3))
+
+        return wav
+
+    def decode_audio(self, input_file):
+        """
+        Decodes an audio file without reporting progress or changing the extractor's state,
+        so it can run on a decoder thread while another file is being separated
+
+        Args:
+            input_file: Path to input audio file
+
+        Returns:
+            Audio tensor with shape (1, channels, time) on the processing device
+        """
+        wav = AudioFile(input_file).read(channels=self.model.audio_channels, samplerate=self.model.samplerate)
+
+        # Check if wav is already a tensor
+        if not isinstance(wav, torch.Tensor):
+            wav = torch.tensor(wav)
+
+        # Ensure audio has the right format (batch, channels, time)
+        if wav.dim() == 2:  # If it's (channels, time)
+            wav = wav.unsqueeze(0)  # Expand to (1, channels, time)
+        elif wav.dim() == 1:  # If it's just (time)
+            wav = wav.unsqueeze(0).unsqueeze(0)  # Expand to (1, 1, time)
+
+        # Move to the right device
+        return wav.to(self.device)
+
+    def separate_audio(self, wav, start_time=None, checkpoint_key=None):
+        """
+        Separates a decoded audio file into vocals and accompaniment, leaving out silent
+        regions if silence skipping is enabled
+
+        The audible regions are joined and separated in one go; the joints lie inside
+        silence, so the model sees no hard transitions. Silent regions get silent vocals
+        and the unchanged input as accompaniment.
+
+        Args:
+            wav: Audio tensor with shape (1, channels, time)
+            start_time: Start time of the extraction, used for the ETA
+            checkpoint_key: Key for checkpointing finished segments, None = no checkpoint
+
+        Returns:
+            Tensor with shape (2, channels, time) holding vocals and accompaniment on the CPU
+        """
+        if not self.skip_silence:
+            return self.separate_mix(wav, start_time, checkpoint_key)
+
+        start_detect = time.time()
+        sample_rate = self.model.samplerate
+        regions = find_active_regions(wav[0].cpu().numpy(), sample_rate, self.silence_threshold)
+        total_samples = wav.shape[2]
+        active_samples = sum(end - start for start, end in regions)
+
+        self.last_skipped_seconds = (total_samples - active_samples) / sample_rate
+        self.telemetry.stage("silence", start_detect, regions=len(regions),
+                             skipped_seconds=round(self.last_skipped_seconds, 3),
+                             skipped_fraction=round(1 - active_samples / total_samples, 3))
+
+        if active_samples == total_samples:
+            return self.separate_mix(wav, start_time, checkpoint_key)
+
+        self.report_progress(17, f"Skipping {self.last_skipped_seconds:.1f}s of silence "
+                                 f"({100 * (1 - active_samples / total_samples):.0f}% of the audio)")
+
+        stems = torch.zeros((2,) + wav.shape[1:], dtype=wav.dtype)
+        stems[1] = wav[0].cpu()
+
+        if regions:
+            active = self.separate_mix(torch.cat([wav[:, :, start:end] for start, end in regions], dim=2),
+                                       start_time, checkpoint_key)
+            position = 0
+            for start, end in regions:
+                stems[:, :, start:end] = active[:, :, position:position + end - start]
+                position += end - start
+            del active
+        else:
+            self.report_progress(80, "No audible content, model pass skipped")
+
+        return stems
+
+    def separate_mix(self, wav, start_time=None, checkpoint_key=None):
+        """
+        Separates audio into vocals and accompaniment, either at once or in segments
+
+        With a checkpoint key, finished segments are kept in a memory-mapped scratch file,
+        and segments completed by an earlier, interrupted run with the same key are not
+        separated again.
+
+        Args:
+            wav: Audio tensor with shape (1, channels, time)
+            start_time: Start time of the extraction, used for the ETA
+            checkpoint_key: Key for checkpointing finished segments, None = no checkpoint
+
+        Returns:
+            Tensor with shape (2, channels, time) holding vocals and accompaniment on the CPU
+        """
+        if start_time is None:
+            start_time = time.time()
+        start_separate = time.time()
+
+        audio_duration = wav.shape[2] / self.model.samplerate
+        print(f"Audio duration: {audio_duration:.2f} seconds")
+        print(f"Audio shape: {wav.shape}")
+
+        # Segmented processing or entire file at once
+        segment_size = self.effective_segment_size(audio_duration)
+        use_segments = segment_size is not None and wav.shape[2] > segment_size * self.model.samplerate
+
+        if use_segments:
+            # Process audio in segments
+            segment_samples = int(segment_size * self.model.samplerate)
+            overlap_samples = segment_samples // 4  # 25% overlap
+
+            # Calculate number of segments
+            total_samples = wav.shape[2]
+            segments = []
+
+            # Create overlapping segments
+            start = 0
+            while start < total_samples:
+                end = min(start + segment_samples, total_samples)
+                segments.append((start, end))
+                if end == total_samples:
+                    # A further segment would lie entirely within this one
+                    break
+                start += segment_samples - overlap_samples
+
+            self.report_progress(18, f"Segmentation: {len(segments)} segments")
+            print(f"Audio will be processed in {len(segments)} segments")
+
+            # Initialize output list (vocals and accompaniment stacked per segment)
+            all_stems = [None] * len(segments)
+
+            # Segments finished by an interrupted run with the same input and settings are kept
+            checkpoint = None
+            if checkpoint_key:
+                checkpoint = SegmentCheckpoint(self.checkpoint_dir, checkpoint_key, segments,
+                                               wav.shape[1], segment_samples)
+                if checkpoint.completed:
+                    self.report_progress(19, f"Resuming from checkpoint: {len(checkpoint.completed)}/"
+                                             f"{len(segments)} segments already separated")
+            pending = [i for i in range(len(segments)) if checkpoint is None or i not in checkpoint.completed]
+
+            batch_size = self.resolve_batch_segments(segment_samples)
+            if batch_size > 1:
+                print(f"Separating {batch_size} segments per model pass")
+
+            # Group segments of equal length into batches. A shorter final segment gets its own
+            # pass, zero-padding it would change the model's input normalization and its output.
+            batches = []
+            for index in pending:
+                start, end = segments[index]
+                if (batches and len(batches[-1]) < batch_size
+                        and segments[batches[-1][0]][1] - segments[batches[-1][0]][0] == end - start):
+                    batches[-1].append(index)
+                else:
+                    batches.append([index])
+
+            # Process segments in batches with progress tracking
+            processed = 0
+            for batch_indices in batches:
+                batch_bounds = [segments[i] for i in batch_indices]
+                last_index = batch_indices[-1]
+
+                # Calculate progress for this batch (20-70%)
+                segment_progress = 20 + int((batch_indices[0] / len(segments)) * 50)
+                if len(batch_bounds) == 1:
+                    self.report_progress(segment_progress,
+                                         f"Processing segment {last_index+1}/{len(segments)}")
+                else:
+                    self.report_progress(segment_progress,
+                                         f"Processing segments {batch_indices[0]+1}-{last_index+1}/{len(segments)}")
+
+                # Stack the segments into one batch
+                batch = torch.cat([wav[:, :, start:end] for start, end in batch_bounds])
+
+                # Separate audio
+                start_batch = time.time()
+                batch_vocals, batch_accompaniment = self.separate(batch)
+                batch_time = time.time() - start_batch
+
+                # Save segment stems, in the checkpoint if enabled
+                for j, index in enumerate(batch_indices):
+                    segment_stems = torch.cat([batch_vocals[j:j + 1], batch_accompaniment[j:j + 1]]).cpu()
+                    if checkpoint:
+                        checkpoint.store(index, segment_stems)
+                    else:
+                        all_stems[index] = segment_stems
+                if checkpoint:
+                    checkpoint.commit(batch_indices)
 
                 # Free memory
-                del vocal_output, accompaniment_output, all_vocals, all_accompaniment, wav
-                if self.device == "cuda":
-                    torch.cuda.empty_cache()
-                gc.collect()
+                del batch_vocals, batch_accompaniment, batch
+
+                elapsed = time.time() - start_time
+                processed += len(batch_indices)
+                eta = (elapsed / processed) * (len(pending) - processed)
+                self.report_progress(segment_progress,
+                                     f"Segment {last_index+1}/{len(segments)}, ETA: {eta:.1f}s")
+
+                batch_audio_seconds = sum(end - start for start, end in batch_bounds) / self.model.samplerate
+                self.telemetry.emit("segment", index=last_index, count=len(segments), batch=len(batch_bounds),
+                                    audio_seconds=round(batch_audio_seconds, 3), seconds=round(batch_time, 3),
+                                    throughput=round(batch_audio_seconds / batch_time, 3) if batch_time else None,
+                                    eta=round(eta, 1))
+
+            self.telemetry.stage("separate", start_separate, audio_seconds=round(audio_duration, 3),
+                                 segments=len(segments), resumed_segments=len(segments) - len(pending),
+                                 **self.telemetry.memory())
+
+            if checkpoint:
+                # Merge straight from the scratch file instead of holding all segments in memory
+                all_stems = [checkpoint.segment(i) for i in range(len(segments))]
+
+            # Combine segments with crossfade (vocals and accompaniment in one pass)
+            self.report_progress(70, "Merging segments...")
+            start_merge = time.time()
+            merged = self.crossfade_segments(all_stems, overlap_samples)
+            del all_stems
+            self.telemetry.stage("merge", start_merge, segments=len(segments))
+            self.report_progress(80, "Vocals and accompaniment merged")
+
+            return merged
+
+        # Process the entire file at once
+        self.report_progress(20, "Starting audio processing...")
+        print("Processing audio file as a whole...")
+        print(f"Available stems: {self.model.sources}")
+
+        self.report_progress(25, "Applying AI model...")
+        start_model = time.time()
+        vocals, accompaniment = self.separate(wav)
+        model_time = time.time() - start_model
+        self.report_progress(70, f"Model applied (Duration: {model_time:.1f}s)")
+
+        stems = torch.cat([vocals, accompaniment]).cpu()
+        self.telemetry.stage("separate", start_separate, audio_seconds=round(audio_duration, 3),
+                             segments=1, **self.telemetry.memory())
+        self.report_progress(80, "Vocals and accompaniment extracted")
+
+        return stems
+
+    def write_stems(self, stems, output_dir, format="mp3", bitrate="192k"):
+        """
+        Saves separated vocals and accompaniment to the output directory
 
-            else:
-                # Process the entire file at once
-                self.report_progress(20, "Starting audio processing...")
-                print("Processing audio file as a whole...")
-
-                with torch.no_grad():
-                    self.report_progress(25, "Applying AI model...")
-                    start_model = time.time()
-                    sources = apply_model(self.model, wav)
-                    model_time = time.time() - start_model
-                    self.report_progress(70, f"Model applied (Duration: {model_time:.1f}s)")
-
-                # Indices for demucs sources
-                stem_names = self.model.sources
-                print(f"Available stems: {stem_names}")
-
-                vocal_idx = stem_names.index('vocals') if 'vocals' in stem_names else -1
-
-                if vocal_idx != -1:
-                    # Save vocals
-                    self.report_progress(75, "Extracting vocals...")
-                    vocals = sources[:, vocal_idx].cpu().numpy()
-                    self.report_progress(80, "Vocals extracted")
-
-                    self.report_progress(85, "Saving vocals...")
-                    self.save_audio(vocals[0], vocal_path, self.model.samplerate, format, bitrate)
-                    self.report_progress(90, "Vocals saved")
-
-                    # Create accompaniment (all sources except vocals)
-                    self.report_progress(92, "Creating accompaniment...")
-                    accompaniment = torch.zeros_like(sources[:, 0])
-                    for idx, name in enumerate(stem_names):
-                        if idx != vocal_idx:
-                            accompaniment += sources[:, idx]
-
-                    self.report_progress(94, "Saving accompaniment...")
-                    self.save_audio(accompaniment[0].cpu().numpy(), accompaniment_path, self.model.samplerate, format, bitrate)
-                    self.report_progress(98, "Accompaniment saved")
-
-                    # Free memory
-                    del vocals, accompaniment, sources, wav
-                    if self.device == "cuda":
-                        torch.cuda.empty_cache()
-                    gc.collect()
+        Args:
+            stems: Tensor with shape (2, channels, time) holding vocals and accompaniment
+            output_dir: Directory for output files
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+
+        Returns:
+            Dictionary with paths to the extracted files
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        # Define paths (with correct file extension)
+        extension = f".{format.lower()}"
+        vocal_path = os.path.join(output_dir, f'vocals{extension}')
+        accompaniment_path = os.path.join(output_dir, f'accompaniment{extension}')
+
+        # Save files
+        self.report_progress(85, "Saving vocals and accompaniment...")
+        start_encode = time.time()
+        vocal_path, accompaniment_path = self.save_stems(
+            [(stems[0].numpy(), vocal_path), (stems[1].numpy(), accompaniment_path)],
+            self.model.samplerate, format, bitrate)
+        self.telemetry.stage("encode", start_encode, format=format.lower())
+        self.report_progress(98, "Vocals and accompaniment saved")
+
+        return {
+            'vocals': vocal_path,
+            'accompaniment': accompaniment_path
+        }
+
+    def extract_vocals_streaming(self, input_file, output_dir, format="mp3", bitrate="192k"):
+        """
+        Extracts vocals with constant memory usage, independent of the audio length
+
+        The input is decoded incrementally by ffmpeg into a fixed window buffer. Each
+        window is separated on its own, crossfaded with the previous one over a 25%
+        overlap and the finished samples are passed directly to the stem encoders.
 
+        Args:
+            input_file: Path to input audio file
+            output_dir: Directory for output files
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+
+        Returns:
+            Dictionary with paths to the extracted files
+        """
+        start_time = time.time()
+        self.report_progress(5, "Starting streaming extraction...")
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        sample_rate = self.model.samplerate
+        channels = self.model.audio_channels
+
+        segment_samples = int((self.segment_size or 30) * sample_rate)
+        overlap_samples = segment_samples // 4  # 25% overlap
+        hop_samples = segment_samples - overlap_samples
+
+        extension = f".{format.lower()}"
+        vocal_path = os.path.join(output_dir, f'vocals{extension}')
+        accompaniment_path = os.path.join(output_dir, f'accompaniment{extension}')
+
+        decoder = None
+        decoder_stderr = None
+        writers = []
+
+        try:
+            try:
+                audio_duration = AudioFile(input_file).duration
+                print(f"Audio duration: {audio_duration:.2f} seconds")
+            except Exception:
+                audio_duration = None
+
+            self.report_progress(7, "Opening audio stream...")
+            # Errors go to a temporary file: an unread stderr pipe would block ffmpeg once it is full
+            decoder_stderr = tempfile.TemporaryFile()
+            decoder = subprocess.Popen([
+                "ffmpeg", "-v", "error", "-i", input_file,
+                "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "pipe:1"
+            ], stdout=subprocess.PIPE, stderr=decoder_stderr)
+
+            writers = [StemWriter(vocal_path, sample_rate, channels, format, bitrate),
+                       StemWriter(accompaniment_path, sample_rate, channels, format, bitrate)]
+
+            fade_in = torch.linspace(0., 1., overlap_samples).view(1, 1, -1)
+            fade_out = 1. - fade_in
+
+            # Fixed input window; the last overlap_samples of a window are moved to the
+            # front before the next hop is read into it
+            window = np.zeros((channels, segment_samples), dtype=np.float32)
+            window_length = 0
+            tail = None  # last overlap_samples of the previous window, per stem
+            processed_samples = 0
+            skipped_samples = 0
+            window_index = 0
+
+            self.report_progress(10, f"Streaming in windows of {segment_samples / sample_rate:.0f}s")
+
+            while True:
+                if tail is None:
+                    new_samples = read_pcm(decoder.stdout, segment_samples, channels)
+                    window[:, :new_samples.shape[1]] = new_samples
+                    window_length = new_samples.shape[1]
+                    is_last = window_length < segment_samples
                 else:
-                    print("Warning: No vocals stem found in available stems!")
-                    self.report_progress(95, "Error: No vocals stem found!")
-                    return {}
+                    window[:, :overlap_samples] = window[:, hop_samples:hop_samples + overlap_samples]
+                    new_samples = read_pcm(decoder.stdout, hop_samples, channels)
+                    window[:, overlap_samples:overlap_samples + new_samples.shape[1]] = new_samples
+                    window_length = overlap_samples + new_samples.shape[1]
+                    is_last = new_samples.shape[1] < hop_samples
+
+                if new_samples.shape[1] == 0:
+                    # End of stream: the held back overlap has nothing to fade into
+                    if tail is not None:
+                        for writer, stem in zip(writers, tail):
+                            writer.write(stem[0].numpy())
+                    break
+
+                start_window = time.time()
+                if self.skip_silence and not find_active_regions(window[:, :window_length], sample_rate,
+                                                                 self.silence_threshold):
+                    # Silent window: no model pass, the input goes to the accompaniment unchanged
+                    accompaniment = torch.from_numpy(window[:, :window_length].copy()).unsqueeze(0)
+                    stems = [torch.zeros_like(accompaniment), accompaniment]
+                    skipped_samples += new_samples.shape[1]
+                else:
+                    mix = torch.from_numpy(window[:, :window_length]).unsqueeze(0).to(self.device)
+                    vocals, accompaniment = self.separate(mix)
+                    stems = [vocals.cpu(), accompaniment.cpu()]
+                    del mix, vocals
+                del accompaniment
+
+                start = 0
+                if tail is not None:
+                    # Crossfade the start of this window with the end of the previous one
+                    for writer, stem, previous in zip(writers, stems, tail):
+                        blended = fade_out * previous + fade_in * stem[:, :, :overlap_samples]
+                        writer.write(blended[0].numpy())
+                    start = overlap_samples
+
+                # Hold back the end of the window unless no further window can follow
+                end = window_length if is_last else window_length - overlap_samples
+                for writer, stem in zip(writers, stems):
+                    writer.write(stem[0, :, start:end].numpy())
+                tail = None if is_last else [stem[:, :, end:] for stem in stems]
+
+                processed_samples += new_samples.shape[1]
+                window_index += 1
+                window_time = time.time() - start_window
+                window_audio_seconds = new_samples.shape[1] / sample_rate
+
+                elapsed = time.time() - start_time
+                eta = None
+                if audio_duration:
+                    fraction = min(1.0, processed_samples / (audio_duration * sample_rate))
+                    eta = elapsed / fraction * (1 - fraction) if fraction > 0 else 0
+                    self.report_progress(10 + int(fraction * 85),
+                                         f"Window {window_index} processed, ETA: {eta:.1f}s")
+                else:
+                    self.report_progress(50, f"Window {window_index} processed "
+                                             f"({processed_samples / sample_rate:.0f}s of audio)")
+
+                self.telemetry.emit("segment", index=window_index - 1,
+                                    audio_seconds=round(window_audio_seconds, 3), seconds=round(window_time, 3),
+                                    throughput=round(window_audio_seconds / window_time, 3) if window_time else None,
+                                    eta=round(eta, 1) if eta is not None else None, **self.telemetry.memory())
+
+                if is_last:
+                    break
+
+            decoder.stdout.close()
+            if decoder.wait() != 0:
+                decoder_stderr.seek(0)
+                raise RuntimeError(f"ffmpeg could not decode {input_file}: "
+                                   f"{decoder_stderr.read().decode('utf-8', errors='replace')}")
+
+            self.report_progress(96, "Finalizing output files...")
+            vocal_path, accompaniment_path = [writer.close() for writer in writers]
+            writers = []
+
+            self.last_audio_seconds = processed_samples / sample_rate
+            if self.skip_silence:
+                self.last_skipped_seconds = skipped_samples / sample_rate
+                print(f"Skipped {self.last_skipped_seconds:.1f}s of silence")
+            self.telemetry.stage("stream", start_time, audio_seconds=round(self.last_audio_seconds, 3),
+                                 windows=window_index, **self.telemetry.memory())
 
             total_time = time.time() - start_time
             self.report_progress(100, f"Extraction completed (Total time: {total_time:.1f}s)")
@@ -353,12 +1939,30 @@ class VocalExtractor:
             traceback.print_exc()
             return {}
 
-    def crossfade_segments(self, segments, overlap_samples):
+        finally:
+            if decoder is not None and decoder.poll() is None:
+                decoder.kill()
+                decoder.wait()
+            if decoder_stderr is not None:
+                decoder_stderr.close()
+            for writer in writers:
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def crossfade_segments(segments, overlap_samples):
         """
         Combines audio segments with crossfade
 
+        The output is allocated once and every segment is written into its final
+        position, so merging is linear in the total length instead of copying the
+        growing result for every segment.
+
         Args:
-            segments: List of audio segments as tensors
+            segments: List of audio segments as tensors, overlapping by overlap_samples
+                      in their last dimension (leading dimensions, e.g. stems, must match)
             overlap_samples: Number of overlapping samples
 
         Returns:
@@ -371,39 +1975,31 @@ class VocalExtractor:
         fade_in = torch.linspace(0., 1., overlap_samples)
         fade_out = 1. - fade_in
 
-        # Create first part of output tensor
-        result = segments[0][:, :, :-overlap_samples]
-
-        for i in range(len(segments) - 1):
-            # Current and next segment
-            current = segments[i]
-            next_seg = segments[i + 1]
+        total_samples = sum(segment.shape[-1] for segment in segments) - overlap_samples * (len(segments) - 1)
+        result = torch.empty(segments[0].shape[:-1] + (total_samples,), dtype=segments[0].dtype)
 
-            # Overlap area
-            curr_overlap = current[:, :, -overlap_samples:]
-            next_overlap = next_seg[:, :, :overlap_samples]
+        # First segment up to its overlap with the next one
+        position = segments[0].shape[-1] - overlap_samples
+        result[..., :position] = segments[0][..., :position]
 
-            # Calculate crossfade
-            blended = fade_out.view(1, 1, -1) * curr_overlap + fade_in.view(1, 1, -1) * next_overlap
+        for i in range(1, len(segments)):
+            previous = segments[i - 1]
+            current = segments[i]
 
-            # Append to result
-            result = torch.cat([result, blended], dim=2)
+            # Overlap area: fade out the previous segment while fading in the current one
+            torch.add(fade_out * previous[..., -overlap_samples:],
+                      fade_in * current[..., :overlap_samples],
+                      out=result[..., position:position + overlap_samples])
+            position += overlap_samples
 
-            # Append rest of next segment if it's not the last one
-            if i < len(segments) - 2:
-                result = torch.cat([result, next_seg[:, :, overlap_samples:-overlap_samples]], dim=2)
-            else:
-                # For the last segment, append the rest completely
-                result = torch.cat([result, next_seg[:, :, overlap_samples:]], dim=2)
-
-            # Update after each concatenation
-            if i % 5 == 0:
-                self.report_progress(70 + int((i / len(segments)) * 5),
-                                    f"Merging segments: {i+1}/{len(segments)-1}")
+            # Rest of the segment up to the next overlap (or to its end for the last segment)
+            end = current.shape[-1] if i == len(segments) - 1 else current.shape[-1] - overlap_samples
+            result[..., position:position + end - overlap_samples] = current[..., overlap_samples:end]
+            position += end - overlap_samples
 
         return result
 
-    def batch_process(self, input_files, output_dir, format="mp3", bitrate="192k"):
+    def batch_process(self, input_files, output_dir, format="mp3", bitrate="192k", pipeline=True, on_result=None):
         """
         Processes multiple files in batch mode
 
@@ -412,10 +2008,16 @@ class VocalExtractor:
             output_dir: Base directory for output
             format: Output format ("mp3" or "wav")
             bitrate: Bitrate for MP3 compression
+            pipeline: Overlap decoding, separation and encoding of consecutive files
+                      (not used in streaming mode, which already overlaps them per file)
+            on_result: Optional callable(input_file, result) called as soon as a file is done
 
         Returns:
             Dictionary with input files as keys and output paths as values
         """
+        if pipeline and not self.stream and len(input_files) > 1:
+            return self.pipelined_batch_process(input_files, output_dir, format, bitrate, on_result)
+
         results = {}
         total_files = len(input_files)
 
@@ -428,16 +2030,15 @@ class VocalExtractor:
             # Create a subdirectory with the base name of the file
             file_output_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0])
 
-            # Reload the model when processing many files to avoid memory leaks
-            if i > 0 and i % 5 == 0 and self.device == "cuda":
-                self.model = get_model(self.model_name)
-                self.model.to(self.device)
+            # Release cached GPU memory between files
+            if i > 0 and self.device == "cuda":
                 torch.cuda.empty_cache()
-                gc.collect()
 
             # Extract vocals
             result = self.extract_vocals(input_file, file_output_dir, format, bitrate)
             results[input_file] = result
+            if on_result is not None:
+                on_result(input_file, result)
 
             # Progress for this file completed
             next_file_base = ((i + 1) / total_files) * 100
@@ -445,6 +2046,126 @@ class VocalExtractor:
 
         return results
 
+    def pipelined_batch_process(self, input_files, output_dir, format="mp3", bitrate="192k", on_result=None):
+        """
+        Processes multiple files with decoding, separation and encoding overlapped
+
+        While the model separates one file, the next file is decoded on a decoder
+        thread and the stems of the previous file are encoded on an encoder thread,
+        so the throughput approaches the cost of the separation alone. At most one
+        file is decoded ahead and one file is waiting for encoding.
+
+        Args:
+            input_files: List of input file paths
+            output_dir: Base directory for output
+            format: Output format ("mp3" or "wav")
+            bitrate: Bitrate for MP3 compression
+            on_result: Optional callable(input_file, result) called as soon as a file is done
+
+        Returns:
+            Dictionary with input files as keys and output paths as values
+        """
+        results = {}
+        total_files = len(input_files)
+        # Separation counts for 80% of a file and encoding for the remaining 20%, so the batch
+        # progress only grows although the encoder finishes files while the next is separated
+        separated = 0
+        completed = 0
+
+        def batch_progress(file_fraction=0.):
+            return int((0.8 * (separated + file_fraction) + 0.2 * completed) / total_files * 100)
+
+        def file_completed(input_file, result):
+            nonlocal completed
+            results[input_file] = result
+            if on_result is not None:
+                on_result(input_file, result)
+            completed += 1
+            self.report_progress(batch_progress(),
+                                 f"File {completed}/{total_files} completed: {os.path.basename(input_file)}")
+
+        def encode(stems, file_output_dir):
+            # Per-file progress of the encoder thread would interleave with the batch progress
+            self.progress_scope.map = lambda percentage: None
+            try:
+                return self.write_stems(stems, file_output_dir, format, bitrate)
+            finally:
+                self.progress_scope.map = None
+
+        # Serve cache hits right away, queue the rest
+        jobs = []
+        for input_file in input_files:
+            # Create a subdirectory with the base name of the file
+            file_output_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0])
+            cache_key, cached = self.lookup_cache(input_file, file_output_dir, format, bitrate)
+            if cached:
+                separated += 1
+                file_completed(input_file, cached)
+            else:
+                jobs.append((input_file, file_output_dir, cache_key, self.checkpoint_key(input_file)))
+
+        def finish_encoding(job, future):
+            input_file, _, cache_key, checkpoint_key = job
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error saving stems for {input_file}: {e}")
+                traceback.print_exc()
+                result = {}
+            # The checkpoint is only needed until the stems of the file are written
+            if checkpoint_key and result:
+                SegmentCheckpoint.discard(self.checkpoint_dir, checkpoint_key)
+            self.store_cache(cache_key, result)
+            file_completed(input_file, result)
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode") as decoder, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode") as encoder:
+            # The decoder thread only decodes; progress and telemetry come from this thread
+            next_audio = decoder.submit(self.decode_audio, jobs[0][0]) if jobs else None
+            encoding = None
+
+            for i, job in enumerate(jobs):
+                input_file, file_output_dir, _, checkpoint_key = job
+                audio = next_audio
+                next_audio = decoder.submit(self.decode_audio, jobs[i + 1][0]) if i + 1 < len(jobs) else None
+
+                self.report_progress(batch_progress(),
+                                     f"Separating file {i+1}/{len(jobs)}: {os.path.basename(input_file)}")
+                # Separation reports up to 80% of a single file, mapped into this file's share of the batch
+                self.progress_scope.map = lambda percentage: batch_progress(min(percentage, 80) / 80)
+                try:
+                    start_wait = time.time()
+                    wav = audio.result()
+                    self.telemetry.stage("decode_wait", start_wait, file=input_file,
+                                         audio_seconds=round(wav.shape[-1] / self.model.samplerate, 3))
+                    stems = self.separate_audio(wav, checkpoint_key=checkpoint_key)
+                    del wav
+                except Exception as e:
+                    print(f"Error during extraction of {input_file}: {e}")
+                    traceback.print_exc()
+                    stems = None
+                finally:
+                    self.progress_scope.map = None
+                separated += 1
+
+                if stems is None:
+                    file_completed(input_file, {})
+                    continue
+
+                # Keep at most one file waiting for the encoder
+                if encoding is not None:
+                    finish_encoding(*encoding)
+                encoding = (job, encoder.submit(encode, stems, file_output_dir))
+                del stems
+
+                if self.device == "cuda":
+                    torch.cuda.empty_cache()
+
+            if encoding is not None:
+                finish_encoding(*encoding)
+
+        return results
+
 
 def check_ffmpeg():
     """Checks if ffmpeg is available and issues a warning if not"""
@@ -458,43 +2179,551 @@ def check_ffmpeg():
         return False
 
 
+# State of a parallel batch worker process (see parallel_batch_process)
+_worker_extractor = None
+_worker_events = None
+_worker_file = None
+
+
+def _init_batch_worker(extractor_kwargs, events, slot_counter, threads_per_worker):
+    """
+    Initializes a batch worker process: pins it to its share of the CPU cores
+    and loads the model once for all files the worker processes
+
+    Args:
+        extractor_kwargs: Keyword arguments for VocalExtractor
+        events: Queue for (input file, percentage, message) progress events and
+                (input file, None, event) telemetry events
+        slot_counter: Shared counter used to assign each worker its own core slice
+        threads_per_worker: Number of cores and torch threads per worker
+    """
+    global _worker_extractor, _worker_events
+
+    # Per-worker output would interleave with the merged progress of the main process
+    sys.stdout = sys.stderr
+
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        worker_cores = cores[slot * threads_per_worker:(slot + 1) * threads_per_worker]
+        if worker_cores:
+            os.sched_setaffinity(0, worker_cores)
+    torch.set_num_threads(threads_per_worker)
+
+    _worker_events = events
+    # Stage, segment and summary events go to the main process, progress is merged there
+    telemetry = Telemetry()
+    telemetry.listener = lambda event: (_worker_events.put((_worker_file, None, event))
+                                        if event["event"] != "progress" else None)
+    _worker_extractor = VocalExtractor(**extractor_kwargs, telemetry=telemetry)
+    _worker_extractor.progress_callback = lambda percentage, message: _worker_events.put(
+        (_worker_file, percentage, message))
+
+
+def _process_batch_file(input_file, output_dir, format, bitrate):
+    """
+    Extracts vocals from one file in a batch worker process
+
+    Returns:
+        Tuple of the input file and the extraction result
+    """
+    global _worker_file
+
+    _worker_file = input_file
+    try:
+        return input_file, _worker_extractor.extract_vocals(input_file, output_dir, format, bitrate)
+    except Exception as e:
+        print(f"Error processing {input_file}: {e}")
+        traceback.print_exc()
+        return input_file, {}
+    finally:
+        _worker_events.put((input_file, 100, None))
+        _worker_file = None
+
+
+def parallel_batch_process(input_files, output_dir, format, bitrate, workers, extractor_kwargs, telemetry=None,
+                           on_result=None):
+    """
+    Processes multiple files in a pool of worker processes
+
+    Every worker loads the model once and uses its own slice of the CPU cores.
+    Progress of all files is merged into a single progress stream, the other
+    telemetry events of the workers are forwarded tagged with their file.
+
+    Args:
+        input_files: List of input file paths
+        output_dir: Base directory for output
+        format: Output format ("mp3" or "wav")
+        bitrate: Bitrate for MP3 compression
+        workers: Number of worker processes
+        extractor_kwargs: Keyword arguments for the VocalExtractor of each worker
+        telemetry: Telemetry channel for the merged progress events
+        on_result: Optional callable(input_file, result) called as soon as a file is done
+
+    Returns:
+        Dictionary with input files as keys and output paths as values
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = max(1, min(workers, len(input_files)))
+    if hasattr(os, "sched_getaffinity"):
+        total_cores = len(os.sched_getaffinity(0))
+    else:
+        total_cores = os.cpu_count() or 1
+    threads_per_worker = max(1, total_cores // workers)
+    print(f"Processing with {workers} workers, {threads_per_worker} threads each")
+
+    # CUDA and torch's thread pools do not survive fork()
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    slot_counter = context.Value("i", 0)
+
+    file_progress = {input_file: 0 for input_file in input_files}
+
+    def merge_progress():
+        last_reported = -1
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            input_file, percentage, message = event
+            if percentage is None:
+                # Telemetry event of a worker, tagged with the file it belongs to
+                if telemetry is not None:
+                    fields = {key: value for key, value in message.items() if key != "event"}
+                    fields.setdefault("file", input_file)
+                    telemetry.emit(message["event"], **fields)
+                continue
+            if input_file not in file_progress:
+                continue
+
+            file_progress[input_file] = max(file_progress[input_file], percentage)
+            total = int(sum(file_progress.values()) / len(file_progress))
+            if total > last_reported or message:
+                print(f"Progress: {total}%")
+                if message:
+                    print(f"Status: [{os.path.basename(input_file)}] {message}")
+                sys.stdout.flush()
+                last_reported = total
+                if telemetry is not None:
+                    telemetry.emit("progress", progress=total, message=message, file=input_file,
+                                   file_progress=file_progress[input_file])
+
+    progress_thread = threading.Thread(target=merge_progress, daemon=True)
+    progress_thread.start()
+
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_batch_worker,
+                                 initargs=(extractor_kwargs, events, slot_counter, threads_per_worker)) as pool:
+            futures = []
+            for input_file in input_files:
+                # Create a subdirectory with the base name of the file
+                file_output_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0])
+                futures.append(pool.submit(_process_batch_file, input_file, file_output_dir, format, bitrate))
+
+            for future in as_completed(futures):
+                input_file, result = future.result()
+                results[input_file] = result
+                if on_result is not None:
+                    on_result(input_file, result)
+    finally:
+        events.put(None)
+        progress_thread.join()
+
+    failed = [input_file for input_file, result in results.items() if not result]
+    if failed:
+        print(f"{len(failed)} of {len(input_files)} files failed: {failed}")
+
+    return results
+
+
+# Job keys that override extractor settings for a single job
+JOB_SETTINGS = {
+    "segment": "segment_size",
+    "stream": "stream",
+    "batch_segments": "batch_segments",
+    "skip_silence": "skip_silence",
+    "silence_threshold": "silence_threshold",
+    "two_stems": "two_stems"
+}
+
+
+def run_job(extractor, job, send_event):
+    """
+    Runs a single extraction job on an already loaded extractor
+
+    Args:
+        extractor: VocalExtractor instance with the model loaded
+        job: Job dictionary with 'input', 'output' and optional 'id', 'model',
+             'format', 'bitrate', 'preset', the keys of JOB_SETTINGS and 'preview' (seconds) with
+             'preview_windows', 'preview_model' and 'preview_budget'
+        send_event: Callable that receives each event dictionary for the client
+    """
+    job_id = job.get("id")
+
+    def forward_progress(percentage, message):
+        send_event({"id": job_id, "event": "progress", "progress": percentage, "message": message})
+
+    def forward_telemetry(event):
+        # Progress is already forwarded through the progress callback
+        if event["event"] != "progress":
+            send_event({**event, "id": job_id, "event": "telemetry", "type": event["event"]})
+
+    extractor.progress_callback = forward_progress
+    extractor.telemetry.listener = forward_telemetry
+    # A preset changes the process-wide torch thread count, which must not outlive the job
+    threads = torch.get_num_threads()
+    try:
+        if not job.get("input") or not job.get("output"):
+            raise ValueError("Job requires 'input' and 'output'")
+
+        preset = job.get("preset")
+        model_name = job.get("model") or (PRESETS[preset]["model"] if preset in PRESETS else None)
+        if model_name:
+            extractor.use_model(model_name)
+        extractor.apply_preset(preset)
+        for key, attribute in JOB_SETTINGS.items():
+            if key in job:
+                setattr(extractor, attribute, job[key])
+
+        if job.get("preview"):
+            preview = extractor.extract_preview(job["input"], job["output"], job.get("format", "mp3"),
+                                                job.get("bitrate", "192k"), job["preview"],
+                                                job.get("preview_windows", 1), job.get("preview_model"),
+                                                job.get("preview_budget"))
+            if preview:
+                send_event({"id": job_id, "event": "preview", "result": preview})
+
+        result = extractor.extract_vocals(job["input"], job["output"],
+                                          job.get("format", "mp3"), job.get("bitrate", "192k"))
+        if not result:
+            raise RuntimeError("Extraction produced no output")
+
+        event = {"id": job_id, "event": "result", "result": result, "model_pool": extractor.model_pool.stats()}
+        if extractor.result_cache is not None:
+            event["result_cache"] = extractor.result_cache.stats()
+        send_event(event)
+
+    except Exception as e:
+        traceback.print_exc()
+        send_event({"id": job_id, "event": "error", "error": str(e)})
+
+    finally:
+        extractor.progress_callback = None
+        extractor.telemetry.listener = None
+        torch.set_num_threads(threads)
+
+
+def job_with_defaults(job, defaults):
+    """
+    Fills in the worker's startup settings for everything a job does not set
+
+    A job that selects a preset without a model runs on the model of the preset
+    rather than on the worker's default model.
+    """
+    merged = {**defaults, **job}
+    if "model" not in job and job.get("preset") in PRESETS:
+        merged["model"] = PRESETS[job["preset"]]["model"]
+    return merged
+
+
+def serve(extractor, socket_path=None):
+    """
+    Runs the extractor as a long-lived worker that keeps the model loaded
+
+    Jobs are read as line-delimited JSON objects, either from stdin or from
+    clients connecting to a Unix domain socket. Every job produces 'progress'
+    events (and a 'preview' event if requested) followed by a final 'result' or
+    'error' event, one JSON object per line.
+
+    Args:
+        extractor: VocalExtractor instance with the model loaded
+        socket_path: Path of the Unix socket to listen on. If None, jobs are read
+                     from stdin and events are written to stdout.
+    """
+    defaults = {key: getattr(extractor, attribute) for key, attribute in JOB_SETTINGS.items()}
+    defaults["preset"] = extractor.preset
+    # Jobs without a model return to the model the worker was started with
+    defaults["model"] = extractor.model_name
+
+    print(f"Resident models: {extractor.model_pool.stats()['models']}")
+
+    if socket_path is None:
+        protocol_out = sys.__stdout__
+
+        def send_event(event):
+            protocol_out.write(json.dumps(event) + "\n")
+            protocol_out.flush()
+
+        # Keep stdout reserved for protocol events, regular output goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            send_event({"event": "ready", "model": extractor.model_name, "device": extractor.device})
+            for line in sys.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    send_event({"event": "error", "error": f"Invalid job: {e}"})
+                    continue
+                job = job_with_defaults(job, defaults)
+                run_job(extractor, job, send_event)
+        return
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def send_event(event):
+                self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    send_event({"event": "error", "error": f"Invalid job: {e}"})
+                    continue
+                job = job_with_defaults(job, defaults)
+                try:
+                    run_job(extractor, job, send_event)
+                except (BrokenPipeError, ConnectionResetError):
+                    print("Client disconnected before the job finished")
+                    return
+
+    # Remove a stale socket left behind by a previous worker
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # Jobs are handled one at a time since they share the loaded model
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        print(f"VoiceXtract worker listening on {socket_path} (model: {extractor.model_name})")
+        sys.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def submit_job(socket_path, job, telemetry=None):
+    """
+    Sends a job to a running worker and relays its progress in the CLI format
+
+    Args:
+        socket_path: Path of the worker's Unix socket
+        job: Job dictionary as accepted by run_job
+        telemetry: Telemetry channel that receives the worker's progress and telemetry events
+
+    Returns:
+        Dictionary with paths to the extracted files
+
+    Raises:
+        OSError: If the worker cannot be reached
+        RuntimeError: If the worker reports an error for the job
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(job) + "\n").encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+
+        with client.makefile("r", encoding="utf-8") as events:
+            for line in events:
+                event = json.loads(line)
+                if event["event"] == "progress":
+                    print(f"Progress: {event['progress']}%")
+                    if event.get("message"):
+                        print(f"Status: {event['message']}")
+                    sys.stdout.flush()
+                    if telemetry is not None:
+                        telemetry.emit("progress", progress=event["progress"], message=event.get("message"))
+                elif event["event"] == "telemetry":
+                    if telemetry is not None:
+                        fields = {k: v for k, v in event.items() if k not in ("id", "event", "type", "time")}
+                        telemetry.emit(event["type"], **fields)
+                elif event["event"] == "preview":
+                    print(f"Preview files: {event['result']}")
+                    sys.stdout.flush()
+                elif event["event"] == "result":
+                    return event["result"]
+                elif event["event"] == "error":
+                    raise RuntimeError(event["error"])
+
+    raise RuntimeError("Worker closed the connection without a result")
+
+
 def main():
     parser = argparse.ArgumentParser(description='VoiceXtract - Extract vocals from music files')
-    parser.add_argument('input', help='Input file or directory with audio files')
+    parser.add_argument('input', nargs='?', help='Input file or directory with audio files')
     parser.add_argument('-o', '--output', default='output', help='Output directory (default: output)')
-    parser.add_argument('-m', '--model', default='htdemucs',
-                        help='Name of the model to use (default: htdemucs)')
+    parser.add_argument('-m', '--model',
+                        help=f'Name of the model to use (default: model of --preset, or {DEFAULT_MODEL})')
+    parser.add_argument('--preset', choices=list(PRESETS),
+                        help='Speed/quality preset: model, shifts, overlap, split/segment and threads '
+                             '(default: demucs defaults)')
     parser.add_argument('-f', '--format', default='mp3', choices=['mp3', 'wav'], help='Output format (default: mp3)')
     parser.add_argument('-b', '--bitrate', default='192k', help='Bitrate for MP3 (default: 192k)')
     parser.add_argument('-r', '--recursive', action='store_true', help='Search directories recursively')
+    parser.add_argument('--incremental', action='store_true',
+                        help='For directory input, skip files whose content and settings are unchanged since '
+                             'the last run (tracked in an index, see --index)')
+    parser.add_argument('--index',
+                        help='Index file for --incremental (default: .voicextract-index.json in the output directory)')
     parser.add_argument('-s', '--segment', type=int,
                         help='Segment size in seconds for chunk processing (reduces memory usage)')
     parser.add_argument('-d', '--device', choices=['cuda', 'cpu'],
                         help='Processing device (cuda or cpu, default: automatic)')
+    parser.add_argument('--batch-segments', type=int, default=1,
+                        help='Segments separated together per model pass in segmented mode '
+                             '(0 = choose from available memory, default: 1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Decode, separate and encode window by window with constant memory usage '
+                             '(for very long files; window size from --segment, default 30s)')
+    parser.add_argument('--two-stems', action='store_true',
+                        help='Compute only the vocals and derive the accompaniment as mixture minus vocals '
+                             '(faster with htdemucs_ft, less memory)')
+    parser.add_argument('--skip-silence', action='store_true',
+                        help='Leave silent regions (intros, outros, pauses) out of the model pass; '
+                             'they are written as silent vocals and unchanged accompaniment')
+    parser.add_argument('--silence-threshold', type=float, default=SILENCE_THRESHOLD_DB,
+                        help=f'Level in dBFS below which audio counts as silent (default: {SILENCE_THRESHOLD_DB:g})')
+    parser.add_argument('--preview', type=float, metavar='SECONDS',
+                        help='Before the full extraction, separate a SECONDS long excerpt and write it as '
+                             'preview_vocals/preview_accompaniment (single files only)')
+    parser.add_argument('--preview-windows', type=int, default=1,
+                        help='Number of excerpts taken evenly across the track for the preview (default: 1)')
+    parser.add_argument('--preview-model', help='Faster model for the preview (default: same as --model)')
+    parser.add_argument('--preview-budget', type=float, metavar='SECONDS',
+                        help='Latency budget for the preview; further windows are dropped once it is used up')
+    parser.add_argument('--precision', choices=PRECISIONS, default='fp32',
+                        help='Inference precision: bf16 autocast (CPUs with AVX512-BF16/AMX or CUDA) or '
+                             'dynamic INT8 quantization of Linear/LSTM layers (CPU only) (default: fp32)')
+    parser.add_argument('--warmup', action='store_true',
+                        help='Run a dummy pass after loading the model, also on CPU (always done by --serve)')
+    parser.add_argument('--cache-dir',
+                        help='Directory for caching results; identical input and settings are served from it')
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help='Size limit of the result cache in MB (default: 2048)')
+    parser.add_argument('--checkpoint-dir',
+                        help='Directory for checkpoints of segmented extractions; an interrupted job resumes '
+                             'at its first unfinished segment when run again ('
+                             f'without --segment, only files of at least {CHECKPOINT_MIN_SECONDS}s are split into '
+                             f'{CHECKPOINT_SEGMENT_SECONDS}s segments and checkpointed)')
+    parser.add_argument('--events-fd', type=int,
+                        help='File descriptor for JSON-lines telemetry events (progress, stage timings, '
+                             'throughput, memory, ETA)')
+    parser.add_argument('--events-socket', help='Unix socket to send JSON-lines telemetry events to')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of worker processes for directory input, each with its own '
+                             'model and a share of the CPU cores (default: 1)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a worker that keeps the model loaded and reads JSON jobs '
+                             'from stdin (or from --socket)')
+    parser.add_argument('--socket', help='Unix socket path for --serve')
+    parser.add_argument('--model-cache-mb', type=int, default=2048,
+                        help='Memory budget in MB for models kept resident (default: 2048)')
+    parser.add_argument('--preload', default='',
+                        help='Comma-separated models to load into the pool at worker start '
+                             '(e.g. htdemucs_ft,mdx_extra)')
+    parser.add_argument('--connect', metavar='SOCKET',
+                        help='Send the job to a running worker instead of loading the model locally')
 
     args = parser.parse_args()
 
+    if args.model is None:
+        args.model = PRESETS[args.preset]["model"] if args.preset else DEFAULT_MODEL
+
+    if not args.serve and not args.input:
+        parser.error("the following arguments are required: input")
+
+    if args.serve and not args.socket:
+        # stdout carries the job protocol, all other output goes to stderr
+        sys.stdout = sys.stderr
+
+    telemetry = Telemetry.open(args.events_fd, args.events_socket)
+
     # Check if ffmpeg is installed when MP3 is selected as format
     if args.format.lower() == "mp3" and not check_ffmpeg():
         print("Setting format to WAV due to missing ffmpeg installation...")
         args.format = "wav"
 
     try:
-        print(f"Starting VoiceXtract with model: {args.model}")
+        print(f"Starting VoiceXtract with model: {args.model}" + (f", preset: {args.preset}" if args.preset else ""))
         print(f"Output format: {args.format.upper()}, " +
               (f"Bitrate: {args.bitrate}" if args.format.lower() == "mp3" else ""))
 
         if args.segment:
             print(f"Using segmentation: {args.segment} seconds per segment")
 
-        extractor = VocalExtractor(model_name=args.model, segment_size=args.segment, device=args.device)
+        if args.connect and Path(args.input).is_file():
+            job = {
+                "input": str(Path(args.input).resolve()),
+                "output": str(Path(args.output).resolve()),
+                "model": args.model,
+                "preset": args.preset,
+                "format": args.format,
+                "bitrate": args.bitrate,
+                "segment": args.segment,
+                "stream": args.stream,
+                "batch_segments": args.batch_segments,
+                "skip_silence": args.skip_silence,
+                "silence_threshold": args.silence_threshold,
+                "two_stems": args.two_stems,
+                "preview": args.preview,
+                "preview_windows": args.preview_windows,
+                "preview_model": args.preview_model,
+                "preview_budget": args.preview_budget
+            }
+            try:
+                result = submit_job(args.connect, job, telemetry)
+                print(f"Extracted files: {result}")
+                return
+            except OSError as e:
+                print(f"Worker not reachable at {args.connect} ({e}), processing locally...")
+
+        extractor_kwargs = {
+            "model_name": args.model,
+            "preset": args.preset,
+            "segment_size": args.segment,
+            "device": args.device,
+            "model_cache_mb": args.model_cache_mb,
+            "stream": args.stream,
+            "batch_segments": args.batch_segments,
+            "skip_silence": args.skip_silence,
+            "silence_threshold": args.silence_threshold,
+            "two_stems": args.two_stems,
+            "precision": args.precision,
+            "warmup": True if args.warmup or args.serve else None,
+            "cache_dir": args.cache_dir,
+            "cache_max_mb": args.cache_max_mb,
+            "checkpoint_dir": args.checkpoint_dir
+        }
+
+        if args.serve:
+            extractor = VocalExtractor(**extractor_kwargs, telemetry=telemetry)
+            for model_name in filter(None, args.preload.split(',')):
+                extractor.model_pool.get(model_name.strip())
+            serve(extractor, args.socket)
+            return
 
         input_path = Path(args.input)
         output_dir = Path(args.output)
 
         if input_path.is_file():
             # Process single file
+            extractor = VocalExtractor(**extractor_kwargs, telemetry=telemetry)
             print(f"Processing file: {input_path}")
+            if args.preview:
+                preview = extractor.extract_preview(str(input_path), str(output_dir), args.format, args.bitrate,
+                                                    args.preview, args.preview_windows, args.preview_model,
+                                                    args.preview_budget)
+                print(f"Preview files: {preview}")
             result = extractor.extract_vocals(str(input_path), str(output_dir), args.format, args.bitrate)
             print(f"Extracted files: {result}")
         else:
@@ -512,8 +2741,41 @@ def main():
                 print(f"No audio files found in {input_path}.")
                 return
 
+            on_result = None
+            if args.incremental:
+                index = BatchIndex(args.index or str(output_dir / ".voicextract-index.json"))
+                index.prune()
+                # Everything that changes the output files of an input
+                settings = {name: value for name, value in extractor_kwargs.items()
+                            if name not in ("device", "model_cache_mb", "batch_segments", "warmup", "cache_dir",
+                                            "cache_max_mb", "checkpoint_dir")}
+                settings.update(format=args.format.lower(), bitrate=args.bitrate)
+                # The checkpoint directory itself does not matter, but long files are segmented with it
+                if args.checkpoint_dir and args.segment is None:
+                    settings["checkpoint_segment"] = [CHECKPOINT_MIN_SECONDS, CHECKPOINT_SEGMENT_SECONDS]
+
+                total_files = len(audio_files)
+                audio_files = [f for f in audio_files if not index.is_current(f, settings)]
+                index.save()
+                print(f"Incremental mode: {total_files - len(audio_files)} of {total_files} files unchanged")
+                if not audio_files:
+                    print(f"Nothing to do. Output in: {output_dir}")
+                    return
+
+                def on_result(input_file, result):
+                    if result:
+                        index.update(input_file, settings, result)
+
+            # The model is only loaded once it is clear that there is something to process
             print(f"Processing {len(audio_files)} audio files...")
-            results = extractor.batch_process(audio_files, str(output_dir), args.format, args.bitrate)
+            if args.workers > 1:
+                # Workers load their own models, the main process only distributes files
+                results = parallel_batch_process(audio_files, str(output_dir), args.format, args.bitrate,
+                                                 args.workers, extractor_kwargs, telemetry, on_result)
+            else:
+                extractor = VocalExtractor(**extractor_kwargs, telemetry=telemetry)
+                results = extractor.batch_process(audio_files, str(output_dir), args.format, args.bitrate,
+                                                  on_result=on_result)
             print(f"Processing completed. Output in: {output_dir}")
 
     except Exception as e: